@@ -0,0 +1,244 @@
+"""
+Benchmark dei sistemi della simulazione su una matrice di popolazioni e mappe.
+
+    python benchmarks/bench.py run --scale quick --out benchmarks/results.json
+    python benchmarks/bench.py compare benchmarks/baseline.json benchmarks/results.json
+
+`run` misura ogni step_* (motore python e, se disponibile, numba), World.create,
+food_surface e draw_agents (superficie pygame fuori schermo) e scrive un JSON con
+mediana e minimo per caso. Lo stato di partenza è generato con seed fisso e viene
+ricopiato prima di ogni ripetizione, fuori dal tempo misurato.
+`compare` segnala i casi in cui la mediana peggiora oltre la soglia (exit code 1).
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Callable
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from life_sim.config import SimConfig
+from life_sim.grid import spatial_index
+from life_sim.rng import RNG
+from life_sim.store import AgentStore
+from life_sim.world import World
+from life_sim.systems.aging import step_aging
+from life_sim.systems.conflict import step_conflict, step_conflict_grid
+from life_sim.systems.disease import step_disease
+from life_sim.systems.foraging import step_foraging
+from life_sim.systems.mortality import step_mortality
+from life_sim.systems.movement import step_movement
+from life_sim.systems.reproduction import step_reproduction
+from life_sim.systems.resources import step_resources
+
+SEED = 1234
+
+SCALES = {
+    "quick": {"agents": [1_000, 10_000, 100_000], "grids": [200, 1024]},
+    "full": {"agents": [1_000, 10_000, 100_000, 1_000_000], "grids": [200, 1024, 4096]},
+}
+
+
+@dataclass
+class State:
+    world: World
+    store: AgentStore
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    fn: Callable[[State], object]
+    uses_agents: bool = True   # False: dipende solo dalla mappa (agents=0 nella chiave)
+    uses_grid: bool = True
+    max_grid: int | None = None
+    resource_mode: str = "eager"
+
+
+def _base_state(n_agents: int, grid: int) -> State:
+    """Mondo e popolazione sintetici ma plausibili, generati in blocco (seed fisso)."""
+    cfg = SimConfig(seed=SEED, width=grid, height=grid, initial_agents=n_agents,
+                    initial_food_flat=True)
+    rng = np.random.default_rng(SEED)
+    food = rng.random((grid, grid), dtype=np.float32)
+    world = World(cfg=cfg, rng=RNG(SEED), food=food)
+    store = AgentStore(capacity=n_agents)
+    if n_agents:
+        store.extend({
+            "x": rng.integers(0, grid, n_agents),
+            "y": rng.integers(0, grid, n_agents),
+            "sex": rng.integers(0, 2, n_agents),
+            "age_years": np.clip(rng.normal(30.0, 15.0, n_agents), 0.0, 76.0),
+            "energy": rng.uniform(0.0, 40.0, n_agents),
+            "infected": rng.random(n_agents) < 0.05,
+            "disease_years": rng.uniform(0.0, 8.0, n_agents),
+            "repro_cooldown_years": np.where(rng.random(n_agents) < 0.5, 0.0, 0.5),
+            "ate_recent_ticks": rng.integers(0, 6, n_agents),
+            "hunger_streak_ticks": rng.integers(0, 10, n_agents),
+        })
+    return State(world=world, store=store)
+
+
+def _fresh(base: State, resource_mode: str = "eager") -> State:
+    world = World(cfg=replace(base.world.cfg, resource_mode=resource_mode), rng=RNG(SEED),
+                  food=base.world.food.copy())
+    if resource_mode == "lazy":
+        # celle ferme da 10 tick: la lettura deve davvero applicare la forma chiusa
+        world.food_tick = np.zeros(world.food.shape, dtype=np.int32)
+        world.resource_tick = 10
+    store = base.store.copy()
+    spatial_index(world, store)  # in produzione l'indice è persistente: fuori dal tempo
+    return State(world=world, store=store)
+
+
+def _cases(engines: list[str]) -> list[Case]:
+    cases = [
+        Case("World.create", lambda s: World.create(replace(s.world.cfg, initial_food_flat=False)),
+             uses_agents=False),
+        Case("step_resources", lambda s: step_resources(s.world), uses_agents=False),
+        Case("step_resources[lazy]", lambda s: step_resources(s.world), uses_agents=False,
+             resource_mode="lazy"),
+        Case("step_aging", lambda s: step_aging(s.world.cfg, s.store)),
+        Case("step_disease", lambda s: step_disease(s.world, s.store)),
+        Case("step_mortality", lambda s: step_mortality(s.world, s.store)),
+        Case("step_conflict_grid", lambda s: step_conflict_grid(s.world, s.store)),
+    ]
+    if "python" in engines:
+        cases += [
+            Case("step_movement", lambda s: step_movement(s.world, s.store)),
+            Case("step_foraging", lambda s: step_foraging(s.world, s.store)),
+            Case("step_foraging[lazy]", lambda s: step_foraging(s.world, s.store),
+                 resource_mode="lazy"),
+            Case("step_conflict", lambda s: step_conflict(s.world, s.store)),
+            Case("step_reproduction", lambda s: step_reproduction(s.world, s.store)),
+        ]
+    if "numba" in engines:
+        from life_sim.systems import compiled
+        compiled.warmup()
+        cases += [
+            Case("numba.step_movement", lambda s: compiled.step_movement(s.world, s.store)),
+            Case("numba.step_foraging", lambda s: compiled.step_foraging(s.world, s.store)),
+            Case("numba.step_conflict", lambda s: compiled.step_conflict(s.world, s.store)),
+            Case("numba.step_reproduction", lambda s: compiled.step_reproduction(s.world, s.store)),
+        ]
+    try:
+        import pygame
+    except ImportError:
+        return cases
+    from life_ui.renderer import draw_agents, food_surface
+    pygame.display.init()
+    screen = pygame.Surface((900, 900))
+    cases += [
+        Case("food_surface", lambda s: food_surface(s.world.food), uses_agents=False),
+        Case("draw_agents", lambda s: draw_agents(screen, s.store, s.world.cfg, 0, 0, 900, 900)),
+    ]
+    return cases
+
+
+def _measure(case: Case, base: State, min_time: float, max_repeats: int) -> dict:
+    times: list[float] = []
+    while len(times) < max_repeats and (len(times) < 3 or sum(times) < min_time):
+        state = _fresh(base, case.resource_mode)
+        t0 = time.perf_counter()
+        case.fn(state)
+        times.append(time.perf_counter() - t0)
+        if len(times) == 1 and times[0] > min_time:
+            break  # caso lento: una misura basta
+    return {"median_s": float(np.median(times)), "min_s": float(min(times)), "repeats": len(times)}
+
+
+def run_benchmarks(scale: str, engines: list[str], pattern: str | None = None,
+                   min_time: float = 0.5, max_repeats: int = 20,
+                   log: Callable[[str], None] = print) -> dict:
+    spec = SCALES[scale]
+    cases = [c for c in _cases(engines) if pattern is None or re.search(pattern, c.name)]
+    results: dict[str, dict] = {}
+    for grid in spec["grids"]:
+        for n in spec["agents"]:
+            base = None
+            for case in cases:
+                if case.max_grid is not None and grid > case.max_grid:
+                    continue
+                if not case.uses_agents and n != spec["agents"][0]:
+                    continue  # i casi solo-mappa si misurano una volta per griglia
+                key = f"{case.name}/agents={n if case.uses_agents else 0}/grid={grid}"
+                if base is None:
+                    base = _base_state(n, grid)
+                results[key] = r = _measure(case, base, min_time, max_repeats)
+                log(f"{key:<52} {1e3 * r['median_s']:10.3f} ms  (min {1e3 * r['min_s']:.3f}, n={r['repeats']})")
+    return {
+        "meta": {
+            "scale": scale, "engines": engines, "seed": SEED,
+            "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": os.cpu_count(), "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> tuple[list[str], bool]:
+    """Righe del confronto e True se almeno un caso è peggiorato oltre `threshold`."""
+    lines = [f"{'caso':<52} {'base ms':>10} {'nuovo ms':>10} {'rapporto':>9}"]
+    regressed = False
+    for key in sorted(set(base["results"]) & set(new["results"])):
+        b = base["results"][key]["median_s"]
+        n = new["results"][key]["median_s"]
+        ratio = n / b if b > 0 else float("inf")
+        flag = ""
+        if ratio > 1.0 + threshold:
+            flag, regressed = "  REGRESSIONE", True
+        elif ratio < 1.0 / (1.0 + threshold):
+            flag = "  meglio"
+        lines.append(f"{key:<52} {1e3 * b:10.3f} {1e3 * n:10.3f} {ratio:8.2f}x{flag}")
+    only_base = sorted(set(base["results"]) - set(new["results"]))
+    if only_base:
+        lines.append(f"(non misurati nel nuovo run: {len(only_base)} casi)")
+    return lines, regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python benchmarks/bench.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="esegue i benchmark e scrive il JSON dei risultati")
+    r.add_argument("--scale", choices=sorted(SCALES), default="quick")
+    r.add_argument("--engines", default="python,numba", help="motori da misurare (es. python,numba)")
+    r.add_argument("--filter", default=None, help="regex sul nome del caso")
+    r.add_argument("--min-time", type=float, default=0.5, help="secondi minimi per caso")
+    r.add_argument("--out", default="benchmarks/results.json")
+    c = sub.add_parser("compare", help="confronta due file di risultati")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.20,
+                   help="peggioramento relativo tollerato della mediana (default 0.20)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "run":
+        engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+        data = run_benchmarks(args.scale, engines, args.filter, args.min_time)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as fh:
+            json.dump(data, fh, indent=1, sort_keys=True)
+        print(f"Risultati scritti in {args.out}")
+        return 0
+
+    with open(args.baseline) as fh:
+        base = json.load(fh)
+    with open(args.current) as fh:
+        new = json.load(fh)
+    lines, regressed = compare(base, new, args.threshold)
+    print("\n".join(lines))
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,109 @@
-def get_backend(backend_name: str):
+"""
+Backend degli array del mondo (SimConfig.compute_backend).
+
+Con un backend "residente" le mappe del mondo (food, food_tick) vivono nel modulo
+array del dispositivo per tutta la simulazione: step_resources le aggiorna sul
+posto con `xp`, il foraging legge e scrive solo le celle occupate. Le copie
+host <-> dispositivo avvengono esclusivamente nei punti di sincronizzazione
+espliciti (World.food_now / food_preview per il renderer, World.save per gli
+snapshot, World.food_at / set_food per le celle lette dagli agenti) e passano
+tutte da to_device / to_host, che le contano in `transfers`.
+
+- "cpu": NumPy, nessun trasferimento (to_device / to_host non copiano).
+- "emulated": NumPy che simula una memoria separata: ogni passaggio è una copia
+  contata. Serve a verificare i punti di sincronizzazione senza GPU.
+- "cupy": CuPy; se non è installato si ricade su "cpu".
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass
+class TransferStats:
+    uploads: int = 0
+    downloads: int = 0
+    bytes_up: int = 0
+    bytes_down: int = 0
+
+    def summary(self) -> str:
+        return (f"Trasferimenti host->dispositivo: {self.uploads} ({self.bytes_up / 1e6:.2f} MB), "
+                f"dispositivo->host: {self.downloads} ({self.bytes_down / 1e6:.2f} MB)")
+
+
+class ArrayBackend:
+    """Backend host (NumPy): gli array restano dove sono, nessun trasferimento."""
+    name = "cpu"
+    resident = False  # True: gli array del mondo vivono fuori dalla memoria host
+    on_gpu = False
+
+    def __init__(self, xp=np):
+        self.xp = xp
+        self.transfers = TransferStats()
+
+    def to_device(self, a):
+        return a
+
+    def to_host(self, a) -> np.ndarray:
+        return a
+
+    def _count_up(self, nbytes: int) -> None:
+        self.transfers.uploads += 1
+        self.transfers.bytes_up += int(nbytes)
+
+    def _count_down(self, nbytes: int) -> None:
+        self.transfers.downloads += 1
+        self.transfers.bytes_down += int(nbytes)
+
+
+class EmulatedBackend(ArrayBackend):
+    """NumPy come dispositivo simulato: ogni passaggio host <-> dispositivo copia e conta."""
+    name = "emulated"
+    resident = True
+
+    def to_device(self, a) -> np.ndarray:
+        a = np.array(a)
+        self._count_up(a.nbytes)
+        return a
+
+    def to_host(self, a) -> np.ndarray:
+        a = np.array(a)
+        self._count_down(a.nbytes)
+        return a
+
+
+class CupyBackend(ArrayBackend):
+    name = "cupy"
+    resident = True
+    on_gpu = True
+
+    def __init__(self):
+        import cupy
+        super().__init__(cupy)
+
+    def to_device(self, a):
+        d = self.xp.asarray(a)
+        self._count_up(d.nbytes)
+        return d
+
+    def to_host(self, a) -> np.ndarray:
+        self._count_down(a.nbytes)
+        return self.xp.asnumpy(a)
+
+
+def get_backend(backend_name: str) -> ArrayBackend:
     """
-    Ritorna (xp, on_gpu) dove xp è numpy o cupy compatibile.
+    Backend per SimConfig.compute_backend ("cpu" | "emulated" | "cupy").
     Se 'cupy' non è installato, ricade su numpy.
     """
-    if backend_name.lower() == "cupy":
+    name = backend_name.lower()
+    if name == "cupy":
         try:
-            import cupy as xp
-            return xp, True
+            return CupyBackend()
         except Exception:
-            import numpy as xp
-            return xp, False
-    else:
-        import numpy as xp
-        return xp, False
+            return ArrayBackend()
+    if name == "emulated":
+        return EmulatedBackend()
+    if name == "cpu":
+        return ArrayBackend()
+    raise ValueError(f"compute_backend sconosciuto: {backend_name!r} (atteso 'cpu', 'emulated' o 'cupy')")
@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Any, Mapping
 
 @dataclass(frozen=True)
 class SimConfig:
@@ -7,6 +9,7 @@ class SimConfig:
     width: int = 200    
     height: int = 200
     toroidal: bool = True
+    spatial_bucket: int = 2  # lato (in celle) dei bucket dell'indice spaziale
 
     # Popolazione iniziale
     initial_agents: int = 800
@@ -20,6 +23,11 @@ class SimConfig:
 
     # Risorse
     resource_regen_rate: float = 0.001
+    resource_mode: str = "eager"  # "eager" (tutta la mappa ogni tick) | "lazy" (forma chiusa alla lettura)
+    # "dense" (un array h×w) | "tiled" (tile allocate al primo accesso, vedi tiles.py;
+    # rigenerazione sempre pigra; con mappe enormi alzare anche spatial_bucket)
+    food_backend: str = "dense"
+    tile_size: int = 32
     initial_food_mean: float = 0.2
     initial_food_flat: bool = False
 
@@ -42,8 +50,16 @@ class SimConfig:
     disease_recovery_after_years: float = 2.0
     disease_recovery_annual_prob: float = 0.1
 
-    # Backend (placeholder per GPU)
-    compute_backend: str = "cpu"  # "cpu" | "cupy"
+    # Backend delle mappe del mondo (backend.py): "cpu" | "emulated" (NumPy che conta i
+    # trasferimenti come un dispositivo) | "cupy" (mappe residenti sulla GPU)
+    compute_backend: str = "cpu"
+
+    # Motore del tick: "python" (riferimento) | "numba" (kernel compilati, richiede AgentStore)
+    engine: str = "python"
+    # Casualità dei sistemi (rng.py): "sequential" (generatori condivisi, in ordine di
+    # iterazione) | "counter" (Philox per agente e tick: esiti indipendenti da ordine,
+    # motore e suddivisione in worker)
+    rng_mode: str = "sequential"
 
     # Conflitto
     conflict_hunger_ticks: int = 5
@@ -53,6 +69,7 @@ class SimConfig:
     conflict_weak_energy_thresh: float = 5.0
     conflict_bonus_if_strong: float = 0.10
     conflict_strong_energy_thresh: float = 20.0
+    conflict_mode: str = "agents"  # "agents" (vicini per agente) | "grid" (griglie di occupazione 3x3)
 
     # Visual conflitti (flash cerchio)
     show_conflict_flash: bool = True
@@ -65,3 +82,50 @@ def years_per_tick(cfg: SimConfig) -> float:
         "month": 1.0 / 12.0,
         "day": 1.0 / 365.0
     }.get(cfg.time_unit, 1.0 / 12.0)
+
+
+@lru_cache(maxsize=256)
+def per_tick_prob(p_annual: float, yp: float) -> float:
+    # converte probabilità annuale in probabilità per tick che dura yp anni
+    return 1.0 - (1.0 - p_annual) ** yp
+
+
+def config_from_mapping(data: Mapping[str, Any], base: SimConfig | None = None) -> SimConfig:
+    """
+    SimConfig da un dizionario (es. TOML): chiavi = nomi dei campi, le assenti restano
+    quelle di `base` (o i default). Chiavi sconosciute o tipi incompatibili -> ValueError.
+    """
+    types = {f.name: f.type for f in fields(SimConfig)}
+    values = dict(vars(base)) if base is not None else {}
+    for key, val in data.items():
+        if key not in types:
+            raise ValueError(f"parametro sconosciuto in configurazione: {key!r}")
+        t = types[key]
+        if t in (float, "float") and isinstance(val, int) and not isinstance(val, bool):
+            val = float(val)
+        expected = {"int": int, "float": float, "bool": bool, "str": str}.get(t, t)
+        if not isinstance(val, expected) or (expected is int and isinstance(val, bool)):
+            raise ValueError(f"{key}: atteso {expected.__name__}, trovato {type(val).__name__}")
+        values[key] = val
+    return SimConfig(**values)
+
+
+def read_toml(path: str) -> dict:
+    """Contenuto di un file TOML (tomllib, oppure tomli su Python 3.10)."""
+    try:
+        import tomllib
+    except ModuleNotFoundError:  # Python 3.10
+        import tomli as tomllib
+    with open(path, "rb") as fh:
+        return tomllib.load(fh)
+
+
+def load_config(path: str) -> tuple[SimConfig, dict]:
+    """
+    Legge un file TOML (es. experiments/configs/default.toml). Le chiavi di primo livello
+    sono campi di SimConfig; la tabella opzionale [run] (ticks, seconds, ...) viene
+    restituita a parte per i runner headless.
+    """
+    data = read_toml(path)
+    run = data.pop("run", {})
+    return config_from_mapping(data), run
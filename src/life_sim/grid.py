@@ -1,10 +1,230 @@
 from __future__ import annotations
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from .store import AgentStore
+
+if TYPE_CHECKING:
+    from .agent import Agent
+    from .world import World
 
 @dataclass
 class SpatialHash:
+    """
+    Indice spaziale persistente a liste concatenate per bucket (cell-linked list).
+    Le righe sono le posizioni degli agenti nella lista / nello store: head[b] è la
+    prima riga del bucket b, next/prev collegano le righe dello stesso bucket (-1 = fine).
+    Un bucket copre cell×cell celle della griglia; per le ricerche per cella esatta
+    si percorre la catena del bucket filtrando su xs/ys.
+    """
     cell: int = 16  # bucket size
+    width: int = 0
+    height: int = 0
+
+    n: int = 0
+    head: np.ndarray = field(default=None, repr=False)
+    next: np.ndarray = field(default=None, repr=False)
+    prev: np.ndarray = field(default=None, repr=False)
+    bucket: np.ndarray = field(default=None, repr=False)
+    xs: np.ndarray = field(default=None, repr=False)
+    ys: np.ndarray = field(default=None, repr=False)
+    generation: int = 0  # World.generation della popolazione indicizzata
+
+    def __post_init__(self) -> None:
+        self.cell = max(1, int(self.cell))
+        self.bw = -(-self.width // self.cell)
+        self.bh = -(-self.height // self.cell)
+        self.head = np.full(self.bw * self.bh, -1, dtype=np.int32)
+        self._alloc(16)
 
     def key(self, x: int, y: int) -> tuple[int, int]:
         return (x // self.cell, y // self.cell)
+
+    def bucket_of(self, x, y):
+        """Indice lineare del bucket (scalari o array)."""
+        return (y // self.cell) * self.bw + x // self.cell
+
+    def first(self, x: int, y: int) -> int:
+        """Prima riga nel bucket che contiene la cella (x, y), -1 se vuoto."""
+        return self.head[(y // self.cell) * self.bw + x // self.cell]
+
+    # ---- gestione memoria ----
+    def _alloc(self, cap: int) -> None:
+        old_n = self.n if self.next is not None else 0
+        arrays = {}
+        for name in ("next", "prev", "bucket", "xs", "ys"):
+            new = np.full(cap, -1, dtype=np.int32)
+            old = getattr(self, name)
+            if old is not None:
+                new[:old_n] = old[:old_n]
+            arrays[name] = new
+        for name, arr in arrays.items():
+            setattr(self, name, arr)
+
+    def _reserve(self, n: int) -> None:
+        if n > len(self.next):
+            self._alloc(max(n, 2 * len(self.next)))
+
+    # ---- ricollegamento in blocco (vettoriale) ----
+    def _unlink_rows(self, rows: np.ndarray) -> None:
+        """Stacca le righe `rows` dalle loro catene, anche se vicine nella stessa catena."""
+        n = self.n
+        # next/prev con un terminatore in coda: l'indice -1 punta lì e resta -1
+        nxt = np.append(self.next[:n], -1)
+        prv = np.append(self.prev[:n], -1)
+        gone = np.zeros(n + 1, dtype=bool)
+        gone[rows] = True
+        # per ogni riga tolta, la prima superstite avanti e indietro (salti raddoppiati)
+        for link in (nxt, prv):
+            r = rows
+            while len(r):
+                r = r[gone[link[r]]]
+                link[r] = link[link[r]]
+        p, q = prv[rows], nxt[rows]
+        self.next[p[p >= 0]] = q[p >= 0]
+        self.head[self.bucket[rows[p < 0]]] = q[p < 0]
+        self.prev[q[q >= 0]] = p[q >= 0]
+
+    def _link_rows(self, rows: np.ndarray, b: np.ndarray) -> None:
+        """Mette le righe `rows` in testa ai bucket `b`, in ordine crescente di riga."""
+        if len(rows) == 0:
+            return
+        order = np.argsort(b, kind="stable")
+        r, sb = rows[order].astype(np.int32), b[order]
+        same = sb[1:] == sb[:-1]
+        first = np.r_[True, ~same]
+        last = np.r_[~same, True]
+        self.next[r[:-1]] = np.where(same, r[1:], -1)
+        self.prev[r[1:]] = np.where(same, r[:-1], -1)
+        self.prev[r[0]] = -1
+        # l'ultima riga di ogni gruppo si aggancia alla vecchia catena del bucket
+        tail, old = r[last], self.head[sb[last]]
+        self.next[tail] = old
+        self.prev[old[old >= 0]] = tail[old >= 0]
+        self.head[sb[first]] = r[first]
+        self.bucket[rows] = b
+
+    # ---- operazioni in blocco ----
+    def rebuild(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """Ricostruzione completa (vettoriale): catene in ordine crescente di riga."""
+        n = len(xs)
+        self._reserve(n)
+        self.n = n
+        self.head.fill(-1)
+        if n == 0:
+            return
+        self.xs[:n] = xs
+        self.ys[:n] = ys
+        b = self.bucket_of(self.xs[:n], self.ys[:n])
+        self.bucket[:n] = b
+        order = np.argsort(b, kind="stable").astype(np.int32)
+        sb = b[order]
+        same = sb[1:] == sb[:-1]
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = ~same
+        self.head[sb[starts]] = order[starts]
+        self.next[order[:-1]] = np.where(same, order[1:], -1)
+        self.next[order[-1]] = -1
+        self.prev[order[1:]] = np.where(same, order[:-1], -1)
+        self.prev[order[0]] = -1
+
+    def update(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """Dopo il movimento: ricollega in blocco solo le righe che hanno cambiato bucket."""
+        n = self.n
+        self.xs[:n] = xs
+        self.ys[:n] = ys
+        b = self.bucket_of(self.xs[:n], self.ys[:n])
+        changed = np.flatnonzero(b != self.bucket[:n])
+        # quasi tutti fuori dal proprio bucket: la ricostruzione costa meno del ricollegamento
+        if 4 * len(changed) > 3 * n:
+            self.rebuild(self.xs[:n].copy(), self.ys[:n].copy())
+        elif len(changed):
+            self._unlink_rows(changed)
+            self._link_rows(changed, b[changed])
+
+    def remove(self, keep: np.ndarray) -> None:
+        """Toglie le righe con keep False e rinumera le superstiti come fa la compattazione."""
+        keep = np.asarray(keep, dtype=bool)
+        n = self.n
+        dead = np.flatnonzero(~keep)
+        if len(dead) == 0:
+            return
+        self._unlink_rows(dead)
+        # remap[-1] == -1: i terminatori restano tali
+        remap = np.empty(n + 1, dtype=np.int32)
+        remap[:n] = np.cumsum(keep) - 1
+        remap[n] = -1
+        alive = np.flatnonzero(keep)
+        m = len(alive)
+        self.head = remap[self.head]
+        self.next[:m] = remap[self.next[alive]]
+        self.prev[:m] = remap[self.prev[alive]]
+        for name in ("bucket", "xs", "ys"):
+            arr = getattr(self, name)
+            arr[:m] = arr[alive]
+        self.n = m
+
+    # ---- snapshot ----
+    def state(self) -> dict[str, np.ndarray]:
+        """Array che descrivono l'indice (catene comprese), per World.save."""
+        n = self.n
+        return {
+            "shape": np.array([self.cell, self.width, self.height, n], dtype=np.int64),
+            "head": self.head, "next": self.next[:n], "prev": self.prev[:n],
+            "bucket": self.bucket[:n], "xs": self.xs[:n], "ys": self.ys[:n],
+        }
+
+    @classmethod
+    def from_state(cls, state) -> "SpatialHash":
+        cell, width, height, n = (int(v) for v in state["shape"])
+        index = cls(cell=cell, width=width, height=height)
+        index._reserve(n)
+        index.n = n
+        index.head[:] = state["head"]
+        for name in ("next", "prev", "bucket", "xs", "ys"):
+            getattr(index, name)[:n] = state[name]
+        return index
+
+    def append(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """Aggiunge righe in coda (nuovi nati)."""
+        k = len(xs)
+        start = self.n
+        self._reserve(start + k)
+        self.xs[start:start + k] = xs
+        self.ys[start:start + k] = ys
+        self.n = start + k
+        self._link_rows(np.arange(start, self.n), self.bucket_of(self.xs[start:self.n], self.ys[start:self.n]))
+
+
+def positions(agents: list[Agent] | AgentStore) -> tuple[np.ndarray, np.ndarray]:
+    if isinstance(agents, AgentStore):
+        return agents.x, agents.y
+    n = len(agents)
+    return (np.fromiter((a.x for a in agents), dtype=np.int32, count=n),
+            np.fromiter((a.y for a in agents), dtype=np.int32, count=n))
+
+
+def spatial_index(world: World, agents: list[Agent] | AgentStore) -> SpatialHash:
+    """
+    Indice spaziale del mondo, allineato alla popolazione. I sistemi che spostano,
+    tolgono o aggiungono agenti lo aggiornano in modo incrementale (tracked_index);
+    se manca, ha un numero di righe diverso o è di una generazione precedente
+    (World.replace_population) viene ricostruito. Il controllo costa O(1).
+    """
+    index = world.index
+    if index is None or index.generation != world.generation:
+        cfg = world.cfg
+        index = world.index = SpatialHash(cell=cfg.spatial_bucket, width=cfg.width,
+                                          height=cfg.height, generation=world.generation)
+        index.rebuild(*positions(agents))
+    elif index.n != len(agents):
+        index.rebuild(*positions(agents))
+    return index
+
+
+def tracked_index(world: World, n: int) -> SpatialHash | None:
+    """Indice da aggiornare dopo una modifica su n righe (None se non ancora costruito)."""
+    index = world.index
+    if index is None or index.n != n:
+        return None
+    return index
@@ -0,0 +1,130 @@
+"""
+Log delle metriche per tick, a colonne e solo in append.
+
+Un log è una cartella con un file binario grezzo per colonna (<nome>.bin, little
+endian) e schema.json con nomi e dtype. Le righe si accumulano in un blocco in
+memoria e vengono scritte su disco un blocco alla volta, quindi registrare un tick
+costa qualche assegnazione in un array. Ogni colonna è leggibile con np.memmap
+anche mentre il run è in corso (read_metrics): si vedono i blocchi già scritti.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Any, Mapping
+
+import numpy as np
+
+# colonna -> dtype su disco
+METRIC_FIELDS: dict[str, np.dtype] = {
+    "tick": np.dtype("<i8"),
+    "population": np.dtype("<i8"),
+    "births": np.dtype("<i8"),
+    "deaths_starvation": np.dtype("<i8"),
+    "deaths_age": np.dtype("<i8"),
+    "deaths_disease": np.dtype("<i8"),
+    "deaths_conflict": np.dtype("<i8"),
+    "infected": np.dtype("<i8"),
+    "conflicts": np.dtype("<i8"),
+    "mean_energy": np.dtype("<f8"),
+    "mean_age": np.dtype("<f8"),
+}
+
+
+def metrics_row(tick: int, info: Mapping[str, Any]) -> dict[str, Any]:
+    """Riga del log dal dict `info` di scheduler.step (aggregati in info["population"])."""
+    d = info["deaths"]
+    pop = info["population"]
+    return {
+        "tick": tick, "population": pop.n, "births": info["births"],
+        "deaths_starvation": d.get("starvation", 0), "deaths_age": d.get("age", 0),
+        "deaths_disease": d.get("disease", 0), "deaths_conflict": d.get("conflict", 0),
+        "infected": info["infected"], "conflicts": info["conflicts"],
+        "mean_energy": pop.energy_mean, "mean_age": pop.age_mean,
+    }
+
+
+class MetricsLog:
+    """
+    Sink delle metriche: `record(tick, info)` dopo ogni tick, `close()` alla
+    fine (o usarlo come context manager). `block` righe per scrittura su disco.
+    Con append=True continua un log esistente; `resume_tick` scarta le righe successive
+    a quel tick (ripresa da uno snapshot più vecchio della fine del log).
+    """
+
+    def __init__(self, path: str, block: int = 4096, append: bool = False,
+                 resume_tick: int | None = None):
+        self.path = path
+        self.block = max(1, int(block))
+        os.makedirs(path, exist_ok=True)
+        schema_path = os.path.join(path, "schema.json")
+        schema = {name: dt.str for name, dt in METRIC_FIELDS.items()}
+        if append and os.path.exists(schema_path):
+            with open(schema_path) as fh:
+                if json.load(fh) != schema:
+                    raise ValueError(f"{path}: schema del log diverso da METRIC_FIELDS")
+            # scarta un eventuale blocco scritto a metà da un crash
+            rows = _complete_rows(path)
+            if resume_tick is not None and rows:
+                ticks = np.fromfile(os.path.join(path, "tick.bin"), dtype=METRIC_FIELDS["tick"],
+                                    count=rows)
+                rows = int(np.searchsorted(ticks, resume_tick, side="right"))
+            for name, dt in METRIC_FIELDS.items():
+                with open(os.path.join(path, f"{name}.bin"), "ab") as fh:
+                    fh.truncate(rows * dt.itemsize)
+        else:
+            with open(schema_path, "w") as fh:
+                json.dump(schema, fh)
+            for name in METRIC_FIELDS:
+                open(os.path.join(path, f"{name}.bin"), "wb").close()
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), "ab") for name in METRIC_FIELDS}
+        self._buf = {name: np.zeros(self.block, dtype=dt) for name, dt in METRIC_FIELDS.items()}
+        self._k = 0
+
+    def append(self, row: Mapping[str, Any]) -> None:
+        k = self._k
+        for name, buf in self._buf.items():
+            buf[k] = row[name]
+        self._k = k + 1
+        if self._k == self.block:
+            self.flush()
+
+    def record(self, tick: int, info: Mapping[str, Any]) -> None:
+        self.append(metrics_row(tick, info))
+
+    def flush(self) -> None:
+        """Scrive su disco le righe in blocco (chiamato da sé a blocco pieno)."""
+        k = self._k
+        if k == 0:
+            return
+        for name, fh in self._files.items():
+            fh.write(self._buf[name][:k].tobytes())
+            fh.flush()
+        self._k = 0
+
+    def close(self) -> None:
+        if self._files:
+            self.flush()
+            for fh in self._files.values():
+                fh.close()
+            self._files = {}
+
+    def __enter__(self) -> "MetricsLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _complete_rows(path: str) -> int:
+    # righe presenti in tutte le colonne (un writer attivo può essere a metà blocco)
+    return min(os.path.getsize(os.path.join(path, f"{name}.bin")) // dt.itemsize
+               for name, dt in METRIC_FIELDS.items())
+
+
+def read_metrics(path: str) -> dict[str, np.ndarray]:
+    """Colonne del log come np.memmap in sola lettura (vuote se non c'è ancora nulla)."""
+    rows = _complete_rows(path)
+    if rows == 0:
+        return {name: np.zeros(0, dtype=dt) for name, dt in METRIC_FIELDS.items()}
+    return {name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dt, mode="r", shape=(rows,))
+            for name, dt in METRIC_FIELDS.items()}
@@ -0,0 +1,387 @@
+"""
+Esecuzione multi-processo per decomposizione del dominio.
+
+    python -m life_sim.run experiments/configs/default.toml --workers 4
+
+La mappa è divisa in strisce orizzontali di righe [y0, y1), ognuna posseduta da un
+processo worker con il proprio AgentStore. Il cibo (e food_tick in modalità lazy) sta
+in memoria condivisa: ogni worker rigenera e consuma solo le righe della sua striscia,
+quindi non servono lock. Per ogni tick:
+
+- dopo step_movement gli agenti usciti dalla striscia (al più una riga, il passo è ±1)
+  migrano al vicino sopra o sotto, con tutte le colonne;
+- prima del conflitto i vicini si scambiano un alone di una riga: l'occupazione dei
+  tre livelli del conflitto (mangiatori, affamati, forti) nella riga di bordo, vedi
+  conflict.conflict_halo. Il vicinato di Moore resta così esatto anche sul confine.
+  Il conflitto usa sempre la variante a griglia (step_conflict_strip);
+- l'accoppiamento avviene tra agenti della stessa cella, e ogni cella ha un solo
+  proprietario: dopo la migrazione le coppie sono tutte locali, senza alone;
+- ogni worker restituisce i propri aggregati (PopulationStats) e il coordinatore li
+  unisce con stats.merge_stats, insieme a nascite, morti e conflitti.
+
+Gli scambi tra strisce vicine passano per pipe dirette (non per il coordinatore).
+Con rng_mode "sequential" ogni worker ha un RNG indipendente derivato da (seed, rank):
+la traiettoria è riproducibile a parità di seed e numero di worker, ma non coincide
+con quella del processo singolo (le regole sì); gli id dei nuovi nati sono
+interlacciati per rank. Con rng_mode "counter" (rng.py) le estrazioni dipendono solo
+da (seed, tick, sistema, id) e il risultato è identico a scheduler.step con
+conflict_mode "grid", qualunque sia il numero di worker.
+"""
+from __future__ import annotations
+import multiprocessing as mp
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+
+from .config import SimConfig
+from .grid import tracked_index
+from .population import init_store
+from .rng import RNG
+from .scheduler import _engine_systems
+from .stats import merge_stats, population_stats
+from .store import AgentStore
+from .systems.aging import step_aging
+from .systems.conflict import conflict_halo, step_conflict_strip
+from .systems.disease import step_disease
+from .systems.mortality import step_mortality
+from .systems.resources import step_resources
+from .world import World
+
+
+def strip_bounds(height: int, workers: int) -> list[tuple[int, int]]:
+    """Righe [y0, y1) di ogni worker: strisce contigue di altezza quasi uguale."""
+    edges = [height * k // workers for k in range(workers + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def stream_seed(seed: int, rank: int) -> int:
+    """Seed indipendente per il worker `rank` (SeedSequence su (seed, rank))."""
+    return int(np.random.SeedSequence([seed, rank]).generate_state(1)[0])
+
+
+@dataclass(frozen=True)
+class _SharedArray:
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    def attach(self) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+        shm = shared_memory.SharedMemory(name=self.name)
+        return shm, np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+
+def _share(a: np.ndarray) -> tuple[shared_memory.SharedMemory, _SharedArray]:
+    shm = shared_memory.SharedMemory(create=True, size=max(1, a.nbytes))
+    np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+    return shm, _SharedArray(shm.name, a.shape, a.dtype.str)
+
+
+# ---------------------------------------------------------------- worker
+
+class _Strip:
+    """Stato di un worker: la sua striscia, gli agenti che contiene e i link ai vicini."""
+
+    def __init__(self, rank: int, workers: int, cfg: SimConfig, bounds: tuple[int, int],
+                 food: np.ndarray, food_tick: np.ndarray | None, ticks: tuple[int, int],
+                 columns: dict[str, np.ndarray], id_base: int, up, down):
+        self.rank, self.workers = rank, workers
+        self.y0, self.y1 = bounds
+        self.up, self.down = up, down
+        rng = RNG(cfg.seed) if cfg.rng_mode == "counter" else RNG(stream_seed(cfg.seed, rank))
+        self.world = World(cfg=cfg, rng=rng, food=food, food_tick=food_tick,
+                           tick=ticks[0], resource_tick=ticks[1])
+        self.store = AgentStore(capacity=len(columns["id"]))
+        self.store.extend(columns)
+        self.id_base = id_base
+        self.born = 0
+
+    def _exchange(self, to_up, to_down):
+        """Invia ai due vicini e riceve da entrambi; l'invio in un thread evita lo stallo."""
+        def send() -> None:
+            if self.up is not None:
+                self.up.send(to_up)
+            if self.down is not None:
+                self.down.send(to_down)
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        from_down = self.down.recv() if self.down is not None else None
+        from_up = self.up.recv() if self.up is not None else None
+        sender.join()
+        return from_up, from_down
+
+    def _migrate(self) -> None:
+        cfg = self.world.cfg
+        store = self.store
+        d = (store.y.astype(np.int64) - self.y0) % cfg.height
+        out = d >= self.y1 - self.y0
+        # toroidale: la riga y0-1 (avvolta) è del vicino sopra; altrimenti basta il segno
+        go_up = out & ((d == cfg.height - 1) if cfg.toroidal else (store.y < self.y0))
+        go_down = out & ~go_up
+        to_up = {name: col[go_up] for name, col in store.columns().items()}
+        to_down = {name: col[go_down] for name, col in store.columns().items()}
+        if out.any():
+            index = tracked_index(self.world, len(store))
+            store.keep(~out)
+            if index is not None:
+                index.remove(~out)
+        for incoming in self._exchange(to_up, to_down):
+            if incoming is None or len(incoming["id"]) == 0:
+                continue
+            index = tracked_index(self.world, len(store))
+            rows = store.extend(incoming)
+            if index is not None:
+                index.append(store.x[rows], store.y[rows])
+
+    def _new_ids(self, k: int) -> np.ndarray:
+        # id interlacciati per rank: id_base + (contatore locale) * workers + rank
+        ids = self.id_base + (self.born + np.arange(k, dtype=np.int64)) * self.workers + self.rank
+        self.born += k
+        return ids
+
+    def step(self) -> dict:
+        world = self.world
+        cfg = world.cfg
+        movement, foraging, _, reproduction = _engine_systems(cfg.engine, self.store)
+
+        if world.food_tick is None:
+            step_resources(world, rows=slice(self.y0, self.y1))
+        else:
+            step_resources(world)
+        movement(world, self.store)
+        self._migrate()
+        foraging(world, self.store)
+        step_aging(cfg, self.store)
+        step_disease(world, self.store)
+
+        halos = self._exchange(
+            conflict_halo(cfg, self.store, self.y0) if self.up is not None else None,
+            conflict_halo(cfg, self.store, self.y1 - 1) if self.down is not None else None)
+        self.store, deaths_conflict, attempts, positions = step_conflict_strip(
+            world, self.store, self.y0, self.y1, *halos)
+
+        n = len(self.store)
+        self.store, births = reproduction(world, self.store)
+        if births and cfg.rng_mode != "counter":
+            self.store.id[n:] = self._new_ids(births)
+        self.store, deaths = step_mortality(world, self.store)
+        deaths["conflict"] = deaths.get("conflict", 0) + deaths_conflict
+        world.tick += 1
+        return {
+            "births": births,
+            "deaths": deaths,
+            "conflicts": attempts,
+            "conflict_positions": positions,
+            "population": population_stats(cfg, self.store),
+        }
+
+
+def _worker(rank: int, workers: int, cfg: SimConfig, bounds: tuple[int, int],
+            food: _SharedArray, food_tick: _SharedArray | None, ticks: tuple[int, int],
+            columns: dict[str, np.ndarray], id_base: int, conn, up, down) -> None:
+    shms = []
+    shm, food_arr = food.attach()
+    shms.append(shm)
+    tick_arr = None
+    if food_tick is not None:
+        shm, tick_arr = food_tick.attach()
+        shms.append(shm)
+    strip = _Strip(rank, workers, cfg, bounds, food_arr, tick_arr, ticks,
+                   columns, id_base, up, down)
+    del food_arr, tick_arr
+    try:
+        while True:
+            cmd = conn.recv()
+            if cmd == "step":
+                conn.send(("ok", strip.step()))
+            elif cmd == "gather":
+                conn.send(("ok", strip.store.columns()))
+            elif cmd == "stop":
+                break
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        strip.world.food = strip.world.food_tick = None
+        for shm in shms:
+            shm.close()
+
+
+# ---------------------------------------------------------------- coordinatore
+
+class ParallelSim:
+    """
+    Coordinatore dei worker a strisce. `world` (opzionale, default World.create) fornisce
+    mappa e configurazione: dopo la costruzione world.food è la vista sulla memoria
+    condivisa e riflette lo stato dei worker tra un tick e l'altro.
+    Va chiuso con close() (o usato come context manager).
+    """
+
+    def __init__(self, cfg: SimConfig, workers: int, world: World | None = None,
+                 agents: AgentStore | None = None):
+        if workers < 2:
+            raise ValueError("workers deve essere almeno 2 (con 1 si usa scheduler.step)")
+        if cfg.height < workers:
+            raise ValueError(f"height={cfg.height} troppo piccola per {workers} strisce")
+        if cfg.food_backend != "dense":
+            raise ValueError("l'esecuzione a strisce richiede food_backend='dense'")
+        if world is None:
+            world = World.create(cfg)
+        if world.backend.resident:
+            raise ValueError("l'esecuzione a strisce condivide la mappa in memoria host: "
+                             "usare compute_backend='cpu'")
+        if agents is None:
+            agents = init_store(cfg, world)
+        self.cfg = cfg
+        self.world = world
+        self.workers = workers
+        self.bounds = strip_bounds(cfg.height, workers)
+
+        self._shms: list[shared_memory.SharedMemory] = []
+        shm, food_desc = _share(world.food)
+        self._shms.append(shm)
+        world.food = np.ndarray(world.food.shape, dtype=world.food.dtype, buffer=shm.buf)
+        tick_desc = None
+        if world.food_tick is not None:
+            shm, tick_desc = _share(world.food_tick)
+            self._shms.append(shm)
+            world.food_tick = np.ndarray(world.food_tick.shape, dtype=world.food_tick.dtype,
+                                         buffer=shm.buf)
+
+        ctx = mp.get_context()
+        # link k: confine tra la striscia k (sotto) e la k+1 (sopra), avvolto se toroidale
+        links = [ctx.Pipe() for _ in range(workers if cfg.toroidal else workers - 1)]
+        self._conns = []
+        self._procs = []
+        for rank, (y0, y1) in enumerate(self.bounds):
+            down = links[rank][0] if rank < len(links) else None
+            up = links[rank - 1][1] if (rank > 0 or cfg.toroidal) else None
+            sel = (agents.y >= y0) & (agents.y < y1)
+            columns = {name: col[sel] for name, col in agents.columns().items()}
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, daemon=True, name=f"life_sim-strip{rank}",
+                               args=(rank, workers, cfg, (y0, y1), food_desc, tick_desc,
+                                     (world.tick, world.resource_tick), columns, agents.next_id,
+                                     child, up, down))
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+        for a, b in links:
+            a.close()
+            b.close()
+
+    def _call(self, cmd: str) -> list:
+        for conn in self._conns:
+            conn.send(cmd)
+        replies = []
+        for rank, conn in enumerate(self._conns):
+            status, payload = conn.recv()
+            if status != "ok":
+                self.close()
+                raise RuntimeError(f"worker {rank} fallito:\n{payload}")
+            replies.append(payload)
+        return replies
+
+    def step(self) -> dict:
+        """Un tick su tutte le strisce; info come scheduler.step (senza "timings")."""
+        parts = self._call("step")
+        self.world.tick += 1
+        if self.world.food_tick is not None:
+            self.world.resource_tick += 1
+        deaths: dict[str, int] = {}
+        for p in parts:
+            for cause, k in p["deaths"].items():
+                deaths[cause] = deaths.get(cause, 0) + k
+        pop = merge_stats([p["population"] for p in parts])
+        return {
+            "births": sum(p["births"] for p in parts),
+            "deaths": deaths,
+            "infected": pop.infected,
+            "population": pop,
+            "conflicts": sum(p["conflicts"] for p in parts),
+            "conflict_positions": [pos for p in parts for pos in p["conflict_positions"]],
+        }
+
+    def gather(self) -> AgentStore:
+        """Copia dell'intera popolazione (strisce in ordine di rank)."""
+        parts = self._call("gather")
+        store = AgentStore(capacity=sum(len(p["id"]) for p in parts))
+        for p in parts:
+            store.extend(p)
+        return store
+
+    def close(self) -> None:
+        if not self._procs:
+            return
+        for conn, proc in zip(self._conns, self._procs):
+            try:
+                if proc.is_alive():
+                    conn.send("stop")
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        for conn in self._conns:
+            conn.close()
+        self._procs, self._conns = [], []
+        # il mondo resta utilizzabile: copia privata dello stato finale
+        self.world.food = np.array(self.world.food)
+        if self.world.food_tick is not None:
+            self.world.food_tick = np.array(self.world.food_tick)
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
+
+    def __enter__(self) -> "ParallelSim":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def run_parallel(cfg: SimConfig, workers: int, ticks: int | None = None,
+                 seconds: float | None = None,
+                 on_tick: Callable[[int, None, dict], None] | None = None):
+    """
+    Come run.run, ma su `workers` processi a strisce. `on_tick(tick, None, info)`: la
+    popolazione non è disponibile tick per tick (info["population"] sì); RunResult.final
+    contiene la popolazione raccolta a fine run.
+    """
+    from .run import RunResult
+
+    if ticks is None and seconds is None:
+        ticks = 100
+    res = RunResult()
+    with ParallelSim(cfg, workers) as sim:
+        pop = None
+        t0 = time.perf_counter()
+        deadline = t0 + seconds if seconds is not None else None
+        while ticks is None or res.ticks < ticks:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if pop is not None and pop.n == 0:
+                break
+            info = sim.step()
+            res.ticks += 1
+            res.births += info["births"]
+            for cause, k in info["deaths"].items():
+                res.deaths[cause] = res.deaths.get(cause, 0) + k
+            res.infected = info["infected"]
+            pop = info["population"]
+            if on_tick is not None:
+                on_tick(res.ticks, None, info)
+        res.elapsed_s = time.perf_counter() - t0
+        res.final = sim.gather()
+    res.population = len(res.final)
+    if pop is not None:
+        res.mean_energy, res.mean_age = pop.energy_mean, pop.age_mean
+    return res
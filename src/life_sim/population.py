@@ -0,0 +1,27 @@
+from __future__ import annotations
+from .agent import Agent
+from .config import SimConfig
+from .store import AgentStore
+from .world import World
+
+def init_agents(cfg: SimConfig, world: World) -> list[Agent]:
+    """Popolazione iniziale (sesso, età normale, infetti) estratta dall'RNG del mondo."""
+    rng = world.rng.py
+    np_rng = world.rng.np
+    agents: list[Agent] = []
+    mu = cfg.initial_age_median_years
+    sigma = max(0.0, cfg.initial_age_spread_years)
+    for i in range(cfg.initial_agents):
+        sex = "M" if rng.random() < 0.5 else "F"
+        age = float(np_rng.normal(mu, sigma)) if sigma > 0 else mu
+        age = max(0.0, min(age, 0.95 * 80.0))
+        infected = (rng.random() < cfg.initial_infected_pct)
+        agents.append(Agent(
+            id=i, x=rng.randrange(cfg.width), y=rng.randrange(cfg.height),
+            sex=sex, age_years=age, infected=infected
+        ))
+    return agents
+
+def init_store(cfg: SimConfig, world: World) -> AgentStore:
+    """Come init_agents, ma già in formato a colonne (stessa sequenza casuale)."""
+    return AgentStore.from_agents(init_agents(cfg, world))
@@ -0,0 +1,123 @@
+"""
+Strumentazione opzionale di scheduler.step: tempo, memoria allocata e numero di
+agenti per sistema e per tick, in un buffer circolare.
+
+    world.profiler = StepProfiler()            # attiva (None = nessun costo)
+    agents, info = step(world, agents)
+    info["timings"]                            # {sistema: {"ms", "alloc_kb", "agents"}}
+    world.profiler.dump("profile.csv")
+    world.profiler.close()                     # ferma tracemalloc (con track_alloc=True)
+
+Con track_alloc=True la memoria è il picco allocato durante il sistema, misurato con
+tracemalloc (NumPy vi registra i suoi buffer); rallenta il tick, quindi è separato.
+"""
+from __future__ import annotations
+import csv
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+
+SYSTEMS = ("resources", "movement", "foraging", "aging", "disease",
+           "conflict", "reproduction", "mortality", "stats")
+
+
+class StepProfiler:
+    def __init__(self, capacity: int = 4096, track_alloc: bool = False):
+        self.capacity = max(1, int(capacity))
+        self.track_alloc = track_alloc
+        k = len(SYSTEMS)
+        self._col = {name: j for j, name in enumerate(SYSTEMS)}
+        self.ticks = np.zeros(self.capacity, dtype=np.int64)
+        self.seconds = np.zeros((self.capacity, k), dtype=np.float64)
+        self.alloc = np.zeros((self.capacity, k), dtype=np.int64)
+        self.agents = np.zeros((self.capacity, k), dtype=np.int64)
+        self.count = 0  # tick registrati in totale (la riga corrente è count % capacity)
+        # tracemalloc rallenta tutto il processo: lo ferma close() se l'ha avviato questo profilo
+        self._started_tracing = track_alloc and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def close(self) -> None:
+        """Ferma tracemalloc se l'ha avviato questo profilo (i dati restano leggibili)."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> "StepProfiler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def begin_tick(self) -> None:
+        row = self.count % self.capacity
+        self.ticks[row] = self.count + 1
+        self.seconds[row] = 0.0
+        self.alloc[row] = 0
+        self.agents[row] = 0
+
+    def end_tick(self) -> None:
+        self.count += 1
+
+    @contextmanager
+    def measure(self, name: str, n_agents: int) -> Iterator[None]:
+        row, j = self.count % self.capacity, self._col[name]
+        if self.track_alloc:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[row, j] += time.perf_counter() - t0
+            if self.track_alloc:
+                self.alloc[row, j] += tracemalloc.get_traced_memory()[1] - base
+            self.agents[row, j] = n_agents
+
+    # ---- lettura ----
+    def _rows(self) -> np.ndarray:
+        """Righe valide in ordine cronologico."""
+        n = min(self.count, self.capacity)
+        start = self.count - n
+        return (np.arange(start, self.count) % self.capacity).astype(np.int64)
+
+    def last(self) -> dict[str, dict[str, float]]:
+        if self.count == 0:
+            return {}
+        row = (self.count - 1) % self.capacity
+        return {name: {"ms": 1e3 * float(self.seconds[row, j]),
+                       "alloc_kb": float(self.alloc[row, j]) / 1024.0,
+                       "agents": int(self.agents[row, j])}
+                for name, j in self._col.items()}
+
+    def mean_ms(self, window: int | None = None) -> dict[str, float]:
+        """Tempo medio per sistema sugli ultimi `window` tick (default: tutto il buffer)."""
+        rows = self._rows()
+        if window is not None:
+            rows = rows[-window:]
+        if len(rows) == 0:
+            return {name: 0.0 for name in SYSTEMS}
+        means = self.seconds[rows].mean(axis=0) * 1e3
+        return {name: float(means[j]) for name, j in self._col.items()}
+
+    def summary(self) -> str:
+        means = self.mean_ms()
+        total = sum(means.values()) or 1.0
+        lines = [f"Tempo medio per sistema (ultimi {min(self.count, self.capacity)} tick):"]
+        for name, ms in sorted(means.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {name:<13}{ms:9.3f} ms  {100 * ms / total:5.1f}%")
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """CSV in formato lungo: tick, sistema, ms, byte allocati, agenti."""
+        with open(path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["tick", "system", "ms", "alloc_bytes", "agents"])
+            for row in self._rows().tolist():
+                tick = int(self.ticks[row])
+                for name, j in self._col.items():
+                    writer.writerow([tick, name, f"{1e3 * self.seconds[row, j]:.4f}",
+                                     int(self.alloc[row, j]), int(self.agents[row, j])])
@@ -1,11 +1,153 @@
+"""
+Generatori casuali della simulazione.
+
+RNG.py / RNG.np sono i generatori sequenziali (random.Random e np.random.Generator)
+usati con SimConfig.rng_mode = "sequential": i numeri vengono consumati nell'ordine
+di iterazione, quindi ogni riordino o vettorizzazione cambia la traiettoria.
+
+Con rng_mode = "counter" i sistemi estraggono invece da CounterStream: ogni numero
+è Philox4x32-10 applicato al contatore (id agente, tick, sistema, indice di
+estrazione) con chiave il seed. L'esito per un agente in un tick non dipende da chi
+lo calcola né in che ordine (lista, AgentStore, numba, strisce di parallel.py).
+"""
+from __future__ import annotations
 import random
 import numpy as np
 
+# codici di sistema nel contatore (16 bit): un flusso indipendente per sistema
+STREAMS: dict[str, int] = {
+    "movement": 1,
+    "disease": 2,
+    "conflict": 3,
+    "reproduction": 4,
+    "mortality": 5,
+}
+
+_MASK = 0xFFFFFFFF
+_M0, _M1 = 0xD2511F53, 0xCD9E8D57
+_W0, _W1 = 0x9E3779B9, 0xBB67AE85
+_ROUNDS = 10
+_TO_DOUBLE = 1.0 / 9007199254740992.0  # 2**-53
+
+
+def philox4x32(c0, c1, c2, c3, k0: int, k1: int):
+    """
+    Philox4x32-10 (Salmon et al., SC'11) su array di parole a 32 bit in uint64:
+    ritorna le quattro parole del blocco cifrato.
+    """
+    m0, m1 = np.uint64(_M0), np.uint64(_M1)
+    mask, shift = np.uint64(_MASK), np.uint64(32)
+    # operazioni sul posto: quattro parole + due prodotti, nessun temporaneo per round
+    c0, c1, c2, c3 = (np.array(c, dtype=np.uint64) for c in (c0, c1, c2, c3))
+    p0, p1 = np.empty_like(c0), np.empty_like(c0)
+    for _ in range(_ROUNDS):
+        np.multiply(c0, m0, out=p0)
+        np.multiply(c2, m1, out=p1)
+        np.right_shift(p1, shift, out=c0)
+        c0 ^= c1
+        c0 ^= np.uint64(k0)
+        np.right_shift(p0, shift, out=c2)
+        c2 ^= c3
+        c2 ^= np.uint64(k1)
+        np.bitwise_and(p1, mask, out=c1)
+        np.bitwise_and(p0, mask, out=c3)
+        k0 = (k0 + _W0) & _MASK
+        k1 = (k1 + _W1) & _MASK
+    return c0, c1, c2, c3
+
+
+def philox4x32_scalar(c0: int, c1: int, c2: int, c3: int, k0: int, k1: int
+                      ) -> tuple[int, int, int, int]:
+    """Stesso cifrario su interi Python: per le estrazioni singole del percorso per agente."""
+    for _ in range(_ROUNDS):
+        p0 = _M0 * c0
+        p1 = _M1 * c2
+        c0, c1, c2, c3 = (p1 >> 32) ^ c1 ^ k0, p1 & _MASK, (p0 >> 32) ^ c3 ^ k1, p0 & _MASK
+        k0 = (k0 + _W0) & _MASK
+        k1 = (k1 + _W1) & _MASK
+    return c0, c1, c2, c3
+
+
+class CounterStream:
+    """
+    Flusso di numeri per (seed, tick, sistema). Ogni agente ha le sue estrazioni,
+    indicizzate da `draw` (0, 1, 2, ...): due estrazioni consecutive condividono un
+    blocco Philox. Le versioni *1 restituiscono scalari per un singolo id.
+    """
+    __slots__ = ("k0", "k1", "tick", "code")
+
+    def __init__(self, seed: int, tick: int, system: str):
+        if system not in STREAMS:
+            raise ValueError(f"flusso sconosciuto: {system!r} (attesi {sorted(STREAMS)})")
+        self.k0 = seed & _MASK
+        self.k1 = (seed >> 32) & _MASK
+        self.tick = tick & _MASK
+        self.code = STREAMS[system]
+
+    def _words(self, ids: np.ndarray, draw: int) -> tuple[np.ndarray, np.ndarray]:
+        ids = np.asarray(ids, dtype=np.int64).astype(np.uint64)
+        c3 = np.uint64((self.code << 16) | (draw >> 1))
+        w = philox4x32(ids & np.uint64(_MASK), ids >> np.uint64(32),
+                       np.full(ids.shape, self.tick, dtype=np.uint64),
+                       np.full(ids.shape, c3, dtype=np.uint64), self.k0, self.k1)
+        return (w[0], w[1]) if draw % 2 == 0 else (w[2], w[3])
+
+    def uniform(self, ids: np.ndarray, draw: int = 0) -> np.ndarray:
+        """Un float64 in [0, 1) per ogni id (53 bit)."""
+        a, b = self._words(ids, draw)
+        return ((a >> np.uint64(5)) * np.uint64(67108864) + (b >> np.uint64(6))) * _TO_DOUBLE
+
+    def integers(self, ids: np.ndarray, low: int, high: int, draw: int = 0) -> np.ndarray:
+        """Un intero in [low, high) per ogni id."""
+        return low + (self.uniform(ids, draw) * (high - low)).astype(np.int64)
+
+    def bits(self, ids: np.ndarray, draw: int = 0) -> np.ndarray:
+        """64 bit casuali (uint64) per ogni id."""
+        a, b = self._words(ids, draw)
+        return (a << np.uint64(32)) | b
+
+    def uniform1(self, agent_id: int, draw: int = 0) -> float:
+        w = philox4x32_scalar(agent_id & _MASK, (agent_id >> 32) & _MASK, self.tick,
+                              (self.code << 16) | (draw >> 1), self.k0, self.k1)
+        a, b = (w[0], w[1]) if draw % 2 == 0 else (w[2], w[3])
+        return ((a >> 5) * 67108864 + (b >> 6)) * _TO_DOUBLE
+
+    def integers1(self, agent_id: int, low: int, high: int, draw: int = 0) -> int:
+        return low + int(self.uniform1(agent_id, draw) * (high - low))
+
+    def bits1(self, agent_id: int, draw: int = 0) -> int:
+        w = philox4x32_scalar(agent_id & _MASK, (agent_id >> 32) & _MASK, self.tick,
+                              (self.code << 16) | (draw >> 1), self.k0, self.k1)
+        a, b = (w[0], w[1]) if draw % 2 == 0 else (w[2], w[3])
+        return (a << 32) | b
+
+
 class RNG:
     def __init__(self, seed: int = 42):
+        self.seed = seed
         self.py = random.Random(seed)
         self.np = np.random.default_rng(seed)
 
     def reseed(self, seed: int) -> None:
+        self.seed = seed
         self.py.seed(seed)
         self.np = np.random.default_rng(seed)
+
+    def stream(self, system: str, tick: int) -> CounterStream:
+        """Flusso a contatore del sistema `system` al tick `tick` (vedi CounterStream)."""
+        return CounterStream(self.seed, tick, system)
+
+    def get_state(self) -> dict:
+        """Stato di entrambi i generatori, serializzabile in JSON (interi grandi inclusi)."""
+        version, internal, gauss = self.py.getstate()
+        return {
+            "py": [version, list(internal), gauss],
+            "np": self.np.bit_generator.state,
+        }
+
+    def set_state(self, state: dict) -> None:
+        version, internal, gauss = state["py"]
+        self.py.setstate((version, tuple(internal), gauss))
+        bit_gen = getattr(np.random, state["np"]["bit_generator"])()
+        bit_gen.state = state["np"]
+        self.np = np.random.Generator(bit_gen)
@@ -0,0 +1,210 @@
+"""
+Runner headless: `python -m life_sim.run experiments/configs/default.toml`.
+
+Costruisce SimConfig dal TOML, inizializza la popolazione come l'interfaccia pygame
+(population.init_store) e avanza per un numero di tick e/o un budget di tempo,
+senza importare pygame. Alla fine stampa tick/s e le metriche finali.
+
+Con --checkpoint DIR lo stato completo viene salvato ogni --checkpoint-every tick
+(e a fine run); --resume DIR riparte da lì con la stessa traiettoria.
+Con --workers N il mondo è diviso in N strisce su processi separati (parallel.py).
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable
+
+from .config import SimConfig, load_config
+from .metrics import MetricsLog
+from .profiling import StepProfiler
+from .population import init_store
+from .scheduler import step
+from .snapshot import load_snapshot, save_snapshot
+from .store import AgentStore
+from .world import World
+
+
+@dataclass
+class RunResult:
+    ticks: int = 0
+    elapsed_s: float = 0.0
+    population: int = 0
+    births: int = 0
+    deaths: dict[str, int] = field(default_factory=lambda: {
+        "starvation": 0, "age": 0, "disease": 0, "conflict": 0})
+    infected: int = 0
+    mean_energy: float = 0.0
+    mean_age: float = 0.0
+    final: AgentStore | None = field(default=None, repr=False)  # popolazione a fine run
+
+    @property
+    def ticks_per_s(self) -> float:
+        return self.ticks / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> str:
+        d = self.deaths
+        return "\n".join([
+            f"Tick eseguiti: {self.ticks} in {self.elapsed_s:.2f} s ({self.ticks_per_s:.1f} tick/s)",
+            f"Popolazione finale: {self.population} (infetti {self.infected})",
+            f"Nati totali: {self.births}",
+            f"Morti totali: {sum(d.values())} (fame {d['starvation']}, età {d['age']}, "
+            f"malattia {d['disease']}, conflitto {d['conflict']})",
+            f"Energia media: {self.mean_energy:.2f}  Età media: {self.mean_age:.2f} anni",
+        ])
+
+
+def run(cfg: SimConfig, ticks: int | None = None, seconds: float | None = None,
+        world: World | None = None, agents: AgentStore | None = None,
+        on_tick: Callable[[int, AgentStore, dict], None] | None = None) -> RunResult:
+    """
+    Esegue la simulazione finché non si raggiungono `ticks` o `seconds` (il primo dei due),
+    oppure la popolazione si estingue. Senza limiti esegue 100 tick.
+    `on_tick(tick, agents, info)` viene chiamato dopo ogni tick.
+    """
+    if ticks is None and seconds is None:
+        ticks = 100
+    if world is None:
+        world = World.create(cfg)
+    if agents is None:
+        agents = init_store(cfg, world)
+
+    res = RunResult()
+    t0 = time.perf_counter()
+    deadline = t0 + seconds if seconds is not None else None
+    while (ticks is None or res.ticks < ticks) and len(agents) > 0:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        agents, info = step(world, agents)
+        res.ticks += 1
+        res.births += info["births"]
+        for cause, k in info["deaths"].items():
+            res.deaths[cause] = res.deaths.get(cause, 0) + k
+        res.infected = info["infected"]
+        pop = info["population"]
+        if on_tick is not None:
+            on_tick(res.ticks, agents, info)
+    res.elapsed_s = time.perf_counter() - t0
+
+    res.final = agents
+    res.population = len(agents)
+    if res.ticks:
+        res.mean_energy, res.mean_age = pop.energy_mean, pop.age_mean
+    elif res.population:
+        res.mean_energy = float(agents.energy.mean())
+        res.mean_age = float(agents.age_years.mean())
+    return res
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m life_sim.run",
+                                 description="Simulazione headless da configurazione TOML")
+    ap.add_argument("config", nargs="?", default=None,
+                    help="file TOML con i parametri di SimConfig (+ tabella [run])")
+    ap.add_argument("--ticks", type=int, default=None, help="numero di tick da eseguire")
+    ap.add_argument("--seconds", type=float, default=None, help="budget di tempo (wall clock)")
+    ap.add_argument("--seed", type=int, default=None, help="sovrascrive il seed del file")
+    ap.add_argument("--engine", choices=("python", "numba"), default=None)
+    ap.add_argument("--report-every", type=int, default=0, metavar="N",
+                    help="stampa lo stato ogni N tick (0 = solo riepilogo finale)")
+    ap.add_argument("--checkpoint", default=None, metavar="DIR",
+                    help="cartella dello snapshot (salvato periodicamente e a fine run)")
+    ap.add_argument("--checkpoint-every", type=int, default=0, metavar="N",
+                    help="salva lo snapshot ogni N tick (0 = solo a fine run)")
+    ap.add_argument("--resume", default=None, metavar="DIR",
+                    help="riprende da uno snapshot (configurazione e RNG inclusi)")
+    ap.add_argument("--metrics", default=None, metavar="DIR",
+                    help="log a colonne delle metriche per tick (vedi life_sim.metrics)")
+    ap.add_argument("--profile", default=None, metavar="FILE",
+                    help="misura i sistemi di ogni tick e salva il CSV (ultimi 4096 tick)")
+    ap.add_argument("--profile-alloc", action="store_true",
+                    help="con --profile misura anche la memoria allocata (tracemalloc, più lento)")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help="divide il mondo in N strisce su processi separati (vedi life_sim.parallel)")
+    args = ap.parse_args(argv)
+    if args.config is None and args.resume is None:
+        ap.error("serve un file di configurazione oppure --resume")
+    if args.resume is not None and (args.seed is not None or args.engine is not None):
+        # la configurazione dello snapshot prevale: cambiarla romperebbe la ripresa
+        ap.error("--seed e --engine non sono combinabili con --resume")
+
+    run_opts: dict = {}
+    world = agents = None
+    start = 0
+    try:
+        if args.config is not None:
+            cfg, run_opts = load_config(args.config)
+        if args.resume is not None:
+            world, agents, start = load_snapshot(args.resume)
+            cfg = world.cfg
+    except (OSError, ValueError) as exc:
+        print(f"Errore nella configurazione: {exc}", file=sys.stderr)
+        return 2
+    overrides = {k: v for k, v in (("seed", args.seed), ("engine", args.engine)) if v is not None}
+    if overrides:
+        cfg = replace(cfg, **overrides)
+    ticks = args.ticks if args.ticks is not None else run_opts.get("ticks")
+    seconds = args.seconds if args.seconds is not None else run_opts.get("seconds")
+    every = args.report_every or int(run_opts.get("report_every", 0))
+    checkpoint = args.checkpoint or run_opts.get("checkpoint")
+    ck_every = args.checkpoint_every or int(run_opts.get("checkpoint_every", 0))
+    profile = args.profile or run_opts.get("profile")
+    # workers può venire anche dalla tabella [run]: il controllo va fatto sui valori risolti
+    workers = args.workers if args.workers > 1 else int(run_opts.get("workers", 1))
+    if workers > 1 and (checkpoint or args.resume or profile):
+        ap.error("workers > 1 (--workers o [run]) non è combinabile con checkpoint, "
+                 "--resume o profile")
+    metrics_path = args.metrics or run_opts.get("metrics")
+    metrics = (MetricsLog(metrics_path, append=bool(start), resume_tick=start or None)
+               if metrics_path else None)
+
+    if world is None and workers <= 1:
+        world = World.create(cfg)
+    if profile and workers <= 1:
+        world.profiler = StepProfiler(track_alloc=args.profile_alloc)
+
+    def on_tick(tick: int, agents: AgentStore | None, info: dict) -> None:
+        tick += start
+        if metrics is not None:
+            metrics.record(tick, info)
+        if every and tick % every == 0:
+            print(f"[tick {tick}] popolazione {info['population'].n}  nati {info['births']}  "
+                  f"morti {sum(info['deaths'].values())}  infetti {info['infected']}", flush=True)
+        if checkpoint and ck_every and tick % ck_every == 0 and agents is not None:
+            if metrics is not None:
+                metrics.flush()  # il log su disco arriva almeno fino allo snapshot
+            save_snapshot(checkpoint, world, agents, tick)
+
+    if start:
+        print(f"Ripresa da {args.resume} al tick {start}", flush=True)
+    print(f"Mondo {cfg.width}x{cfg.height}, {cfg.initial_agents} agenti, seed {cfg.seed}, "
+          f"motore {cfg.engine}" + (f", {workers} worker" if workers > 1 else ""), flush=True)
+    try:
+        if workers > 1:
+            from .parallel import run_parallel
+            try:
+                res = run_parallel(cfg, workers, ticks=ticks, seconds=seconds, on_tick=on_tick)
+            except ValueError as exc:
+                print(f"Errore nella configurazione: {exc}", file=sys.stderr)
+                return 2
+        else:
+            res = run(cfg, ticks=ticks, seconds=seconds, world=world, agents=agents, on_tick=on_tick)
+    finally:
+        if metrics is not None:
+            metrics.close()
+    if checkpoint and res.ticks and workers <= 1:
+        save_snapshot(checkpoint, world, res.final, start + res.ticks)
+        print(f"Snapshot salvato in {checkpoint} (tick {start + res.ticks})")
+    print(res.summary())
+    if world is not None and world.backend.resident:
+        print(world.backend.transfers.summary())
+    if profile and workers <= 1:
+        world.profiler.close()
+        world.profiler.dump(profile)
+        print(world.profiler.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,39 +1,91 @@
 from __future__ import annotations
+from contextlib import nullcontext
 from .world import World
 from .agent import Agent
+from .store import AgentStore
 from .systems.resources import step_resources
 from .systems.movement import step_movement
 from .systems.foraging import step_foraging
 from .systems.aging import step_aging
 from .systems.disease import step_disease
-from .systems.conflict import step_conflict
+from .systems.conflict import step_conflict, step_conflict_grid
 from .systems.reproduction import step_reproduction
 from .systems.mortality import step_mortality
+from .stats import population_stats
+
+def _engine_systems(engine: str, agents: list[Agent] | AgentStore):
+    if engine == "python":
+        return step_movement, step_foraging, step_conflict, step_reproduction
+    if engine == "numba":
+        if not isinstance(agents, AgentStore):
+            raise ValueError("engine='numba' richiede un AgentStore, non una lista di Agent")
+        # import pigro: la compilazione (o il caricamento dalla cache) avviene solo se serve
+        from .systems import compiled
+        return (compiled.step_movement, compiled.step_foraging,
+                compiled.step_conflict, compiled.step_reproduction)
+    raise ValueError(f"engine sconosciuto: {engine!r} (atteso 'python' o 'numba')")
+
+def step(world: World, agents: list[Agent] | AgentStore) -> tuple[list[Agent] | AgentStore, dict]:
+    """
+    Avanza il mondo di un tick. `agents` può essere la lista di Agent (percorso di
+    riferimento) oppure un AgentStore a colonne: il tipo restituito è lo stesso.
+    Con cfg.engine == "numba" movimento, foraging, conflitto e riproduzione girano
+    come kernel compilati (solo su AgentStore). cfg.conflict_mode == "grid" sceglie
+    la variante a griglie di occupazione del conflitto con qualunque motore.
+    info["population"] è un PopulationStats (stats.py) sulla popolazione a fine tick.
+    Se world.profiler è impostato, info["timings"] riporta tempi e allocazioni per sistema.
+    Con cfg.rng_mode == "counter" i sistemi estraggono da world.stream(...) (rng.py).
+    """
+    movement, foraging, conflict, reproduction = _engine_systems(world.cfg.engine, agents)
+    if world.cfg.conflict_mode == "grid":
+        conflict = step_conflict_grid
+
+    prof = world.profiler
+    if prof is None:
+        measure = lambda name, agents: nullcontext()
+    else:
+        prof.begin_tick()
+        measure = lambda name, agents: prof.measure(name, len(agents))
 
-def step(world: World, agents: list[Agent]) -> tuple[list[Agent], dict]:
     # ambiente
-    step_resources(world)
+    with measure("resources", agents):
+        step_resources(world)
 
     # agenti
-    step_movement(world, agents)
-    step_foraging(world, agents)
-    step_aging(world.cfg, agents)
-    _ = step_disease(world, agents)
+    with measure("movement", agents):
+        movement(world, agents)
+    with measure("foraging", agents):
+        foraging(world, agents)
+    with measure("aging", agents):
+        step_aging(world.cfg, agents)
+    with measure("disease", agents):
+        _ = step_disease(world, agents)
 
     # conflitto
-    agents, deaths_conflict, attempts_conflict, conflict_pos = step_conflict(world, agents)
+    with measure("conflict", agents):
+        agents, deaths_conflict, attempts_conflict, conflict_pos = conflict(world, agents)
 
     # riproduzione + mortalità
-    agents, births = step_reproduction(world, agents)
-    agents, deaths = step_mortality(world, agents)
+    with measure("reproduction", agents):
+        agents, births = reproduction(world, agents)
+    with measure("mortality", agents):
+        agents, deaths = step_mortality(world, agents)
 
     deaths["conflict"] = deaths.get("conflict", 0) + deaths_conflict
 
+    with measure("stats", agents):
+        pop = population_stats(world.cfg, agents)
+    world.tick += 1
+
     info = {
         "births": births,
         "deaths": deaths,
-        "infected": sum(1 for a in agents if a.infected),
+        "infected": pop.infected,
+        "population": pop,
         "conflicts": attempts_conflict,
         "conflict_positions": conflict_pos,
     }
+    if prof is not None:
+        prof.end_tick()
+        info["timings"] = prof.last()
     return agents, info
@@ -0,0 +1,60 @@
+"""
+Checkpoint su disco di mondo + popolazione, per riprendere run lunghi.
+
+Uno snapshot è una cartella:
+    world.json   configurazione, stato di random.Random e di np.random.Generator, tick
+    food.npy     griglia del cibo (float32, non compressa: World.load la mappa in memoria)
+    food_tick.npy  ultimo tick di ogni cella (solo resource_mode = "lazy")
+    index.npz    indice spaziale del mondo (se costruito)
+    agents.npz   colonne dell'AgentStore (non compresse)
+
+Ripartendo da uno snapshot la traiettoria è identica bit per bit a quella del run
+che non si è mai fermato.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+
+from .agent import Agent
+from .store import AgentStore
+from .world import World
+
+_AGENTS = "agents.npz"
+
+
+def save_snapshot(path: str, world: World, agents: list[Agent] | AgentStore, tick: int = 0) -> None:
+    """
+    Scrive lo snapshot in una cartella temporanea e la sostituisce a `path` solo a
+    scrittura completata: un crash durante il salvataggio lascia intatto il precedente.
+    """
+    path = os.path.normpath(path)
+    tmp, old = path + ".tmp", path + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    world.save(tmp)
+    store = agents if isinstance(agents, AgentStore) else AgentStore.from_agents(agents)
+    store.save(os.path.join(tmp, _AGENTS))
+
+    meta_path = os.path.join(tmp, "world.json")
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    meta["tick"] = int(tick)
+    meta["agents"] = "store" if isinstance(agents, AgentStore) else "list"
+    with open(meta_path, "w") as fh:
+        json.dump(meta, fh)
+
+    if os.path.exists(path):
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_snapshot(path: str, mmap: bool = True) -> tuple[World, list[Agent] | AgentStore, int]:
+    """(mondo, agenti, tick) da uno snapshot; gli agenti tornano nel formato salvato."""
+    world = World.load(path, mmap=mmap)
+    with open(os.path.join(path, "world.json")) as fh:
+        meta = json.load(fh)
+    store = AgentStore.load(os.path.join(path, _AGENTS))
+    agents = store if meta.get("agents", "store") == "store" else store.to_agents()
+    return world, agents, int(meta.get("tick", 0))
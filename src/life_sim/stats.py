@@ -0,0 +1,121 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+from .agent import Agent
+from .config import SimConfig
+from .store import AgentStore, SEX_M
+
+# fasce d'età: [0, maturità) bambini, [maturità, ELDER_AGE_YEARS) adulti, oltre anziani
+ELDER_AGE_YEARS = 60.0
+
+
+@dataclass(frozen=True)
+class PopulationStats:
+    """Aggregati della popolazione a fine tick (info["population"] di scheduler.step)."""
+    n: int = 0
+    males: int = 0
+    females: int = 0
+    children: int = 0
+    adults: int = 0
+    elders: int = 0
+    infected: int = 0
+    hungry: int = 0       # hunger_streak_ticks >= conflict_hunger_ticks
+    at_risk: int = 0      # at_risk_conflict nell'ultimo tick
+    energy_mean: float = 0.0
+    energy_var: float = 0.0
+    age_mean: float = 0.0
+    age_var: float = 0.0
+
+
+def _merge_moments(parts: list[tuple[int, float, float]]) -> tuple[float, float]:
+    """
+    Media e varianza dell'unione di gruppi (n, media, M2), con M2 la somma dei quadrati
+    degli scarti dalla media del gruppo (formula parallela di Chan et al.: nessuna
+    differenza E[x²] − media², che perde precisione quando la varianza è piccola).
+    """
+    n = 0
+    mean = m2 = 0.0
+    for nb, mb, m2b in parts:
+        if nb == 0:
+            continue
+        total = n + nb
+        delta = mb - mean
+        mean += delta * nb / total
+        m2 += m2b + delta * delta * n * nb / total
+        n = total
+    return mean, m2 / n
+
+
+def population_stats(cfg: SimConfig, agents: list[Agent] | AgentStore) -> PopulationStats:
+    """
+    Tutti gli aggregati con riduzioni sulle colonne (store) o in un solo passaggio sulla
+    lista; le varianze sono somme di scarti centrati sulla media (aggiornamento di
+    Welford per la lista), stabili anche con medie grandi.
+    """
+    n = len(agents)
+    if n == 0:
+        return PopulationStats()
+    maturity = cfg.maturity_age_years
+    hungry_th = cfg.conflict_hunger_ticks
+
+    if isinstance(agents, AgentStore):
+        e = agents.energy
+        age = agents.age_years
+        males = int(np.count_nonzero(agents.sex == SEX_M))
+        children = int(np.count_nonzero(age < maturity))
+        elders = int(np.count_nonzero(age >= max(maturity, ELDER_AGE_YEARS)))
+        infected = int(np.count_nonzero(agents.infected))
+        hungry = int(np.count_nonzero(agents.hunger_streak_ticks >= hungry_th))
+        at_risk = int(np.count_nonzero(agents.at_risk_conflict))
+        e_mean, a_mean = float(e.mean()), float(age.mean())
+        de, da = e - e_mean, age - a_mean
+        e_var, a_var = float(np.dot(de, de)) / n, float(np.dot(da, da)) / n
+    else:
+        males = children = elders = infected = hungry = at_risk = 0
+        # Welford: medie e somme dei quadrati degli scarti (M2) aggiornate agente per agente
+        e_mean = a_mean = e_m2 = a_m2 = 0.0
+        for k, a in enumerate(agents, 1):
+            if a.sex == "M":
+                males += 1
+            age = a.age_years
+            if age < maturity:
+                children += 1
+            elif age >= ELDER_AGE_YEARS:
+                elders += 1
+            if a.infected:
+                infected += 1
+            if a.hunger_streak_ticks >= hungry_th:
+                hungry += 1
+            if a.at_risk_conflict:
+                at_risk += 1
+            d = a.energy - e_mean
+            e_mean += d / k
+            e_m2 += d * (a.energy - e_mean)
+            d = age - a_mean
+            a_mean += d / k
+            a_m2 += d * (age - a_mean)
+        e_var, a_var = e_m2 / n, a_m2 / n
+
+    return PopulationStats(
+        n=n, males=males, females=n - males,
+        children=children, adults=n - children - elders, elders=elders,
+        infected=infected, hungry=hungry, at_risk=at_risk,
+        energy_mean=e_mean, energy_var=e_var, age_mean=a_mean, age_var=a_var,
+    )
+
+
+def merge_stats(parts: list[PopulationStats]) -> PopulationStats:
+    """
+    Unisce gli aggregati di sottopopolazioni disgiunte (es. i worker di parallel.py):
+    i conteggi si sommano, medie e varianze si ricompongono da (n, media, M2).
+    """
+    n = sum(p.n for p in parts)
+    if n == 0:
+        return PopulationStats()
+    counts = {name: sum(getattr(p, name) for p in parts)
+              for name in ("males", "females", "children", "adults", "elders",
+                           "infected", "hungry", "at_risk")}
+    e_mean, e_var = _merge_moments([(p.n, p.energy_mean, p.n * p.energy_var) for p in parts])
+    a_mean, a_var = _merge_moments([(p.n, p.age_mean, p.n * p.age_var) for p in parts])
+    return PopulationStats(n=n, **counts, energy_mean=e_mean, energy_var=e_var,
+                           age_mean=a_mean, age_var=a_var)
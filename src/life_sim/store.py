@@ -0,0 +1,240 @@
+from __future__ import annotations
+from dataclasses import fields
+from typing import Iterable, Iterator
+import numpy as np
+from .agent import Agent
+
+# Codifica del sesso nella colonna "sex" (uint8)
+SEX_M = 0
+SEX_F = 1
+
+# Una colonna tipizzata per ogni campo di Agent (stesso nome, stesso significato)
+COLUMNS: dict[str, np.dtype] = {
+    "id": np.dtype(np.int64),
+    "x": np.dtype(np.int32),
+    "y": np.dtype(np.int32),
+    "energy": np.dtype(np.float64),
+    "age_years": np.dtype(np.float64),
+    "max_age": np.dtype(np.float64),
+    "speed": np.dtype(np.int32),
+    "vision": np.dtype(np.int32),
+    "sex": np.dtype(np.uint8),
+    "repro_cooldown_years": np.dtype(np.float64),
+    "infected": np.dtype(np.bool_),
+    "disease_years": np.dtype(np.float64),
+    "ate_recent_ticks": np.dtype(np.int32),
+    "hunger_streak_ticks": np.dtype(np.int32),
+    "at_risk_conflict": np.dtype(np.bool_),
+}
+
+# valori di default presi direttamente dalla dataclass Agent
+_DEFAULTS: dict[str, object] = {
+    f.name: f.default for f in fields(Agent) if f.name not in ("id", "x", "y")
+}
+assert set(COLUMNS) == {f.name for f in fields(Agent)}, "COLUMNS non allineate con Agent"
+
+
+def _encode(name: str, value):
+    if name == "sex":
+        return SEX_M if value == "M" else SEX_F
+    return value
+
+
+def agent_ids(agents: list[Agent] | "AgentStore") -> np.ndarray:
+    """Colonna degli id (int64) di una lista di Agent o di un AgentStore."""
+    if isinstance(agents, AgentStore):
+        return agents.id
+    return np.fromiter((a.id for a in agents), dtype=np.int64, count=len(agents))
+
+
+class AgentStore:
+    """
+    Popolazione in formato struct-of-arrays: una colonna NumPy per campo di Agent.
+    Le colonne (store.x, store.energy, ...) sono viste di lunghezza len(store) sul buffer
+    interno, quindi si possono aggiornare in place con operazioni vettoriali.
+    Iterare lo store restituisce AgentView, compatibili con il codice che usa Agent.
+    """
+
+    def __init__(self, capacity: int = 0):
+        cap = max(16, int(capacity))
+        self._cols: dict[str, np.ndarray] = {
+            name: np.zeros(cap, dtype=dt) for name, dt in COLUMNS.items()
+        }
+        self.n = 0
+        self.next_id = 0  # id monotoni: mai riusati dopo una morte
+
+    # ---- costruzione / conversione ----
+    @classmethod
+    def from_agents(cls, agents: Iterable[Agent]) -> "AgentStore":
+        agents = list(agents)
+        store = cls(capacity=len(agents))
+        store.extend({
+            name: np.fromiter((_encode(name, getattr(a, name)) for a in agents),
+                              dtype=dt, count=len(agents))
+            for name, dt in COLUMNS.items()
+        })
+        return store
+
+    def to_agents(self) -> list[Agent]:
+        return [view.to_agent() for view in self]
+
+    def copy(self) -> "AgentStore":
+        other = AgentStore(capacity=self.n)
+        other.extend({name: col[:self.n] for name, col in self._cols.items()})
+        other.next_id = self.next_id
+        return other
+
+    def freeze(self) -> "AgentStore":
+        """Rende le colonne di sola lettura (copie pubblicate ad altri thread); ritorna lo store."""
+        for col in self._cols.values():
+            col.flags.writeable = False
+        return self
+
+    # ---- snapshot su disco ----
+    def save(self, path: str) -> None:
+        """Scrive le colonne in un .npz non compresso (una voce per colonna + next_id)."""
+        np.savez(path, next_id=np.int64(self.next_id), **self.columns())
+
+    @classmethod
+    def load(cls, path: str) -> "AgentStore":
+        with np.load(path) as data:
+            n = len(data["id"])
+            store = cls(capacity=n)
+            for name in COLUMNS:
+                store._cols[name][:n] = data[name]
+            store.n = n
+            store.next_id = int(data["next_id"])
+        return store
+
+    # ---- dimensioni ----
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def capacity(self) -> int:
+        return len(self._cols["id"])
+
+    def _reserve(self, n: int) -> None:
+        if n <= self.capacity:
+            return
+        cap = max(n, 2 * self.capacity)
+        for name, col in self._cols.items():
+            new = np.zeros(cap, dtype=col.dtype)
+            new[:self.n] = col[:self.n]
+            self._cols[name] = new
+
+    # ---- accesso alle colonne ----
+    def column(self, name: str) -> np.ndarray:
+        return self._cols[name][:self.n]
+
+    def columns(self) -> dict[str, np.ndarray]:
+        return {name: col[:self.n] for name, col in self._cols.items()}
+
+    # ---- modifica ----
+    def extend(self, values: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Accoda k agenti in blocco. `values` mappa nome colonna -> array (o scalare);
+        le colonne mancanti prendono il default di Agent, "id" se assente viene assegnato
+        da next_id. Ritorna gli indici di riga dei nuovi agenti.
+        """
+        k = 0
+        for v in values.values():
+            if np.ndim(v) > 0:
+                k = len(v)
+                break
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+        start = self.n
+        self._reserve(start + k)
+        for name, col in self._cols.items():
+            if name in values:
+                col[start:start + k] = values[name]
+            elif name == "id":
+                col[start:start + k] = np.arange(self.next_id, self.next_id + k)
+            else:
+                col[start:start + k] = _encode(name, _DEFAULTS[name])
+        self.n = start + k
+        new_ids = self._cols["id"][start:self.n]
+        self.next_id = max(self.next_id, int(new_ids.max()) + 1)
+        return np.arange(start, self.n)
+
+    def keep(self, mask: np.ndarray) -> None:
+        """Compatta lo store tenendo solo le righe con mask True (ordine preservato)."""
+        mask = np.asarray(mask, dtype=bool)
+        idx = np.flatnonzero(mask)
+        m = len(idx)
+        if m == self.n:
+            return
+        for col in self._cols.values():
+            col[:m] = col[idx]
+        self.n = m
+
+    # ---- adapter verso il codice "ad oggetti" (UI) ----
+    def __getitem__(self, i: int) -> "AgentView":
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        return AgentView(self, i)
+
+    def __iter__(self) -> Iterator["AgentView"]:
+        for i in range(self.n):
+            yield AgentView(self, i)
+
+
+def _column_property(name: str) -> property:
+    def get(self: AgentStore) -> np.ndarray:
+        return self._cols[name][:self.n]
+
+    def set(self: AgentStore, value) -> None:
+        col = self._cols[name]
+        # `store.x += 1` riassegna la vista appena modificata in place: niente copia
+        if (isinstance(value, np.ndarray) and len(value) == self.n
+                and value.__array_interface__["data"][0] == col.__array_interface__["data"][0]):
+            return
+        col[:self.n] = value
+
+    return property(get, set)
+
+
+class AgentView:
+    """
+    Vista Agent-like su una riga dello store (lettura/scrittura passano dalle colonne).
+    Valida finché lo store non viene compattato con keep().
+    """
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: AgentStore, i: int):
+        self._store = store
+        self._i = i
+
+    def to_agent(self) -> Agent:
+        return Agent(**{name: getattr(self, name) for name in COLUMNS})
+
+    def __repr__(self) -> str:
+        return f"AgentView({self.to_agent()!r})"
+
+
+def _view_property(name: str, dt: np.dtype) -> property:
+    if name == "sex":
+        def get(self: AgentView) -> str:
+            return "M" if self._store._cols[name][self._i] == SEX_M else "F"
+    elif dt == np.bool_:
+        def get(self: AgentView) -> bool:
+            return bool(self._store._cols[name][self._i])
+    elif dt.kind in "iu":
+        def get(self: AgentView) -> int:
+            return int(self._store._cols[name][self._i])
+    else:
+        def get(self: AgentView) -> float:
+            return float(self._store._cols[name][self._i])
+
+    def set(self: AgentView, value) -> None:
+        self._store._cols[name][self._i] = _encode(name, value)
+
+    return property(get, set)
+
+
+for _name, _dt in COLUMNS.items():
+    setattr(AgentStore, _name, _column_property(_name))
+    setattr(AgentView, _name, _view_property(_name, _dt))
@@ -0,0 +1,270 @@
+"""
+Sweep di parametri ed ensemble di seed su un pool di processi.
+
+    python -m life_sim.sweep experiments/configs/sweep_example.toml --out runs/sweep1 --workers 8
+
+Il file TOML contiene la configurazione base (chiavi di SimConfig) e una tabella
+[sweep] con `seeds`, `ticks`/`seconds` e i parametri da variare, come griglia
+([sweep.grid], prodotto cartesiano) o come lista di casi ([[sweep.cases]]).
+
+Per ogni job completato si scrive subito il riepilogo per tick in
+`<out>/ticks/<job_id>.csv` e una riga in `<out>/results.csv`. I job già presenti in
+results.csv vengono saltati: dopo un crash basta rilanciare lo stesso comando.
+La configurazione base è salvata in `<out>/base.json`: se nel frattempo il TOML è
+cambiato, la ripresa viene rifiutata invece di mescolare righe vecchie e nuove.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterable, Mapping
+
+import numpy as np
+
+from .config import SimConfig, config_from_mapping, read_toml
+
+# contatori per tick restituiti da ogni job
+TICK_FIELDS = ("tick", "population", "births", "deaths_starvation", "deaths_age",
+               "deaths_disease", "deaths_conflict", "infected", "conflicts")
+RESULT_FIELDS = ("ticks", "elapsed_s", "ticks_per_s", "population", "births",
+                 "deaths_starvation", "deaths_age", "deaths_disease", "deaths_conflict",
+                 "infected", "mean_energy", "mean_age")
+
+
+@dataclass(frozen=True)
+class Job:
+    job_id: str
+    seed: int
+    overrides: tuple[tuple[str, Any], ...]
+    ticks: int | None = None
+    seconds: float | None = None
+
+
+@dataclass
+class JobResult:
+    job: Job
+    summary: dict[str, float]
+    per_tick: np.ndarray = field(repr=False)  # (ticks, len(TICK_FIELDS)) int64
+
+
+def expand_grid(grid: Mapping[str, Iterable[Any]]) -> list[dict[str, Any]]:
+    """Prodotto cartesiano {param: [valori]} -> lista di override."""
+    keys = sorted(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(list(grid[k]) for k in keys))]
+
+
+def _job_id(overrides: Mapping[str, Any], seed: int, ticks, seconds) -> str:
+    key = json.dumps({"o": sorted(overrides.items()), "s": seed, "t": ticks, "w": seconds},
+                     sort_keys=True, default=str)
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def make_jobs(cases: Iterable[Mapping[str, Any]], seeds: Iterable[int],
+              ticks: int | None = None, seconds: float | None = None) -> list[Job]:
+    """Un job per (caso, seed); job_id dipende solo dal contenuto, quindi è stabile tra riavvii."""
+    jobs = []
+    for case in cases:
+        for seed in seeds:
+            jobs.append(Job(job_id=_job_id(case, seed, ticks, seconds), seed=int(seed),
+                            overrides=tuple(sorted(case.items())), ticks=ticks, seconds=seconds))
+    return jobs
+
+
+def run_job(base: SimConfig, job: Job) -> JobResult:
+    """Esegue un job nel processo corrente (è anche la funzione dei worker)."""
+    from .run import run
+
+    cfg = config_from_mapping({**dict(job.overrides), "seed": job.seed}, base=base)
+    rows: list[tuple[int, ...]] = []
+
+    def collect(tick: int, agents, info: dict) -> None:
+        d = info["deaths"]
+        rows.append((tick, info["population"].n, info["births"], d["starvation"], d["age"],
+                     d["disease"], d.get("conflict", 0), info["infected"], info["conflicts"]))
+
+    res = run(cfg, ticks=job.ticks, seconds=job.seconds, on_tick=collect)
+    summary = {
+        "ticks": res.ticks, "elapsed_s": round(res.elapsed_s, 4),
+        "ticks_per_s": round(res.ticks_per_s, 2), "population": res.population,
+        "births": res.births, "infected": res.infected,
+        "mean_energy": round(res.mean_energy, 4), "mean_age": round(res.mean_age, 4),
+        **{f"deaths_{k}": res.deaths.get(k, 0) for k in ("starvation", "age", "disease", "conflict")},
+    }
+    per_tick = np.array(rows, dtype=np.int64).reshape(-1, len(TICK_FIELDS))
+    return JobResult(job=job, summary=summary, per_tick=per_tick)
+
+
+def _limit_memory(max_mem_mb: int | None) -> None:
+    # inizializzatore dei worker: tetto allo spazio di indirizzamento (solo POSIX)
+    if not max_mem_mb:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = int(max_mem_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def completed_jobs(out_dir: str) -> set[str]:
+    path = os.path.join(out_dir, "results.csv")
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline="") as fh:
+        return {row["job_id"] for row in csv.DictReader(fh)}
+
+
+def _check_base(out_dir: str, base: SimConfig) -> None:
+    """Salva la configurazione base, o verifica che coincida con quella già salvata."""
+    path = os.path.join(out_dir, "base.json")
+    current = json.loads(json.dumps(asdict(base), default=str))
+    if os.path.exists(path):
+        with open(path) as fh:
+            if json.load(fh) != current:
+                raise ValueError(f"{out_dir}: configurazione base diversa da quella dello sweep "
+                                 "già avviato (usare un'altra cartella --out)")
+        return
+    with open(path + ".tmp", "w") as fh:
+        json.dump(current, fh, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _write_ticks(out_dir: str, result: JobResult) -> None:
+    tick_dir = os.path.join(out_dir, "ticks")
+    os.makedirs(tick_dir, exist_ok=True)
+    final = os.path.join(tick_dir, f"{result.job.job_id}.csv")
+    tmp = final + ".tmp"
+    np.savetxt(tmp, result.per_tick, fmt="%d", delimiter=",",
+               header=",".join(TICK_FIELDS), comments="")
+    os.replace(tmp, final)
+
+
+def run_sweep(base: SimConfig, jobs: list[Job], out_dir: str, workers: int | None = None,
+              max_mem_mb: int | None = None, tasks_per_worker: int | None = None,
+              log: Callable[[str], None] = print) -> list[dict[str, Any]]:
+    """
+    Esegue i job mancanti su un ProcessPoolExecutor e accoda i risultati man mano.
+    Al massimo 2×workers job sono in volo alla volta, così i risultati non si accumulano
+    in memoria; `tasks_per_worker` ricicla i processi (Python >= 3.11) e `max_mem_mb`
+    limita la memoria di ciascun worker.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    _check_base(out_dir, base)
+    done = completed_jobs(out_dir)
+    todo = [j for j in jobs if j.job_id not in done]
+    params = sorted({k for j in jobs for k, _ in j.overrides})
+    header = ["job_id", "seed", *params, *RESULT_FIELDS]
+
+    results_path = os.path.join(out_dir, "results.csv")
+    new_file = not os.path.exists(results_path)
+    if not new_file:
+        with open(results_path, newline="") as fh:
+            if next(csv.reader(fh), None) != header:
+                raise ValueError(f"{results_path}: intestazione diversa da questo sweep")
+    log(f"Sweep: {len(jobs)} job, {len(jobs) - len(todo)} già completati, {len(todo)} da eseguire")
+    if not todo:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    pool_kwargs: dict[str, Any] = {"max_workers": workers, "initializer": _limit_memory,
+                                   "initargs": (max_mem_mb,)}
+    if tasks_per_worker and sys.version_info >= (3, 11):
+        pool_kwargs["max_tasks_per_child"] = tasks_per_worker
+
+    rows: list[dict[str, Any]] = []
+    with open(results_path, "a", newline="") as fh, ProcessPoolExecutor(**pool_kwargs) as pool:
+        writer = csv.DictWriter(fh, fieldnames=header)
+        if new_file:
+            writer.writeheader()
+            fh.flush()
+        pending = iter(todo)
+        in_flight: dict = {}
+        finished = 0
+        while True:
+            while len(in_flight) < 2 * workers:
+                job = next(pending, None)
+                if job is None:
+                    break
+                in_flight[pool.submit(run_job, base, job)] = job
+            if not in_flight:
+                break
+            ready, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in ready:
+                job = in_flight.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as exc:
+                    # non registrato in results.csv: verrà ritentato al prossimo avvio
+                    log(f"job {job.job_id} fallito: {exc!r}")
+                    continue
+                _write_ticks(out_dir, result)
+                row = {"job_id": result.job.job_id, "seed": result.job.seed,
+                       **dict(result.job.overrides), **result.summary}
+                writer.writerow(row)
+                fh.flush()
+                os.fsync(fh.fileno())
+                rows.append(row)
+                finished += 1
+                log(f"[{finished}/{len(todo)}] {result.job.job_id} seed={result.job.seed} "
+                    f"{dict(result.job.overrides)} -> pop {row['population']}, "
+                    f"{row['ticks_per_s']} tick/s")
+    return rows
+
+
+def load_sweep(path: str) -> tuple[SimConfig, list[Job]]:
+    """Configurazione base + job da un file TOML con tabella [sweep]."""
+    data = read_toml(path)
+    data.pop("run", None)
+    spec = data.pop("sweep", {})
+    base = config_from_mapping(data)
+
+    cases: list[dict[str, Any]] = [dict(c) for c in spec.get("cases", [])]
+    if "grid" in spec:
+        cases.extend(expand_grid(spec["grid"]))
+    if not cases:
+        cases = [{}]
+    for case in cases:
+        config_from_mapping(case, base=base)  # valida nomi e tipi prima di partire
+    seeds = spec.get("seeds", [base.seed])
+    if isinstance(seeds, int):
+        seeds = range(seeds)
+    ticks = spec.get("ticks")
+    seconds = spec.get("seconds")
+    if ticks is None and seconds is None:
+        ticks = 1000
+    return base, make_jobs(cases, seeds, ticks=ticks, seconds=seconds)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m life_sim.sweep",
+                                 description="Sweep di parametri / ensemble di seed in parallelo")
+    ap.add_argument("config", help="file TOML con configurazione base e tabella [sweep]")
+    ap.add_argument("--out", required=True, help="cartella dei risultati (riprende se esiste)")
+    ap.add_argument("--workers", type=int, default=None, help="processi worker (default: n. CPU)")
+    ap.add_argument("--max-mem-mb", type=int, default=None, help="memoria massima per worker")
+    ap.add_argument("--tasks-per-worker", type=int, default=None,
+                    help="ricicla un worker dopo N job (Python >= 3.11)")
+    args = ap.parse_args(argv)
+
+    try:
+        base, jobs = load_sweep(args.config)
+    except (OSError, ValueError) as exc:
+        print(f"Errore nella configurazione: {exc}", file=sys.stderr)
+        return 2
+    try:
+        run_sweep(base, jobs, args.out, workers=args.workers, max_mem_mb=args.max_mem_mb,
+                  tasks_per_worker=args.tasks_per_worker)
+    except ValueError as exc:  # cartella di un altro sweep
+        print(f"Errore: {exc}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
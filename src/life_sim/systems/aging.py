@@ -1,9 +1,19 @@
 from __future__ import annotations
+import numpy as np
 from ..agent import Agent
+from ..store import AgentStore
 from ..config import years_per_tick, SimConfig
 
-def step_aging(cfg: SimConfig, agents: list[Agent]) -> None:
+def step_aging(cfg: SimConfig, agents: list[Agent] | AgentStore) -> None:
     yp = years_per_tick(cfg)
+    if isinstance(agents, AgentStore):
+        # aggiornamenti in place sulle colonne, senza temporanei
+        agents.age_years += yp
+        cooldown = agents.repro_cooldown_years
+        np.subtract(cooldown, yp, out=cooldown)
+        np.maximum(cooldown, 0.0, out=cooldown)
+        agents.energy -= 0.3 * yp
+        return
     for a in agents:
         a.age_years += yp
         a.repro_cooldown_years = max(0.0, a.repro_cooldown_years - yp)
@@ -0,0 +1,280 @@
+"""
+Kernel compilati con Numba per il motore `engine="numba"` (movimento, foraging,
+conflitto, riproduzione) su colonne di un AgentStore.
+
+- I kernel sono @njit(cache=True): il codice macchina viene salvato su disco
+  (__pycache__ accanto a questo file, oppure NUMBA_CACHE_DIR) e i processi
+  successivi lo ricaricano senza ricompilare. `warmup()` forza la compilazione.
+- La casualità non viene dal generatore interno di Numba: ogni sistema estrae in
+  blocco da world.rng.np e passa gli array ai kernel, quindi il seed del mondo
+  determina completamente la traiettoria. Con rng_mode "counter" le estrazioni
+  vengono dai flussi per agente (rng.py) e la traiettoria coincide esattamente
+  con quella del percorso Python.
+- Le regole sono quelle del percorso Python; cambia solo la sequenza di numeri
+  casuali. Le statistiche aggregate (popolazione, nascite, morti per causa,
+  conflitti) coincidono con il percorso Python entro la variabilità tra seed:
+  su 8 seed × 200 tick la media differisce di meno del 10% (vedi test).
+"""
+from __future__ import annotations
+import numpy as np
+from numba import njit
+from ..grid import spatial_index, tracked_index
+from ..store import AgentStore, SEX_M, SEX_F
+from ..world import World
+from .movement import displacements
+from .reproduction import _DRAW_MEET, _DRAW_ORDER, _DRAW_SEX, child_ids
+
+_DX = np.array([-1, 0, 1, -1, 1, -1, 0, 1], dtype=np.int64)
+_DY = np.array([-1, -1, -1, 0, 0, 1, 1, 1], dtype=np.int64)
+
+
+# ---------------------------------------------------------------- kernel
+
+@njit(cache=True)
+def _move_kernel(xs, ys, d, w, h, toroidal):
+    for i in range(xs.shape[0]):
+        x = xs[i] + d[i, 0]
+        y = ys[i] + d[i, 1]
+        if toroidal:
+            x = x % w
+            y = y % h
+        else:
+            x = min(max(x, 0), w - 1)
+            y = min(max(y, 0), h - 1)
+        xs[i] = x
+        ys[i] = y
+
+
+@njit(cache=True)
+def _forage_kernel(xs, ys, food, energy, ate_recent, hunger, th):
+    for i in range(xs.shape[0]):
+        x = xs[i]
+        y = ys[i]
+        eat = min(0.1, np.float64(food[y, x]))
+        if eat > 0.0:
+            food[y, x] -= np.float32(eat)
+            energy[i] += eat * 5.0
+        if eat > 0.0 and eat >= th:
+            ate_recent[i] = 5
+            hunger[i] = 0
+        else:
+            hunger[i] += 1
+            if ate_recent[i] > 0:
+                ate_recent[i] -= 1
+
+
+@njit(cache=True)
+def _conflict_kernel(xs, ys, eater, strong, hungry, weak, head, nxt, cell, bw, u,
+                     w, h, toroidal, dxs, dys,
+                     p_eater, p_pair, bonus_weak, bonus_strong, alive, at_risk):
+    attempts = 0
+    for i in range(xs.shape[0]):
+        if not hungry[i]:
+            continue
+        has_eater = False
+        has_hungry = False
+        has_strong = False
+        for k in range(8):
+            nx = xs[i] + dxs[k]
+            ny = ys[i] + dys[k]
+            if toroidal:
+                nx = nx % w
+                ny = ny % h
+            else:
+                nx = min(max(nx, 0), w - 1)
+                ny = min(max(ny, 0), h - 1)
+            # catena del bucket nell'indice spaziale persistente (grid.SpatialHash)
+            nb = head[(ny // cell) * bw + nx // cell]
+            while nb >= 0:
+                if xs[nb] == nx and ys[nb] == ny:
+                    if eater[nb]:
+                        has_eater = True
+                        if strong[nb]:
+                            has_strong = True
+                    if hungry[nb]:
+                        has_hungry = True
+                nb = nxt[nb]
+
+        if has_eater:
+            p = p_eater
+        elif has_hungry:
+            p = p_pair
+        else:
+            continue
+
+        at_risk[i] = True
+        attempts += 1
+        if weak[i]:
+            p += bonus_weak
+        if has_eater and has_strong:
+            p += bonus_strong
+        p = max(0.0, min(1.0, p))
+        if u[i] < p:
+            alive[i] = False
+    return attempts
+
+
+@njit(cache=True)
+def _mate_kernel(sorted_cells, sorted_sex, order, eligible, u, p_meet, pm, pf):
+    """
+    `order` ordina gli agenti per (cella, sesso, chiave casuale): in ogni cella i
+    maschi precedono le femmine, e il k-esimo maschio si accoppia con la k-esima femmina.
+    """
+    n = sorted_cells.shape[0]
+    count = 0
+    s = 0
+    while s < n:
+        e = s
+        while e < n and sorted_cells[e] == sorted_cells[s]:
+            e += 1
+        m = s
+        while m < e and sorted_sex[m] == 0:
+            m += 1
+        n_males = m - s
+        n_females = e - m
+        for k in range(min(n_males, n_females)):
+            a = order[s + k]
+            b = order[m + k]
+            if eligible[a] and eligible[b] and u[a] <= p_meet:
+                pm[count] = a
+                pf[count] = b
+                count += 1
+        s = e
+    return count
+
+
+# ---------------------------------------------------------------- sistemi
+
+def _linear_cells(world: World, store: AgentStore) -> np.ndarray:
+    return store.y.astype(np.int64) * world.cfg.width + store.x
+
+
+def step_movement(world: World, store: AgentStore) -> None:
+    d = np.stack(displacements(world, store.id), axis=1)
+    _move_kernel(store.x, store.y, d, world.cfg.width, world.cfg.height, world.cfg.toroidal)
+    index = tracked_index(world, len(store))
+    if index is not None:
+        index.update(store.x, store.y)
+
+
+def step_foraging(world: World, store: AgentStore) -> None:
+    th = getattr(world.cfg, "min_eat_to_count", 0.02)
+    if world.cfg.rng_mode == "counter":
+        # il kernel visita gli agenti in ordine di id (chi condivide una cella mangia in quell'ordine)
+        order = np.argsort(store.id, kind="stable")
+        cols = {name: store.column(name)[order]
+                for name in ("x", "y", "energy", "ate_recent_ticks", "hunger_streak_ticks")}
+        _forage(world, cols["x"], cols["y"], cols["energy"], cols["ate_recent_ticks"],
+                cols["hunger_streak_ticks"], th)
+        store.energy[order] = cols["energy"]
+        store.ate_recent_ticks[order] = cols["ate_recent_ticks"]
+        store.hunger_streak_ticks[order] = cols["hunger_streak_ticks"]
+        return
+    _forage(world, store.x, store.y, store.energy, store.ate_recent_ticks,
+            store.hunger_streak_ticks, th)
+
+
+def _forage(world: World, xs, ys, energy, ate_recent, hunger, th) -> None:
+    if world.food_dirty is not None:
+        world.food_dirty.mark(xs, ys)
+    if world.food_is_remote:
+        # mappa a tile o residente: il kernel lavora su una riga compatta con le sole celle occupate
+        w = world.cfg.width
+        uniq, inv = np.unique(ys.astype(np.int64) * w + xs, return_inverse=True)
+        local = world.food_at(uniq % w, uniq // w)[None, :]
+        _forage_kernel(inv.astype(np.int32), np.zeros(len(xs), dtype=np.int32), local,
+                       energy, ate_recent, hunger, th)
+        world.set_food(uniq % w, uniq // w, local[0])
+        return
+    world.sync_cells(xs, ys)
+    _forage_kernel(xs, ys, world.food, energy, ate_recent, hunger, th)
+
+
+def step_conflict(world: World, store: AgentStore) -> tuple[AgentStore, int, int, list[tuple[int,int]]]:
+    cfg = world.cfg
+    n = len(store)
+    store.at_risk_conflict = False
+    hungry = store.hunger_streak_ticks >= cfg.conflict_hunger_ticks
+    if n == 0 or not hungry.any():
+        return store, 0, 0, []
+
+    index = spatial_index(world, store)
+    alive = np.ones(n, dtype=np.bool_)
+    attempts = _conflict_kernel(
+        store.x, store.y,
+        store.ate_recent_ticks > 0,
+        store.energy >= cfg.conflict_strong_energy_thresh,
+        hungry,
+        store.energy < cfg.conflict_weak_energy_thresh,
+        index.head, index.next, index.cell, index.bw, world.uniform("conflict", store.id),
+        cfg.width, cfg.height, cfg.toroidal, _DX, _DY,
+        cfg.conflict_kill_prob, cfg.conflict_kill_prob_hungry_pair,
+        cfg.conflict_bonus_if_weak, cfg.conflict_bonus_if_strong,
+        alive, store.at_risk_conflict,
+    )
+    dead = ~alive
+    positions = list(zip(store.x[dead].tolist(), store.y[dead].tolist()))
+    if positions:
+        store.keep(alive)
+        index.remove(alive)
+    return store, len(positions), int(attempts), positions
+
+
+def step_reproduction(world: World, store: AgentStore) -> tuple[AgentStore, int]:
+    cfg = world.cfg
+    n = len(store)
+    if n == 0:
+        return store, 0
+    rng = world.rng.np
+
+    stream = world.stream("reproduction")
+    cells = _linear_cells(world, store)
+    keys = stream.uniform(store.id, _DRAW_ORDER) if stream is not None else rng.random(n)
+    order = np.lexsort((keys, store.sex, cells))
+    eligible = ((store.age_years >= cfg.maturity_age_years) &
+                (store.energy >= cfg.reproduction_energy_min) &
+                (store.repro_cooldown_years <= 0.0))
+    pm = np.empty(n // 2 + 1, dtype=np.int64)
+    pf = np.empty(n // 2 + 1, dtype=np.int64)
+    u = stream.uniform(store.id, _DRAW_MEET) if stream is not None else rng.random(n)
+    count = _mate_kernel(cells[order], store.sex[order], order, eligible,
+                         u, cfg.reproduction_prob_per_meeting, pm, pf)
+    if count == 0:
+        return store, 0
+    pm, pf = pm[:count], pf[:count]
+
+    parents = np.concatenate([pm, pf])
+    store.energy[parents] -= cfg.reproduction_cost
+    store.repro_cooldown_years[parents] = cfg.reproduction_cooldown_years
+    index = tracked_index(world, n)
+    u_sex = stream.uniform(store.id[pf], _DRAW_SEX) if stream is not None else rng.random(count)
+    children = {
+        "x": store.x[pf],
+        "y": store.y[pf],
+        "sex": np.where(u_sex < 0.5, SEX_M, SEX_F),
+        "energy": np.full(count, cfg.child_energy),
+        "age_years": np.zeros(count),
+        "max_age": (store.max_age[pm] + store.max_age[pf]) / 2.0,
+    }
+    if stream is not None:
+        children["id"] = child_ids(stream, store.id[pf])
+    rows = store.extend(children)
+    if index is not None:
+        index.append(store.x[rows], store.y[rows])
+    return store, count
+
+
+def warmup() -> None:
+    """Compila (o carica dalla cache su disco) tutti i kernel con input minimi."""
+    from ..config import SimConfig
+    from ..agent import Agent
+    cfg = SimConfig(width=8, height=8, initial_food_flat=True, conflict_hunger_ticks=0)
+    world = World.create(cfg)
+    store = AgentStore.from_agents([
+        Agent(id=0, x=1, y=1, sex="M", age_years=30.0, energy=30.0),
+        Agent(id=1, x=1, y=1, sex="F", age_years=30.0, energy=30.0),
+    ])
+    step_movement(world, store)
+    step_foraging(world, store)
+    step_conflict(world, store)
+    step_reproduction(world, store)
@@ -1,7 +1,8 @@
 from __future__ import annotations
-import random
-from collections import defaultdict
+import numpy as np
 from ..agent import Agent
+from ..grid import spatial_index, tracked_index
+from ..store import AgentStore, agent_ids
 from ..world import World
 
 _NEIGHBORS = [(-1,-1), (0,-1), (1,-1),
@@ -14,7 +15,8 @@ def _wrap(x: int, w: int) -> int:
 def _clamp(x: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, x))
 
-def step_conflict(world: World, agents: list[Agent]) -> tuple[list[Agent], int, int, list[tuple[int,int]]]:
+def step_conflict(world: World, agents: list[Agent] | AgentStore
+                  ) -> tuple[list[Agent] | AgentStore, int, int, list[tuple[int,int]]]:
     """
     Ritorna: (agents_vivi, deaths_conflict, attempts_conflict, conflict_positions)
     Scenari:
@@ -22,28 +24,35 @@ def step_conflict(world: World, agents: list[Agent]) -> tuple[list[Agent], int,
       - Affamato (streak>=H) vicino ad altro affamato (streak>=H) -> p = conflict_kill_prob_hungry_pair
     Visual: setta a.at_risk_conflict quando stiamo valutando il conflitto.
     """
+    if isinstance(agents, AgentStore):
+        return _step_conflict_store(world, agents)
     cfg = world.cfg
-    rng: random.Random = world.rng.py
     w, h = cfg.width, cfg.height
+    H = cfg.conflict_hunger_ticks
+
+    # un'estrazione per ogni affamato, in blocco e nell'ordine della lista
+    ids = agent_ids(agents)
+    hungry_mask = np.fromiter((a.hunger_streak_ticks >= H for a in agents), dtype=bool, count=len(agents))
+    draws = iter(world.uniform("conflict", ids[hungry_mask]).tolist())
 
     for a in agents:
         a.at_risk_conflict = False
 
-    cells = defaultdict(list)
-    for a in agents:
-        cells[(a.x, a.y)].append(a)
+    # indice spaziale persistente del mondo (aggiornato da movimento/nascite/morti)
+    index = spatial_index(world, agents)
+    nxt = index.next
 
     deaths_conflict = 0
     attempts_conflict = 0
     conflict_positions: list[tuple[int,int]] = []
     alive: list[Agent] = []
+    keep = np.ones(len(agents), dtype=bool)
 
-    H = cfg.conflict_hunger_ticks
-
-    for a in agents:
+    for i, a in enumerate(agents):
         if a.hunger_streak_ticks < H:
             alive.append(a)
             continue
+        u = next(draws)
 
         neighbor_has_eater = False
         neighbor_has_hungry = False
@@ -52,13 +61,17 @@ def step_conflict(world: World, agents: list[Agent]) -> tuple[list[Agent], int,
         for dx, dy in _NEIGHBORS:
             nx = _wrap(a.x + dx, w) if cfg.toroidal else _clamp(a.x + dx, 0, w-1)
             ny = _wrap(a.y + dy, h) if cfg.toroidal else _clamp(a.y + dy, 0, h-1)
-            for nb in cells.get((nx, ny), ()):
-                if nb.ate_recent_ticks > 0:
-                    neighbor_has_eater = True
-                    if nb.energy >= cfg.conflict_strong_energy_thresh:
-                        neighbor_strong = True
-                if nb.hunger_streak_ticks >= H:
-                    neighbor_has_hungry = True
+            j = index.first(nx, ny)
+            while j >= 0:
+                nb = agents[j]
+                if nb.x == nx and nb.y == ny:
+                    if nb.ate_recent_ticks > 0:
+                        neighbor_has_eater = True
+                        if nb.energy >= cfg.conflict_strong_energy_thresh:
+                            neighbor_strong = True
+                    if nb.hunger_streak_ticks >= H:
+                        neighbor_has_hungry = True
+                j = nxt[j]
 
         base_p = None
         if neighbor_has_eater:
@@ -80,10 +93,263 @@ def step_conflict(world: World, agents: list[Agent]) -> tuple[list[Agent], int,
             p += cfg.conflict_bonus_if_strong
         p = max(0.0, min(1.0, p))
 
-        if rng.random() < p:
+        if u < p:
             deaths_conflict += 1
             conflict_positions.append((a.x, a.y))
+            keep[i] = False
         else:
             alive.append(a)
 
+    if deaths_conflict:
+        index.remove(keep)
     return alive, deaths_conflict, attempts_conflict, conflict_positions
+
+def _step_conflict_store(world: World, store: AgentStore) -> tuple[AgentStore, int, int, list[tuple[int,int]]]:
+    cfg = world.cfg
+    w, h = cfg.width, cfg.height
+    H = cfg.conflict_hunger_ticks
+
+    store.at_risk_conflict = False
+    hunger = store.hunger_streak_ticks
+    hungry_idx = np.flatnonzero(hunger >= H)
+    if len(hungry_idx) == 0:
+        return store, 0, 0, []
+
+    # solo colonne in lettura: liste Python per il giro sui vicini
+    xs = store.x.tolist()
+    ys = store.y.tolist()
+    eater = (store.ate_recent_ticks > 0).tolist()
+    strong = (store.energy >= cfg.conflict_strong_energy_thresh).tolist()
+    hungry = (hunger >= H).tolist()
+    energy = store.energy
+
+    index = spatial_index(world, store)
+    nxt = index.next
+
+    deaths_conflict = 0
+    attempts_conflict = 0
+    conflict_positions: list[tuple[int,int]] = []
+    alive = np.ones(len(store), dtype=bool)
+    at_risk = store.at_risk_conflict
+    # stesse estrazioni (una per affamato, in ordine di riga) del percorso a oggetti
+    draws = world.uniform("conflict", store.id[hungry_idx]).tolist()
+
+    for i, u in zip(hungry_idx.tolist(), draws):
+        x, y = xs[i], ys[i]
+        neighbor_has_eater = False
+        neighbor_has_hungry = False
+        neighbor_strong = False
+
+        for dx, dy in _NEIGHBORS:
+            nx = _wrap(x + dx, w) if cfg.toroidal else _clamp(x + dx, 0, w-1)
+            ny = _wrap(y + dy, h) if cfg.toroidal else _clamp(y + dy, 0, h-1)
+            j = index.first(nx, ny)
+            while j >= 0:
+                if xs[j] == nx and ys[j] == ny:
+                    if eater[j]:
+                        neighbor_has_eater = True
+                        if strong[j]:
+                            neighbor_strong = True
+                    if hungry[j]:
+                        neighbor_has_hungry = True
+                j = nxt[j]
+
+        if neighbor_has_eater:
+            p = cfg.conflict_kill_prob
+        elif neighbor_has_hungry:
+            p = cfg.conflict_kill_prob_hungry_pair
+        else:
+            continue
+
+        at_risk[i] = True
+        attempts_conflict += 1
+
+        if energy[i] < cfg.conflict_weak_energy_thresh:
+            p += cfg.conflict_bonus_if_weak
+        if neighbor_has_eater and neighbor_strong:
+            p += cfg.conflict_bonus_if_strong
+        p = max(0.0, min(1.0, p))
+
+        if u < p:
+            deaths_conflict += 1
+            conflict_positions.append((x, y))
+            alive[i] = False
+
+    if deaths_conflict:
+        store.keep(alive)
+        index.remove(alive)
+    return store, deaths_conflict, attempts_conflict, conflict_positions
+
+
+# ---------------------------------------------------------------- variante a griglia
+
+def _neighbour_counts(grid: np.ndarray, toroidal: bool) -> np.ndarray:
+    """
+    Somma 3x3 (separabile) meno la cella centrale: per ogni cella il numero di celle
+    occupate tra le 8 vicine. Bordo toroidale con avvolgimento; altrimenti padding "edge",
+    che riproduce il clamp delle coordinate usato dal percorso per agente.
+    """
+    if toroidal:
+        padded = np.concatenate([grid[-1:], grid, grid[:1]])
+    else:
+        padded = np.pad(grid, ((1, 1), (0, 0)), mode="edge")
+    return _window_counts(padded, toroidal)
+
+def _window_counts(padded: np.ndarray, toroidal: bool) -> np.ndarray:
+    # come _neighbour_counts, ma le righe sopra e sotto sono già nella finestra
+    if toroidal:
+        row = padded + np.roll(padded, 1, axis=1) + np.roll(padded, -1, axis=1)
+    else:
+        p = np.pad(padded, ((0, 0), (1, 1)), mode="edge")
+        row = p[:, :-2] + p[:, 1:-1] + p[:, 2:]
+    return row[:-2] + row[1:-1] + row[2:] - padded[1:-1]
+
+def _occupancy(cells: np.ndarray, mask: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    grid = np.zeros(shape[0] * shape[1], dtype=np.uint8)
+    grid[cells[mask]] = 1
+    return grid.reshape(shape)
+
+def _resolve(world: World, ids: np.ndarray, energy: np.ndarray, candidates: np.ndarray,
+             has_eater: np.ndarray, has_hungry: np.ndarray, has_strong: np.ndarray,
+             at_risk: np.ndarray, dead: np.ndarray) -> None:
+    """
+    Probabilità ed estrazioni per gli affamati `candidates`: un blocco da world.rng.np,
+    oppure dal flusso a contatore per id con rng_mode "counter".
+    """
+    cfg = world.cfg
+    p = np.where(has_eater, cfg.conflict_kill_prob, cfg.conflict_kill_prob_hungry_pair)
+    p = p + np.where(energy[candidates] < cfg.conflict_weak_energy_thresh,
+                     cfg.conflict_bonus_if_weak, 0.0)
+    p = p + np.where(has_eater & has_strong, cfg.conflict_bonus_if_strong, 0.0)
+    np.clip(p, 0.0, 1.0, out=p)
+
+    risk = has_eater | has_hungry
+    candidates, p = candidates[risk], p[risk]
+    at_risk[candidates] = True
+    stream = world.stream("conflict")
+    u = stream.uniform(ids[candidates]) if stream is not None else world.rng.np.random(len(candidates))
+    dead[candidates[u < p]] = True
+
+def step_conflict_grid(world: World, agents: list[Agent] | AgentStore
+                       ) -> tuple[list[Agent] | AgentStore, int, int, list[tuple[int,int]]]:
+    """
+    Stesse regole di step_conflict, ma i vicini si leggono da tre griglie di occupazione
+    (chi ha mangiato di recente, affamati, mangiatori forti) filtrate con una somma 3x3:
+    il costo è O(celle + agenti) invece di O(affamati × vicini). Conviene con popolazioni
+    dense; le estrazioni sono un unico blocco da world.rng.np.
+    """
+    cfg = world.cfg
+    H = cfg.conflict_hunger_ticks
+    store = agents if isinstance(agents, AgentStore) else None
+    if store is not None:
+        ids, xs, ys = store.id, store.x, store.y
+        ate = store.ate_recent_ticks
+        hunger = store.hunger_streak_ticks
+        energy = store.energy
+    else:
+        n = len(agents)
+        ids = np.fromiter((a.id for a in agents), dtype=np.int64, count=n)
+        xs = np.fromiter((a.x for a in agents), dtype=np.int64, count=n)
+        ys = np.fromiter((a.y for a in agents), dtype=np.int64, count=n)
+        ate = np.fromiter((a.ate_recent_ticks for a in agents), dtype=np.int64, count=n)
+        hunger = np.fromiter((a.hunger_streak_ticks for a in agents), dtype=np.int64, count=n)
+        energy = np.fromiter((a.energy for a in agents), dtype=np.float64, count=n)
+
+    hungry = hunger >= H
+    at_risk = np.zeros(len(xs), dtype=bool)
+    dead = np.zeros(len(xs), dtype=bool)
+    candidates = np.flatnonzero(hungry)
+
+    if len(candidates):
+        shape = (cfg.height, cfg.width)
+        cells = ys.astype(np.int64) * cfg.width + xs
+        eater = ate > 0
+        near_eater = _neighbour_counts(_occupancy(cells, eater, shape), cfg.toroidal)
+        near_hungry = _neighbour_counts(_occupancy(cells, hungry, shape), cfg.toroidal)
+        near_strong = _neighbour_counts(
+            _occupancy(cells, eater & (energy >= cfg.conflict_strong_energy_thresh), shape),
+            cfg.toroidal)
+        c = cells[candidates]
+        _resolve(world, ids, energy, candidates, near_eater.reshape(-1)[c] > 0,
+                 near_hungry.reshape(-1)[c] > 0, near_strong.reshape(-1)[c] > 0, at_risk, dead)
+
+    attempts = int(at_risk.sum())
+    deaths = int(dead.sum())
+    positions = list(zip(xs[dead].tolist(), ys[dead].tolist()))
+    keep = ~dead
+
+    if deaths:
+        index = tracked_index(world, len(keep))
+        if index is not None:
+            index.remove(keep)
+    if store is not None:
+        store.at_risk_conflict = at_risk
+        if deaths:
+            store.keep(keep)
+        return store, deaths, attempts, positions
+
+    for a, r in zip(agents, at_risk.tolist()):
+        a.at_risk_conflict = r
+    alive = [a for a, k in zip(agents, keep.tolist()) if k] if deaths else agents
+    return alive, deaths, attempts, positions
+
+
+# ---------------------------------------------------------------- variante a striscia
+
+def _layers(cfg, store: AgentStore, sel=slice(None)) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (mangiatori recenti, affamati, mangiatori forti): le tre griglie della variante a griglia
+    eater = store.ate_recent_ticks[sel] > 0
+    hungry = store.hunger_streak_ticks[sel] >= cfg.conflict_hunger_ticks
+    strong = eater & (store.energy[sel] >= cfg.conflict_strong_energy_thresh)
+    return eater, hungry, strong
+
+def conflict_halo(cfg, store: AgentStore, y: int) -> np.ndarray:
+    """Riga di alone per un vicino: occupazione dei tre livelli nella riga y, (3, width) uint8."""
+    sel = store.y == y
+    xs = store.x[sel]
+    halo = np.zeros((3, cfg.width), dtype=np.uint8)
+    for k, mask in enumerate(_layers(cfg, store, sel)):
+        halo[k, xs[mask]] = 1
+    return halo
+
+def step_conflict_strip(world: World, store: AgentStore, y0: int, y1: int,
+                        halo_up: np.ndarray | None, halo_down: np.ndarray | None
+                        ) -> tuple[AgentStore, int, int, list[tuple[int,int]]]:
+    """
+    step_conflict_grid per un worker di parallel.py che possiede le righe [y0, y1).
+    Le righe y0-1 e y1 arrivano dai vicini come alone (conflict_halo); None al bordo di un
+    mondo non toroidale, dove si replica la riga di bordo come fa il padding "edge".
+    Con gli stessi agenti gli esiti coincidono con la variante sull'intera griglia.
+    """
+    cfg = world.cfg
+    w = cfg.width
+    n = len(store)
+    eater, hungry, strong = _layers(cfg, store)
+    at_risk = np.zeros(n, dtype=bool)
+    dead = np.zeros(n, dtype=bool)
+    candidates = np.flatnonzero(hungry)
+
+    if len(candidates):
+        # finestra (righe + 2) × larghezza: riga 0 e ultima riga sono l'alone
+        shape = (y1 - y0 + 2, w)
+        cells = (store.y.astype(np.int64) - (y0 - 1)) * w + store.x
+        near = []
+        for k, mask in enumerate((eater, hungry, strong)):
+            grid = _occupancy(cells, mask, shape)
+            grid[0] = halo_up[k] if halo_up is not None else grid[1]
+            grid[-1] = halo_down[k] if halo_down is not None else grid[-2]
+            near.append(_window_counts(grid, cfg.toroidal).reshape(-1))
+        c = cells[candidates] - w
+        _resolve(world, store.id, store.energy, candidates, near[0][c] > 0, near[1][c] > 0,
+                 near[2][c] > 0, at_risk, dead)
+
+    store.at_risk_conflict = at_risk
+    deaths = int(dead.sum())
+    positions = list(zip(store.x[dead].tolist(), store.y[dead].tolist()))
+    if deaths:
+        keep = ~dead
+        index = tracked_index(world, n)
+        if index is not None:
+            index.remove(keep)
+        store.keep(keep)
+    return store, deaths, int(at_risk.sum()), positions
@@ -1,23 +1,24 @@
 from __future__ import annotations
-import random
+import numpy as np
 from ..agent import Agent
+from ..store import AgentStore, agent_ids
 from ..world import World
-from ..config import years_per_tick
+from ..config import years_per_tick, per_tick_prob
 
-def _per_tick_prob(p_annual: float, yp: float) -> float:
-    # converte probabilità annuale in probabilità per tick che dura yp anni
-    return 1.0 - (1.0 - p_annual) ** yp
-
-def step_disease(world: World, agents: list[Agent]) -> dict:
+def step_disease(world: World, agents: list[Agent] | AgentStore) -> dict:
+    if isinstance(agents, AgentStore):
+        return _step_disease_store(world, agents)
     cfg = world.cfg
     yp = years_per_tick(cfg)
-    rng: random.Random = world.rng.py
     deaths_disease = 0
+    p_infect = per_tick_prob(cfg.infection_annual_prob, yp)
+    p_recover = per_tick_prob(cfg.disease_recovery_annual_prob, yp)
 
-    for a in agents:
-        # infezione
+    # infezione e guarigione sono esclusive: una sola estrazione per agente, in blocco
+    draws = world.uniform("disease", lambda: agent_ids(agents), len(agents)).tolist()
+    for a, u in zip(agents, draws):
         if not a.infected:
-            if rng.random() < _per_tick_prob(cfg.infection_annual_prob, yp):
+            if u < p_infect:
                 a.infected = True
                 a.disease_years = 0.0
         else:
@@ -27,8 +28,31 @@ def step_disease(world: World, agents: list[Agent]) -> dict:
 
             # recovery
             if a.disease_years >= cfg.disease_recovery_after_years:
-                if rng.random() < _per_tick_prob(cfg.disease_recovery_annual_prob, yp):
+                if u < p_recover:
                     a.infected = False
                     a.disease_years = 0.0
 
     return {"deaths_disease": deaths_disease}  # il conteggio finale avviene in mortality
+
+def _step_disease_store(world: World, store: AgentStore) -> dict:
+    """
+    Versione a colonne: un'unica estrazione uniforme per agente e per tick.
+    Infezione (sani) e guarigione (infetti oltre soglia) sono eventi esclusivi,
+    quindi possono condividere lo stesso numero casuale.
+    """
+    cfg = world.cfg
+    yp = years_per_tick(cfg)
+    u = world.uniform("disease", store.id)
+
+    sick = store.infected.copy()
+    years = store.disease_years
+    np.add(years, yp, out=years, where=sick)
+    np.subtract(store.energy, cfg.disease_energy_loss_per_year * yp, out=store.energy, where=sick)
+
+    infect = ~sick & (u < per_tick_prob(cfg.infection_annual_prob, yp))
+    recover = (sick & (years >= cfg.disease_recovery_after_years) &
+               (u < per_tick_prob(cfg.disease_recovery_annual_prob, yp)))
+    store.infected = (sick & ~recover) | infect
+    years[infect | recover] = 0.0
+
+    return {"deaths_disease": 0}  # il conteggio finale avviene in mortality
@@ -1,14 +1,38 @@
 from __future__ import annotations
+import numpy as np
 from ..agent import Agent
+from ..grid import positions
+from ..store import AgentStore
 from ..world import World
 
-def step_foraging(world: World, agents: list[Agent]) -> None:
+def step_foraging(world: World, agents: list[Agent] | AgentStore) -> None:
     th = getattr(world.cfg, "min_eat_to_count", 0.02)
-    for a in agents:
-        val = world.food[a.y, a.x]
+    if isinstance(agents, AgentStore):
+        _step_foraging_store(world, agents, th)
+        return
+    if world.food_dirty is not None:
+        world.food_dirty.mark(*positions(agents))
+    if world.food_is_remote:
+        # mappa a tile o residente sul dispositivo: si lavora su una copia compatta
+        # (host) delle sole celle occupate
+        xs, ys = positions(agents)
+        uniq, inv = _unique_cells(world, xs, ys)
+        food = world.food_at(uniq % world.cfg.width, uniq // world.cfg.width)[None, :]
+        cells = [(0, j) for j in inv.tolist()]
+    else:
+        if world.food_tick is not None:
+            world.sync_cells(*positions(agents))
+        food = world.food
+        cells = [(a.y, a.x) for a in agents]
+    pairs = zip(agents, cells)
+    if world.cfg.rng_mode == "counter":
+        # chi condivide una cella mangia in ordine di id, non di iterazione
+        pairs = sorted(pairs, key=lambda p: p[0].id)
+    for a, c in pairs:
+        val = food[c]
         eat = min(0.1, float(val))
         if eat > 0.0:
-            world.food[a.y, a.x] -= eat
+            food[c] -= eat
             a.energy += eat * 5.0
             if eat >= th:
                 a.ate_recent_ticks = 5
@@ -21,3 +45,58 @@ def step_foraging(world: World, agents: list[Agent]) -> None:
             a.hunger_streak_ticks += 1
             if a.ate_recent_ticks > 0:
                 a.ate_recent_ticks -= 1
+    if world.food_is_remote:
+        world.set_food(uniq % world.cfg.width, uniq // world.cfg.width, food[0])
+
+def _unique_cells(world: World, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Celle distinte (indice lineare) e, per ogni agente, la posizione della sua cella."""
+    return np.unique(ys.astype(np.int64) * world.cfg.width + xs, return_inverse=True)
+
+def _cell_rank(cell: np.ndarray, ids: np.ndarray | None = None) -> np.ndarray:
+    """
+    Posizione di ogni agente tra quelli della stessa cella, in ordine di iterazione
+    (oppure di id, se `ids` è dato).
+    """
+    n = len(cell)
+    order = np.argsort(cell, kind="stable") if ids is None else np.lexsort((ids, cell))
+    sc = cell[order]
+    first = np.ones(n, dtype=bool)
+    first[1:] = sc[1:] != sc[:-1]
+    pos = np.arange(n)
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = pos - np.maximum.accumulate(np.where(first, pos, 0))
+    return rank
+
+def _step_foraging_store(world: World, store: AgentStore, th: float) -> None:
+    n = len(store)
+    if n == 0:
+        return
+    if world.food_dirty is not None:
+        world.food_dirty.mark(store.x, store.y)
+    cell = store.y.astype(np.int64) * world.cfg.width + store.x
+    if world.food_is_remote:
+        uniq, idx = _unique_cells(world, store.x, store.y)
+        flat = world.food_at(uniq % world.cfg.width, uniq // world.cfg.width)
+    else:
+        world.sync_cells(store.x, store.y)
+        flat = world.food.reshape(-1)
+        idx = cell
+    eat = np.zeros(n, dtype=np.float64)
+
+    # Chi condivide la cella mangia in sequenza (come nel loop per agente):
+    # un giro per "rango", dentro ogni giro le celle sono tutte distinte.
+    rank = _cell_rank(cell, store.id if world.cfg.rng_mode == "counter" else None)
+    for r in range(int(rank.max()) + 1):
+        sel = np.flatnonzero(rank == r)
+        c = idx[sel]
+        e = np.minimum(0.1, flat[c].astype(np.float64))
+        e[e < 0.0] = 0.0
+        flat[c] -= e.astype(np.float32)
+        eat[sel] = e
+    if world.food_is_remote:
+        world.set_food(uniq % world.cfg.width, uniq // world.cfg.width, flat)
+
+    store.energy += eat * 5.0
+    ate = (eat > 0.0) & (eat >= th)
+    store.ate_recent_ticks = np.where(ate, 5, np.maximum(store.ate_recent_ticks - 1, 0))
+    store.hunger_streak_ticks = np.where(ate, 0, store.hunger_streak_ticks + 1)
@@ -1,24 +1,33 @@
 from __future__ import annotations
-import random
+import numpy as np
 from ..agent import Agent
+from ..grid import tracked_index
+from ..store import AgentStore
 from ..world import World
-from ..config import years_per_tick
+from ..config import years_per_tick, per_tick_prob
 
-def step_mortality(world: World, agents: list[Agent]) -> tuple[list[Agent], dict]:
+def step_mortality(world: World, agents: list[Agent] | AgentStore) -> tuple[list[Agent] | AgentStore, dict]:
+    if isinstance(agents, AgentStore):
+        return _step_mortality_store(world, agents)
     cfg = world.cfg
     yp = years_per_tick(cfg)
-    rng: random.Random = world.rng.py
+    p_disease = per_tick_prob(cfg.disease_mortality_annual_prob, yp)
+
+    # estrazione in blocco solo per gli infetti oltre la soglia, in ordine di lista
+    at_risk = [a.id for a in agents
+               if a.infected and a.disease_years >= cfg.disease_mortality_after_years]
+    draws = iter(world.uniform("mortality", np.array(at_risk, dtype=np.int64)).tolist())
 
     deaths = {"starvation": 0, "age": 0, "disease": 0}
     alive: list[Agent] = []
+    keep = np.ones(len(agents), dtype=bool)
 
-    for a in agents:
+    for i, a in enumerate(agents):
         died = False
 
         # malattia – mortalità dopo soglia
         if a.infected and a.disease_years >= cfg.disease_mortality_after_years:
-            p = 1.0 - (1.0 - cfg.disease_mortality_annual_prob) ** yp
-            if rng.random() < p:
+            if next(draws) < p_disease:
                 deaths["disease"] += 1
                 died = True
 
@@ -32,5 +41,36 @@ def step_mortality(world: World, agents: list[Agent]) -> tuple[list[Agent], dict
 
         if not died:
             alive.append(a)
+        else:
+            keep[i] = False
 
+    _drop_from_index(world, keep)
     return alive, deaths
+
+def _drop_from_index(world: World, keep: np.ndarray) -> None:
+    index = tracked_index(world, len(keep))
+    if index is not None:
+        index.remove(keep)
+
+def _step_mortality_store(world: World, store: AgentStore) -> tuple[AgentStore, dict]:
+    cfg = world.cfg
+    yp = years_per_tick(cfg)
+
+    # estrazione in blocco solo per gli infetti oltre la soglia di mortalità
+    at_risk = np.flatnonzero(store.infected & (store.disease_years >= cfg.disease_mortality_after_years))
+    u = world.uniform("mortality", store.id[at_risk])
+
+    dead_disease = np.zeros(len(store), dtype=bool)
+    dead_disease[at_risk[u < per_tick_prob(cfg.disease_mortality_annual_prob, yp)]] = True
+    dead_starv = ~dead_disease & (store.energy <= 0.0)
+    dead_age = ~dead_disease & ~dead_starv & (store.age_years > store.max_age)
+
+    deaths = {
+        "starvation": int(dead_starv.sum()),
+        "age": int(dead_age.sum()),
+        "disease": int(dead_disease.sum()),
+    }
+    keep = ~(dead_disease | dead_starv | dead_age)
+    _drop_from_index(world, keep)
+    store.keep(keep)
+    return store, deaths
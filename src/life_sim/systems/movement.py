@@ -1,13 +1,53 @@
 from __future__ import annotations
-from typing import Iterable
+from typing import Callable
+import numpy as np
 from ..agent import Agent
+from ..grid import tracked_index, positions
+from ..store import AgentStore, agent_ids
 from ..world import World
 
-def step_movement(world: World, agents: list[Agent]) -> None:
+def displacements(world: World, ids: np.ndarray | Callable[[], np.ndarray], n: int | None = None
+                  ) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Spostamenti (dx, dy) in {-1, 0, 1} per tutti gli agenti del tick, estratti in blocco:
+    un array di interi da rng.np, oppure dal flusso a contatore con rng_mode "counter"
+    (`ids` e `n` come in World.uniform).
+    """
+    stream = world.stream("movement")
+    if stream is not None:
+        ids = ids() if callable(ids) else ids
+        return stream.integers(ids, -1, 2, 0), stream.integers(ids, -1, 2, 1)
+    d = world.rng.np.integers(-1, 2, size=(len(ids) if n is None else n, 2), dtype=np.int32)
+    return d[:, 0], d[:, 1]
+
+def step_movement(world: World, agents: list[Agent] | AgentStore) -> None:
     # Placeholder: jitter casuale minimo (da sostituire con logica di ricerca cibo)
-    rng = world.rng.py
+    if isinstance(agents, AgentStore):
+        _step_movement_store(world, agents)
+        return
     w, h = world.cfg.width, world.cfg.height
-    for a in agents:
-        dx, dy = rng.choice([-1, 0, 1]), rng.choice([-1, 0, 1])
+    dxs, dys = displacements(world, lambda: agent_ids(agents), len(agents))
+    for a, dx, dy in zip(agents, dxs.tolist(), dys.tolist()):
         a.x = (a.x + dx) % w if world.cfg.toroidal else max(0, min(w-1, a.x + dx))
         a.y = (a.y + dy) % h if world.cfg.toroidal else max(0, min(h-1, a.y + dy))
+    _update_index(world, agents)
+
+def _update_index(world: World, agents: list[Agent] | AgentStore) -> None:
+    # l'indice spaziale persistente segue gli spostamenti (ricollega solo chi cambia bucket)
+    index = tracked_index(world, len(agents))
+    if index is not None:
+        index.update(*positions(agents))
+
+def _step_movement_store(world: World, store: AgentStore) -> None:
+    w, h = world.cfg.width, world.cfg.height
+    # stesse estrazioni (e stesso ordine dx, dy per agente) del percorso a oggetti
+    dx, dy = displacements(world, store.id)
+    x = store.x + dx
+    y = store.y + dy
+    if world.cfg.toroidal:
+        store.x = x % w
+        store.y = y % h
+    else:
+        store.x = np.clip(x, 0, w - 1)
+        store.y = np.clip(y, 0, h - 1)
+    _update_index(world, store)
@@ -1,35 +1,69 @@
 from __future__ import annotations
 import random
-from collections import defaultdict
+import numpy as np
 from ..agent import Agent
+from ..grid import spatial_index, tracked_index
+from ..store import AgentStore, SEX_M, SEX_F
 from ..world import World
 from ..config import years_per_tick
 
-def step_reproduction(world: World, agents: list[Agent]) -> tuple[list[Agent], int]:
+# estrazioni per agente nel flusso "reproduction" (rng_mode "counter")
+_DRAW_ORDER, _DRAW_MEET, _DRAW_SEX, _DRAW_CHILD_ID = 0, 1, 2, 4
+
+def child_ids(stream, mother_ids: np.ndarray) -> np.ndarray:
+    """
+    Id dei nuovi nati con i flussi a contatore: 62 bit casuali per (madre, tick), così
+    non dipendono da quale processo o percorso registra la nascita.
+    """
+    return (stream.bits(mother_ids, _DRAW_CHILD_ID) >> np.uint64(2)).astype(np.int64)
+
+def step_reproduction(world: World, agents: list[Agent] | AgentStore) -> tuple[list[Agent] | AgentStore, int]:
+    if isinstance(agents, AgentStore):
+        return _step_reproduction_store(world, agents)
     cfg = world.cfg
     yp = years_per_tick(cfg)
     rng: random.Random = world.rng.py
+    stream = world.stream("reproduction")
 
-    # bucket per cella: così troviamo incontri M-F
-    cells = defaultdict(list)
-    for a in agents:
-        cells[(a.x, a.y)].append(a)
+    # gruppi per cella dall'indice spaziale: così troviamo incontri M-F
+    index = spatial_index(world, agents)
+    nxt = index.next
+    seen = [False] * len(agents)
 
     newborns = 0
     new_agents: list[Agent] = []
 
     next_id = (max((a.id for a in agents), default=-1) + 1)
 
-    for (x, y), group in cells.items():
-        males = [a for a in group if a.sex == "M"]
-        females = [a for a in group if a.sex == "F"]
+    for i, a in enumerate(agents):
+        if seen[i]:
+            continue
+        x, y = a.x, a.y
+        rows: list[int] = []
+        j = index.first(x, y)
+        while j >= 0:
+            nb = agents[j]
+            if nb.x == x and nb.y == y:
+                seen[j] = True
+                rows.append(j)
+            j = nxt[j]
+        # in ordine di lista, non di catena: la catena dipende da come è stato aggiornato
+        # l'indice, e rng.shuffle deve permutare sempre la stessa sequenza
+        rows.sort()
+        males = [agents[j] for j in rows if agents[j].sex == "M"]
+        females = [agents[j] for j in rows if agents[j].sex != "M"]
 
         if not males or not females:
             continue
 
         # Abbiniamo random una coppia alla volta (semplice)
-        rng.shuffle(males)
-        rng.shuffle(females)
+        if stream is not None:
+            # ordine casuale per chiave dell'agente: non dipende dall'ordine di visita
+            males.sort(key=lambda m: stream.uniform1(m.id, _DRAW_ORDER))
+            females.sort(key=lambda f: stream.uniform1(f.id, _DRAW_ORDER))
+        else:
+            rng.shuffle(males)
+            rng.shuffle(females)
         for m, f in zip(males, females):
             # condizioni
             if (m.age_years >= cfg.maturity_age_years and
@@ -38,7 +72,8 @@ def step_reproduction(world: World, agents: list[Agent]) -> tuple[list[Agent], i
                 f.energy >= cfg.reproduction_energy_min and
                 m.repro_cooldown_years <= 0.0 and
                 f.repro_cooldown_years <= 0.0):
-                if rng.random() <= cfg.reproduction_prob_per_meeting:
+                u = stream.uniform1(m.id, _DRAW_MEET) if stream is not None else rng.random()
+                if u <= cfg.reproduction_prob_per_meeting:
                     # costo
                     m.energy -= cfg.reproduction_cost
                     f.energy -= cfg.reproduction_cost
@@ -46,9 +81,14 @@ def step_reproduction(world: World, agents: list[Agent]) -> tuple[list[Agent], i
                     f.repro_cooldown_years = cfg.reproduction_cooldown_years
 
                     # figlio
-                    sex = "M" if rng.random() < 0.5 else "F"
+                    if stream is not None:
+                        sex = "M" if stream.uniform1(f.id, _DRAW_SEX) < 0.5 else "F"
+                        child_id = stream.bits1(f.id, _DRAW_CHILD_ID) >> 2
+                    else:
+                        sex = "M" if rng.random() < 0.5 else "F"
+                        child_id = next_id
                     child = Agent(
-                        id=next_id, x=x, y=y, sex=sex,
+                        id=child_id, x=x, y=y, sex=sex,
                         energy=cfg.child_energy,
                         age_years=0.0,
                         max_age=(m.max_age + f.max_age)/2.0
@@ -58,5 +98,87 @@ def step_reproduction(world: World, agents: list[Agent]) -> tuple[list[Agent], i
                     newborns += 1
 
     if new_agents:
+        index = tracked_index(world, len(agents))
         agents.extend(new_agents)
+        if index is not None:
+            index.append(np.fromiter((c.x for c in new_agents), dtype=np.int32, count=newborns),
+                         np.fromiter((c.y for c in new_agents), dtype=np.int32, count=newborns))
     return agents, newborns
+
+def _step_reproduction_store(world: World, store: AgentStore) -> tuple[AgentStore, int]:
+    """
+    Accoppiamento vettoriale. Stesso modello del percorso per agente: in ogni cella i
+    maschi e le femmine vengono messi in ordine casuale e abbinati per rango (il k-esimo
+    con la k-esima); la coppia genera se entrambi sono idonei e supera la probabilità
+    d'incontro. Le celle senza almeno un maschio e una femmina idonei non possono dare
+    nascite, quindi vengono escluse prima dell'ordinamento.
+    """
+    cfg = world.cfg
+    rng = world.rng.np
+    stream = world.stream("reproduction")
+    n = len(store)
+    if n == 0:
+        return store, 0
+
+    eligible = ((store.age_years >= cfg.maturity_age_years) &
+                (store.energy >= cfg.reproduction_energy_min) &
+                (store.repro_cooldown_years <= 0.0))
+    male = store.sex == SEX_M
+    cells = store.y.astype(np.int64) * cfg.width + store.x
+    fertile = np.intersect1d(cells[eligible & male], cells[eligible & ~male])
+    if len(fertile) == 0:
+        return store, 0
+    cand = np.flatnonzero(np.isin(cells, fertile))
+
+    # ordine per (cella, sesso, chiave casuale): in ogni cella prima i maschi (SEX_M=0)
+    keys = (stream.uniform(store.id[cand], _DRAW_ORDER) if stream is not None
+            else rng.random(len(cand)))
+    order = cand[np.lexsort((keys, store.sex[cand], cells[cand]))]
+    sc = cells[order]
+    sm = male[order]
+    k = len(order)
+    first = np.ones(k, dtype=bool)
+    first[1:] = sc[1:] != sc[:-1]
+    starts = np.flatnonzero(first)
+    group = np.cumsum(first) - 1
+    n_males = np.add.reduceat(sm.astype(np.int64), starts)
+    n_females = np.diff(np.append(starts, k)) - n_males
+
+    pos = np.arange(k)
+    rank = pos - starts[group]
+    paired = sm & (rank < n_females[group])
+    mpos = pos[paired]
+    g = group[mpos]
+    pm = order[mpos]
+    pf = order[starts[g] + n_males[g] + rank[mpos]]
+
+    # tutte le prove di accettazione in un colpo solo
+    ok = eligible[pm] & eligible[pf]
+    u = stream.uniform(store.id[pm], _DRAW_MEET) if stream is not None else rng.random(len(pm))
+    ok &= u <= cfg.reproduction_prob_per_meeting
+    pm, pf = pm[ok], pf[ok]
+    newborns = len(pm)
+    if newborns == 0:
+        return store, 0
+
+    parents = np.concatenate([pm, pf])
+    store.energy[parents] -= cfg.reproduction_cost
+    store.repro_cooldown_years[parents] = cfg.reproduction_cooldown_years
+
+    # nuovi nati in blocco: id da store.next_id, max_age media dei genitori
+    index = tracked_index(world, n)
+    u_sex = stream.uniform(store.id[pf], _DRAW_SEX) if stream is not None else rng.random(newborns)
+    children = {
+        "x": store.x[pf],
+        "y": store.y[pf],
+        "sex": np.where(u_sex < 0.5, SEX_M, SEX_F),
+        "energy": np.full(newborns, cfg.child_energy),
+        "age_years": np.zeros(newborns),
+        "max_age": (store.max_age[pm] + store.max_age[pf]) / 2.0,
+    }
+    if stream is not None:
+        children["id"] = child_ids(stream, store.id[pf])
+    rows = store.extend(children)
+    if index is not None:
+        index.append(store.x[rows], store.y[rows])
+    return store, newborns
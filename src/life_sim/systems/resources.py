@@ -1,20 +1,20 @@
 from __future__ import annotations
-import numpy as np
 from ..world import World
 
-def step_resources(world: World) -> None:
+def step_resources(world: World, rows: slice | None = None) -> None:
+    """
+    Rigenerazione logistica del cibo. `rows` limita l'aggiornamento eager a una fascia
+    di righe (i worker di parallel.py rigenerano solo la propria striscia).
+    """
+    if world.food_tick is not None or world.tiles is not None:
+        # modalità lazy: nessuna cella toccata, la rigenerazione si applica alla lettura
+        # (World.sync_cells / World.food_now), quindi il costo segue gli agenti e non l'area
+        world.resource_tick += 1
+        return
     alpha = world.cfg.resource_regen_rate
-    if world.cfg.compute_backend.lower() == "cupy":
-        try:
-            import cupy as cp
-            d = cp.asarray(world.food)         # upload CPU -> GPU
-            d += alpha * (1.0 - d)             # rigenerazione su GPU
-            cp.clip(d, 0.0, 1.0, out=d)
-            world.food = cp.asnumpy(d)         # download GPU -> CPU
-        except Exception:
-            # fallback CPU
-            world.food += alpha * (1.0 - world.food)
-            np.clip(world.food, 0.0, 1.0, out=world.food)
-    else:
-        world.food += alpha * (1.0 - world.food)
-        np.clip(world.food, 0.0, 1.0, out=world.food)
+    # aggiornamento sul posto nel modulo array del backend: con cupy la mappa resta
+    # sulla GPU, nessuna copia host <-> dispositivo per tick
+    xp = world.backend.xp
+    food = world.food if rows is None else world.food[rows]
+    food += alpha * (1.0 - food)
+    xp.clip(food, 0.0, 1.0, out=food)
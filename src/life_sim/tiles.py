@@ -0,0 +1,301 @@
+"""
+Mappa del cibo a tile allocate al primo accesso, per mondi enormi e poco popolati
+(SimConfig.food_backend = "tiled").
+
+- La mappa è divisa in tile tile×tile. Una tile esiste in memoria solo dopo che la
+  simulazione ne ha letto una cella: le altre restano nel loro stato analitico, cioè
+  il valore iniziale rigenerato in forma chiusa, 1 − (1 − f0)(1 − α)^t.
+- Le tile allocate stanno in un unico pool (values/stamp di forma (k, tile, tile)) e
+  `slot` mappa l'id della tile (ty * tiles_x + tx) alla sua riga nel pool (-1 = assente):
+  letture e scritture su celle sparse sono indicizzazioni vettoriali.
+- Dentro le tile la rigenerazione è pigra come in resource_mode = "lazy": ogni cella
+  ricorda il tick del suo ultimo aggiornamento.
+- Il cibo iniziale è procedurale: le macchie di ogni tile derivano da un hash di
+  (seed, tile, indice), quindi qualunque cella si può valutare senza generare il resto
+  della mappa. Densità, raggi e intensità seguono World.create, ma la disposizione delle
+  macchie è diversa da quella della mappa densa con lo stesso seed.
+"""
+from __future__ import annotations
+import math
+
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MAX_RADIUS = 12  # come World.create: raggio delle macchie in [3, 12]
+# offset del disco di raggio massimo (quelli di un raggio r hanno d² <= r²)
+_OY, _OX = (a.ravel() for a in np.mgrid[-_MAX_RADIUS:_MAX_RADIUS + 1, -_MAX_RADIUS:_MAX_RADIUS + 1])
+_D2 = _OX * _OX + _OY * _OY
+_DISC = _D2 <= _MAX_RADIUS ** 2
+_OY, _OX, _D2 = _OY[_DISC], _OX[_DISC], _D2[_DISC]
+# coppie (tile, macchia) per blocco in _rasterize: temporanei di circa 1 MB ciascuno
+_RASTER_PAIRS = 1 << 8
+
+
+def _mix(z: np.ndarray) -> np.ndarray:
+    # finalizzatore splitmix64 (aritmetica uint64 modulare)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _uniform(seed: int, tile_ids: np.ndarray, k: np.ndarray, field: int) -> np.ndarray:
+    """Uniformi in [0, 1) indicizzate da (seed, tile, k, campo), senza stato."""
+    with np.errstate(over="ignore"):
+        z = _mix(np.uint64(seed & 0xFFFFFFFFFFFFFFFF) * _GOLDEN + tile_ids.astype(np.uint64))
+        z = _mix(z + k.astype(np.uint64) * _GOLDEN + np.uint64(field))
+    return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+class TiledFood:
+    def __init__(self, width: int, height: int, tile: int, regen_rate: float, seed: int,
+                 initial_mean: float, initial_flat: bool):
+        if tile < _MAX_RADIUS:
+            raise ValueError(f"tile_size deve essere almeno {_MAX_RADIUS} (trovato {tile})")
+        self.width, self.height, self.tile = width, height, tile
+        self.regen_rate = regen_rate
+        self.seed = seed
+        self.initial_mean = initial_mean
+        self.initial_flat = initial_flat
+        self.tiles_x = -(-width // tile)
+        self.tiles_y = -(-height // tile)
+        self.slot = np.full(self.tiles_x * self.tiles_y, -1, dtype=np.int32)
+        self.count = 0
+        self._alloc(16)
+        self._preview_cache: dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_config(cls, cfg) -> "TiledFood":
+        return cls(cfg.width, cfg.height, cfg.tile_size, cfg.resource_regen_rate, cfg.seed,
+                   cfg.initial_food_mean, cfg.initial_food_flat)
+
+    # ---- pool ----
+    def _alloc(self, cap: int) -> None:
+        t = self.tile
+        values = np.zeros((cap, t, t), dtype=np.float32)
+        stamp = np.zeros((cap, t, t), dtype=np.int32)
+        tile_ids = np.zeros(cap, dtype=np.int64)
+        if self.count:
+            values[:self.count] = self.values[:self.count]
+            stamp[:self.count] = self.stamp[:self.count]
+            tile_ids[:self.count] = self.tile_ids[:self.count]
+        self.values, self.stamp, self.tile_ids = values, stamp, tile_ids
+
+    @property
+    def allocated(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata dalle tile allocate (più la directory degli slot)."""
+        per_tile = self.values[0].nbytes + self.stamp[0].nbytes + 8
+        return self.count * per_tile + self.slot.nbytes
+
+    def tile_of(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return (ys // self.tile).astype(np.int64) * self.tiles_x + xs // self.tile
+
+    def allocated_tiles(self) -> np.ndarray:
+        """Id delle tile in memoria, in ordine di allocazione."""
+        return self.tile_ids[:self.count]
+
+    # ---- cibo iniziale procedurale ----
+    def _tile_bounds(self, tile_ids: np.ndarray):
+        tx, ty = tile_ids % self.tiles_x, tile_ids // self.tiles_x
+        x0, y0 = tx * self.tile, ty * self.tile
+        tw = np.minimum(self.tile, self.width - x0)
+        th = np.minimum(self.tile, self.height - y0)
+        return x0, y0, tw, th
+
+    def _clusters(self, tile_ids: np.ndarray):
+        """
+        Macchie con centro nelle tile date: (cx, cy, r, intensità) di forma (len, K) e
+        maschera delle presenti. In media area × initial_mean × 0.02 macchie per tile.
+        """
+        x0, y0, tw, th = self._tile_bounds(tile_ids)
+        lam = (tw * th).astype(np.float64) * self.initial_mean * 0.02
+        k_max = max(1, int(math.ceil(float(lam.max())))) if len(lam) else 1
+        ids = tile_ids[:, None]
+        k = np.arange(k_max)[None, :]
+        u = [_uniform(self.seed, ids, k, f) for f in range(4)]
+        n = np.floor(lam) + (_uniform(self.seed, tile_ids, np.full(len(tile_ids), k_max), 4)
+                             < lam - np.floor(lam))
+        present = k < n[:, None]
+        cx = x0[:, None] + np.floor(u[0] * tw[:, None]).astype(np.int64)
+        cy = y0[:, None] + np.floor(u[1] * th[:, None]).astype(np.int64)
+        r = 3 + np.floor(u[2] * 10).astype(np.int64)
+        lo = self.initial_mean * 0.5
+        hi = min(1.0, self.initial_mean * 1.5)
+        inten = lo + u[3] * (hi - lo)
+        return cx, cy, r, inten, present
+
+    def initial_at(self, xs: np.ndarray, ys: np.ndarray, chunk: int = 1 << 16) -> np.ndarray:
+        """Cibo al tick 0 nelle celle date (nessuna tile viene allocata)."""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        if self.initial_flat:
+            return np.full(len(xs), self.initial_mean, dtype=np.float32)
+        # raggio delle macchie <= tile: bastano la tile della cella e le 8 vicine
+        tiles = self.tile_of(xs, ys)
+        tx, ty = tiles % self.tiles_x, tiles // self.tiles_x
+        near = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                nx, ny = tx + dx, ty + dy
+                ok = (nx >= 0) & (nx < self.tiles_x) & (ny >= 0) & (ny < self.tiles_y)
+                near.append(np.where(ok, ny * self.tiles_x + nx, -1))
+        near = np.stack(near, axis=1)  # (P, 9)
+        uniq, inv = np.unique(near[near >= 0], return_inverse=True)
+        cx, cy, r, inten, present = self._clusters(uniq)
+        row = np.full(near.shape, -1, dtype=np.int64)
+        row[near >= 0] = inv
+
+        out = np.empty(len(xs), dtype=np.float32)
+        for s in range(0, len(xs), chunk):
+            e = min(len(xs), s + chunk)
+            rr = row[s:e]                      # (p, 9)
+            valid = (rr >= 0)[:, :, None] & present[rr]
+            dx = xs[s:e, None, None] - cx[rr]
+            dy = ys[s:e, None, None] - cy[rr]
+            hit = valid & (dx * dx + dy * dy <= r[rr] ** 2)
+            total = np.where(hit, inten[rr], 0.0).sum(axis=(1, 2))
+            out[s:e] = np.minimum(total, 1.0)
+        return out
+
+    def _rasterize(self, tile_ids: np.ndarray, chunk: int = _RASTER_PAIRS) -> np.ndarray:
+        """
+        Cibo iniziale di intere tile, (len, tile, tile). Stessi valori di initial_at, ma
+        ogni macchia che tocca la tile viene stampata sul suo riquadro (2r+1)² invece di
+        controllare ogni cella contro tutte le macchie vicine.
+        """
+        t, b = self.tile, len(tile_ids)
+        out = np.zeros(b * t * t, dtype=np.float64)
+        if self.initial_flat:
+            out.fill(self.initial_mean)
+            return out.astype(np.float32).reshape(b, t, t)
+        x0, y0, _, _ = self._tile_bounds(tile_ids)
+        tx, ty = tile_ids % self.tiles_x, tile_ids // self.tiles_x
+        near = np.stack([np.where((tx + dx >= 0) & (tx + dx < self.tiles_x) &
+                                  (ty + dy >= 0) & (ty + dy < self.tiles_y),
+                                  (ty + dy) * self.tiles_x + tx + dx, -1)
+                         for dy in (-1, 0, 1) for dx in (-1, 0, 1)], axis=1)  # (B, 9)
+        uniq, inv = np.unique(near[near >= 0], return_inverse=True)
+        cx, cy, r, inten, present = self._clusters(uniq)
+        k = cx.shape[1]
+        target, src = np.nonzero(near >= 0)
+        rows = inv  # stesso ordine di near[near >= 0]
+        # (coppia tile-destinazione, macchia) con la macchia che interseca la tile
+        target = np.repeat(target, k)
+        rows = np.repeat(rows, k)
+        kk = np.tile(np.arange(k), len(src))
+        mcx, mcy, mr = cx[rows, kk], cy[rows, kk], r[rows, kk]
+        bx, by = x0[target], y0[target]
+        keep = (present[rows, kk] & (mcx + mr >= bx) & (mcx - mr < bx + t)
+                & (mcy + mr >= by) & (mcy - mr < by + t))
+        target, mcx, mcy, mr = target[keep], mcx[keep], mcy[keep], mr[keep]
+        minten = inten[rows, kk][keep]
+
+        for s in range(0, len(target), chunk):
+            e = min(len(target), s + chunk)
+            xs = mcx[s:e, None] + _OX
+            ys = mcy[s:e, None] + _OY
+            lx = xs - x0[target[s:e], None]
+            ly = ys - y0[target[s:e], None]
+            hit = ((_D2 <= mr[s:e, None] ** 2) & (lx >= 0) & (lx < t) & (ly >= 0) & (ly < t)
+                   & (xs < self.width) & (ys < self.height))
+            idx = (target[s:e, None] * (t * t) + ly * t + lx)[hit]
+            # solo le celle toccate dal blocco, non un bincount lungo quanto tutte le tile
+            np.add.at(out, idx, np.broadcast_to(minten[s:e, None], hit.shape)[hit])
+        return np.minimum(out, 1.0).astype(np.float32).reshape(b, t, t)
+
+    def _regen(self, f: np.ndarray, dt) -> np.ndarray:
+        keep = np.power(1.0 - self.regen_rate, dt, dtype=np.float64)
+        return (1.0 - (1.0 - f.astype(np.float64)) * keep).astype(np.float32)
+
+    def _ensure(self, tiles: np.ndarray) -> None:
+        """Alloca (con il cibo iniziale) le tile non ancora in memoria."""
+        new = np.unique(tiles[self.slot[tiles] < 0])
+        if len(new) == 0:
+            return
+        start = self.count
+        if start + len(new) > len(self.values):
+            self._alloc(max(start + len(new), 2 * len(self.values)))
+        t = self.tile
+        f0 = self._rasterize(new)
+        self.values[start:start + len(new)] = f0
+        self.stamp[start:start + len(new)] = 0
+        self.tile_ids[start:start + len(new)] = new
+        self.slot[new] = np.arange(start, start + len(new), dtype=np.int32)
+        self.count = start + len(new)
+
+    # ---- accesso dalla simulazione ----
+    def _locate(self, xs: np.ndarray, ys: np.ndarray):
+        tiles = self.tile_of(xs, ys)
+        self._ensure(tiles)
+        return self.slot[tiles], ys % self.tile, xs % self.tile
+
+    def read(self, xs: np.ndarray, ys: np.ndarray, tick: int) -> np.ndarray:
+        """Valori al tick `tick` (alloca le tile toccate e aggiorna le celle lette)."""
+        s, ly, lx = self._locate(xs, ys)
+        dt = tick - self.stamp[s, ly, lx]
+        vals = self.values[s, ly, lx]
+        stale = dt > 0
+        if stale.any():
+            vals[stale] = self._regen(vals[stale], dt[stale])
+            self.values[s, ly, lx] = vals
+            self.stamp[s, ly, lx] = tick
+        return vals
+
+    def write(self, xs: np.ndarray, ys: np.ndarray, values: np.ndarray) -> None:
+        s, ly, lx = self._locate(xs, ys)
+        self.values[s, ly, lx] = values
+
+    # ---- lettura senza effetti (renderer, analisi) ----
+    def sample(self, xs: np.ndarray, ys: np.ndarray, tick: int,
+               initial: np.ndarray | None = None) -> np.ndarray:
+        """Valori al tick `tick` senza allocare né modificare nulla."""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        s = self.slot[self.tile_of(xs, ys)]
+        out = np.empty(len(xs), dtype=np.float32)
+        alloc = s >= 0
+        if alloc.any():
+            a_s, a_y, a_x = s[alloc], ys[alloc] % self.tile, xs[alloc] % self.tile
+            out[alloc] = self._regen(self.values[a_s, a_y, a_x], tick - self.stamp[a_s, a_y, a_x])
+        free = ~alloc
+        if free.any():
+            f0 = initial[free] if initial is not None else self.initial_at(xs[free], ys[free])
+            out[free] = self._regen(f0, tick)
+        return out
+
+    def preview(self, max_side: int, tick: int) -> np.ndarray:
+        """
+        Mappa sotto-campionata (una cella ogni `stride`) con lato massimo max_side.
+        Il cibo iniziale ai punti di campionamento viene calcolato una volta e tenuto.
+        """
+        stride = max(1, -(-max(self.width, self.height) // max_side))
+        ys, xs = np.mgrid[0:self.height:stride, 0:self.width:stride]
+        shape = ys.shape
+        xs, ys = xs.reshape(-1), ys.reshape(-1)
+        if stride not in self._preview_cache:
+            self._preview_cache[stride] = self.initial_at(xs, ys)
+        return self.sample(xs, ys, tick, initial=self._preview_cache[stride]).reshape(shape)
+
+    def to_dense(self, tick: int) -> np.ndarray:
+        """Mappa intera al tick dato (solo per mappe piccole: test, analisi)."""
+        ys, xs = np.mgrid[0:self.height, 0:self.width]
+        return self.sample(xs.reshape(-1), ys.reshape(-1), tick).reshape(self.height, self.width)
+
+    # ---- snapshot ----
+    def state(self) -> dict[str, np.ndarray]:
+        return {"tile_ids": self.tile_ids[:self.count], "values": self.values[:self.count],
+                "stamp": self.stamp[:self.count]}
+
+    def restore(self, state) -> None:
+        ids = np.asarray(state["tile_ids"], dtype=np.int64)
+        self.count = 0
+        self._alloc(max(16, len(ids)))
+        self.values[:len(ids)] = state["values"]
+        self.stamp[:len(ids)] = state["stamp"]
+        self.tile_ids[:len(ids)] = ids
+        self.slot.fill(-1)
+        self.slot[ids] = np.arange(len(ids), dtype=np.int32)
+        self.count = len(ids)
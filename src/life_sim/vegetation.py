@@ -0,0 +1,87 @@
+"""
+Cibo iniziale procedurale della mappa densa (World.create con initial_food_flat=False):
+macchie di vegetazione circolari, con centro, raggio in [3, 12] e intensità estratti
+in sequenza da rng.py, circa area × initial_food_mean × 0.02 macchie.
+
+Ogni cella somma le intensità delle macchie che la coprono, saturando a 1. Le
+intensità non sono negative, quindi saturare a ogni passo equivale a saturare una
+volta sola la somma float32 fatta nello stesso ordine: np.add.at applica gli
+incrementi nell'ordine degli indici e le macchie si stampano in ordine di estrazione,
+quindi la mappa di un seed è identica bit per bit a quella della versione originale
+(una maschera su tutta la griglia per ogni macchia, costo macchie × area).
+
+Ogni macchia tocca solo il suo riquadro: a blocchi di PATCH_CHUNK macchie, le celle
+candidate sono la griglia (macchia × offset del disco di raggio massimo), filtrata per
+raggio e bordi. Dalle mappe di PARALLEL_MIN_CELLS celle le righe si dividono in
+strisce elaborate da thread distinti (np.add.at rilascia il GIL): ogni cella sta in
+una sola striscia e vi riceve le macchie nello stesso ordine, quindi il risultato non
+dipende dal numero di thread.
+"""
+from __future__ import annotations
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .config import SimConfig
+from .rng import RNG
+
+MIN_RADIUS, MAX_RADIUS = 3, 12
+PATCH_CHUNK = 4096
+PARALLEL_MIN_CELLS = 2048 * 2048
+
+# offset del disco di raggio massimo; quelli di un raggio r sono i primi con d² <= r²
+_DY, _DX = (a.ravel() for a in np.mgrid[-MAX_RADIUS:MAX_RADIUS + 1, -MAX_RADIUS:MAX_RADIUS + 1])
+_D2 = _DX * _DX + _DY * _DY
+_DISC = _D2 <= MAX_RADIUS ** 2
+_DY, _DX, _D2 = _DY[_DISC], _DX[_DISC], _D2[_DISC]
+
+
+def draw_patches(cfg: SimConfig, rng: RNG) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(cx, cy, raggio, intensità) delle macchie, estratti da rng.py come da sempre."""
+    h, w = cfg.height, cfg.width
+    n = max(1, int((h * w) * cfg.initial_food_mean * 0.02))
+    lo, hi = cfg.initial_food_mean * 0.5, min(1.0, cfg.initial_food_mean * 1.5)
+    py = rng.py
+    draws = [(py.randrange(w), py.randrange(h), py.randint(MIN_RADIUS, MAX_RADIUS),
+              py.uniform(lo, hi)) for _ in range(n)]
+    cx, cy, r, intensity = zip(*draws)
+    return (np.array(cx, dtype=np.int64), np.array(cy, dtype=np.int64),
+            np.array(r, dtype=np.int64), np.array(intensity, dtype=np.float32))
+
+
+def stamp_patches(food: np.ndarray, cx: np.ndarray, cy: np.ndarray, r: np.ndarray,
+                  intensity: np.ndarray, workers: int | None = None) -> np.ndarray:
+    """
+    Somma le macchie su `food` (float32 contiguo, modificato sul posto) e satura a 1.
+    `workers`: strisce/thread (None: uno per CPU dalle mappe di PARALLEL_MIN_CELLS celle).
+    """
+    h = food.shape[0]
+    if workers is None:
+        workers = (os.cpu_count() or 1) if food.size >= PARALLEL_MIN_CELLS else 1
+    workers = max(1, min(workers, h))
+    edges = [h * k // workers for k in range(workers + 1)]
+    strips = list(zip(edges[:-1], edges[1:]))
+    if workers == 1:
+        _stamp_strip(food, 0, h, cx, cy, r, intensity)
+    else:
+        with ThreadPoolExecutor(workers, thread_name_prefix="vegetation") as pool:
+            list(pool.map(lambda s: _stamp_strip(food, s[0], s[1], cx, cy, r, intensity), strips))
+    np.minimum(food, np.float32(1.0), out=food)
+    return food
+
+
+def _stamp_strip(food: np.ndarray, y0: int, y1: int, cx: np.ndarray, cy: np.ndarray,
+                 r: np.ndarray, intensity: np.ndarray) -> None:
+    """Macchie sulle righe [y0, y1), in ordine di estrazione (senza saturare)."""
+    w = food.shape[1]
+    flat = food.reshape(-1)
+    near = np.flatnonzero((cy + r >= y0) & (cy - r < y1))
+    for s in range(0, len(near), PATCH_CHUNK):
+        k = near[s:s + PATCH_CHUNK]
+        ys = cy[k, None] + _DY
+        xs = cx[k, None] + _DX
+        hit = (_D2 <= (r[k] ** 2)[:, None]) & (ys >= y0) & (ys < y1) & (xs >= 0) & (xs < w)
+        # indici in ordine macchia per macchia: ogni cella riceve gli incrementi in ordine
+        cells = (ys * w + xs)[hit]
+        np.add.at(flat, cells, np.broadcast_to(intensity[k, None], hit.shape)[hit])
@@ -1,19 +1,80 @@
 from __future__ import annotations
-from dataclasses import dataclass
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Callable
 import numpy as np
-from .config import SimConfig
-from .rng import RNG
+from .backend import ArrayBackend, get_backend
+from .config import SimConfig, config_from_mapping
+from .grid import SpatialHash
+from .profiling import StepProfiler
+from .rng import RNG, CounterStream
+from .tiles import TiledFood
+from .vegetation import draw_patches, stamp_patches
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class DirtyTiles:
+    """
+    Tile (tile × tile celle) in cui la simulazione ha scritto il cibo (foraging) dall'ultimo
+    take(): le legge chi ridisegna la mappa per aggiornare solo quelle. La rigenerazione
+    non viene segnata, è prevedibile in forma chiusa (vedi life_ui.food_layer).
+    """
+    tile: int
+    flags: np.ndarray  # (tile_rows, tile_cols) bool
+
+    @classmethod
+    def for_map(cls, width: int, height: int, tile: int) -> "DirtyTiles":
+        return cls(tile=tile, flags=np.zeros((-(-height // tile), -(-width // tile)), dtype=bool))
+
+    def mark(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        self.flags[np.asarray(ys) // self.tile, np.asarray(xs) // self.tile] = True
+
+    def take(self) -> np.ndarray:
+        """Indici lineari delle tile segnate; le azzera."""
+        idx = np.flatnonzero(self.flags)
+        self.flags[:] = False
+        return idx
+
 
 @dataclass
 class World:
     cfg: SimConfig
     rng: RNG
-    food: np.ndarray  # float32 mappa risorse
+    food: np.ndarray | None  # float32 mappa risorse (None con food_backend "tiled")
+    index: SpatialHash | None = field(default=None, repr=False)  # vedi grid.spatial_index
+    profiler: StepProfiler | None = field(default=None, repr=False)  # vedi profiling.py
+    # resource_mode == "lazy": tick dell'ultimo aggiornamento di ogni cella (int32)
+    food_tick: np.ndarray | None = field(default=None, repr=False)
+    resource_tick: int = 0  # tick di rigenerazione trascorsi (modalità lazy e tiled)
+    tiles: TiledFood | None = field(default=None, repr=False)  # food_backend == "tiled"
+    # modulo array in cui risiedono food e food_tick (vedi backend.py)
+    backend: ArrayBackend = field(default_factory=ArrayBackend, repr=False)
+    tick: int = 0  # tick completati (scheduler.step): chiave dei flussi a contatore
+    # celle scritte dal foraging, per il renderer (None: nessuno osserva, costo zero)
+    food_dirty: DirtyTiles | None = field(default=None, repr=False)
+    # generazione della popolazione: cambia quando gli agenti vengono sostituiti o
+    # riordinati fuori dai sistemi (replace_population), invalida l'indice spaziale
+    generation: int = field(default=0, repr=False)
 
     @classmethod
     def create(cls, cfg: SimConfig) -> "World":
         rng = RNG(cfg.seed)
         h, w = cfg.height, cfg.width
+        backend = get_backend(cfg.compute_backend)
+        if cfg.rng_mode not in ("sequential", "counter"):
+            raise ValueError(f"rng_mode sconosciuto: {cfg.rng_mode!r} (atteso 'sequential' o 'counter')")
+
+        if cfg.food_backend == "tiled":
+            if backend.resident:
+                raise ValueError("food_backend='tiled' vive in memoria host: usare compute_backend='cpu'")
+            if cfg.conflict_mode == "grid":
+                raise ValueError("conflict_mode='grid' usa griglie dense: non è compatibile con food_backend='tiled'")
+            return cls(cfg=cfg, rng=rng, food=None, tiles=TiledFood.from_config(cfg))
+        if cfg.food_backend != "dense":
+            raise ValueError(f"food_backend sconosciuto: {cfg.food_backend!r} (atteso 'dense' o 'tiled')")
 
         food = np.zeros((h, w), dtype=np.float32)
 
@@ -21,19 +82,196 @@ class World:
             # Distribuzione piatta
             food.fill(cfg.initial_food_mean)
         else:
-            # Creazione di macchie di vegetazione
-            num_clusters = max(1, int((h * w) * cfg.initial_food_mean * 0.02))
-            for _ in range(num_clusters):
-                cx = rng.py.randrange(w)
-                cy = rng.py.randrange(h)
-                radius = rng.py.randint(3, 12)
-                yy, xx = np.ogrid[:h, :w]
-                mask = (xx - cx) ** 2 + (yy - cy) ** 2 <= radius ** 2
-                # Intensità casuale nella macchia
-                patch_intensity = rng.py.uniform(
-                    cfg.initial_food_mean * 0.5, 
-                    min(1.0, cfg.initial_food_mean * 1.5)
-                )
-                food[mask] = np.clip(food[mask] + patch_intensity, 0.0, 1.0)
-
-        return cls(cfg=cfg, rng=rng, food=food)
+            # Creazione di macchie di vegetazione (vedi vegetation.py)
+            stamp_patches(food, *draw_patches(cfg, rng))
+
+        if cfg.resource_mode not in ("eager", "lazy"):
+            raise ValueError(f"resource_mode sconosciuto: {cfg.resource_mode!r} (atteso 'eager' o 'lazy')")
+        food_tick = np.zeros((h, w), dtype=np.int32) if cfg.resource_mode == "lazy" else None
+        # unico caricamento sul dispositivo: da qui in poi le mappe restano residenti
+        return cls(cfg=cfg, rng=rng, food=backend.to_device(food),
+                   food_tick=None if food_tick is None else backend.to_device(food_tick),
+                   backend=backend)
+
+    def replace_population(self) -> None:
+        """
+        Da chiamare quando si passa allo step una popolazione sostituita o riordinata
+        (non solo spostata, ridotta o accresciuta dai sistemi): l'indice spaziale va
+        ricostruito alla prossima lettura.
+        """
+        self.generation += 1
+
+    def stream(self, system: str) -> CounterStream | None:
+        """Flusso a contatore di `system` per il tick in corso; None con rng_mode "sequential"."""
+        if self.cfg.rng_mode != "counter":
+            return None
+        return self.rng.stream(system, self.tick)
+
+    def uniform(self, system: str, ids: np.ndarray | Callable[[], np.ndarray], n: int | None = None
+                ) -> np.ndarray:
+        """
+        Un'estrazione in [0, 1) per ciascun agente, tutta in un blocco: dal flusso a
+        contatore di `system` (per id), oppure da rng.np con rng_mode "sequential".
+        `ids` può essere una funzione, chiamata solo se servono davvero gli id (allora
+        `n` è il numero di agenti).
+        """
+        stream = self.stream(system)
+        if stream is not None:
+            return stream.uniform(ids() if callable(ids) else ids)
+        return self.rng.np.random(len(ids) if n is None else n)
+
+    # ---- rigenerazione pigra ----
+    # f <- f + α(1 − f) ripetuto Δt volte è 1 − (1 − f)(1 − α)^Δt: in modalità lazy il
+    # valore si calcola solo quando una cella viene letta, a partire dal suo ultimo tick.
+    def _regen(self, f: np.ndarray, dt: np.ndarray) -> np.ndarray:
+        xp = self.backend.xp
+        keep = xp.power(1.0 - self.cfg.resource_regen_rate, dt, dtype=xp.float64)
+        return (1.0 - (1.0 - f.astype(xp.float64)) * keep).astype(xp.float32)
+
+    def sync_cells(self, xs: np.ndarray, ys: np.ndarray) -> None:
+        """Porta al tick corrente le celle (xs, ys) prima che la simulazione le legga o scriva."""
+        if self.food_tick is None:
+            return
+        dt = self.resource_tick - self.food_tick[ys, xs]
+        stale = dt > 0
+        if not stale.any():
+            return
+        xs, ys, dt = xs[stale], ys[stale], dt[stale]
+        self.food[ys, xs] = self._regen(self.food[ys, xs], dt)
+        self.food_tick[ys, xs] = self.resource_tick
+
+    def food_now(self) -> np.ndarray:
+        """
+        Mappa del cibo aggiornata al tick corrente, per chi la legge tutta (renderer,
+        analisi). In modalità lazy è una copia calcolata e lo stato non cambia, così la
+        traiettoria non dipende da quando (o se) la mappa viene disegnata.
+        È un punto di sincronizzazione: con un backend residente scarica la mappa.
+        """
+        if self.tiles is not None:
+            return self.tiles.to_dense(self.resource_tick)
+        return self.backend.to_host(self._food_current(self.food, self.food_tick))
+
+    def _food_current(self, food, food_tick):
+        if food_tick is None:
+            return food
+        return self._regen(food, self.resource_tick - food_tick)
+
+    def food_preview(self, max_side: int) -> np.ndarray:
+        """Come food_now, ma sotto-campionata se la mappa supera max_side (renderer)."""
+        if self.tiles is not None:
+            return self.tiles.preview(max_side, self.resource_tick)
+        stride = -(-max(self.cfg.width, self.cfg.height) // max_side)
+        if stride <= 1:
+            return self.food_now()
+        # sotto-campionamento sul dispositivo: si scarica solo l'anteprima
+        tick = None if self.food_tick is None else self.food_tick[::stride, ::stride]
+        return self.backend.to_host(self._food_current(self.food[::stride, ::stride], tick))
+
+    def food_region(self, rows: slice, cols: slice) -> np.ndarray:
+        """
+        Come food_now, ma solo per il rettangolo (rows, cols) della mappa densa: il
+        renderer rilegge così le sole tile cambiate. Non cambia lo stato.
+        """
+        if self.tiles is not None:
+            raise ValueError("food_region richiede food_backend='dense'")
+        tick = None if self.food_tick is None else self.food_tick[rows, cols]
+        return self.backend.to_host(self._food_current(self.food[rows, cols], tick))
+
+    @property
+    def food_is_remote(self) -> bool:
+        """True se world.food non è un ndarray host indicizzabile (tile o backend residente)."""
+        return self.tiles is not None or self.backend.resident
+
+    # ---- accesso per cella (foraging) ----
+    def food_at(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Cibo corrente nelle celle (xs, ys), come array host; le celle lette vengono
+        aggiornate al tick. Con un backend residente trasferisce solo indici e valori.
+        """
+        if self.tiles is not None:
+            return self.tiles.read(xs, ys, self.resource_tick)
+        b = self.backend
+        xs, ys = b.to_device(xs), b.to_device(ys)
+        self.sync_cells(xs, ys)
+        return b.to_host(self.food[ys, xs])
+
+    def set_food(self, xs: np.ndarray, ys: np.ndarray, values: np.ndarray) -> None:
+        if self.tiles is not None:
+            self.tiles.write(xs, ys, values)
+        else:
+            b = self.backend
+            self.food[b.to_device(ys), b.to_device(xs)] = b.to_device(values)
+
+    # ---- snapshot ----
+    def save(self, path: str) -> None:
+        """
+        Scrive il mondo nella cartella `path`: world.json (configurazione e stato di
+        entrambi i generatori), food.npy (griglia non compressa, mappabile in memoria)
+        e index.npz (indice spaziale, se presente: l'ordine delle catene decide
+        l'ordine degli incontri, quindi serve per riprendere in modo identico).
+        In modalità lazy anche food_tick.npy: food.npy contiene i valori all'ultimo
+        aggiornamento di ogni cella, World.load(path).food_now() quelli correnti.
+        Con food_backend "tiled" al posto di food.npy c'è tiles.npz (solo le tile allocate).
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ("food.npy", "tiles.npz"):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+        if self.tiles is not None:
+            np.savez(os.path.join(path, "tiles.npz"), **self.tiles.state())
+        else:
+            np.save(os.path.join(path, "food.npy"), self.backend.to_host(self.food))
+        index_path = os.path.join(path, "index.npz")
+        if self.index is not None:
+            np.savez(index_path, **self.index.state())
+        elif os.path.exists(index_path):
+            os.remove(index_path)
+        tick_path = os.path.join(path, "food_tick.npy")
+        if self.food_tick is not None:
+            # stato pigro così com'è (non materializzato): la ripresa resta identica
+            np.save(tick_path, self.backend.to_host(self.food_tick))
+        elif os.path.exists(tick_path):
+            os.remove(tick_path)
+        meta = {"version": SNAPSHOT_VERSION, "cfg": asdict(self.cfg), "rng": self.rng.get_state(),
+                "resource_tick": self.resource_tick, "world_tick": self.tick}
+        with open(os.path.join(path, "world.json"), "w") as fh:
+            json.dump(meta, fh)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "World":
+        """
+        Rilegge un mondo salvato con save(). Con mmap=True il cibo è mappato in
+        copy-on-write: la ripresa è immediata anche su mappe enormi, le pagine vengono
+        lette quando servono e le modifiche non toccano il file dello snapshot.
+        """
+        with open(os.path.join(path, "world.json")) as fh:
+            meta = json.load(fh)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path}: versione di snapshot non supportata ({meta.get('version')!r})")
+        cfg = config_from_mapping(meta["cfg"])
+        rng = RNG(cfg.seed)
+        rng.set_state(meta["rng"])
+        food = tiles = None
+        if cfg.food_backend == "tiled":
+            tiles = TiledFood.from_config(cfg)
+            with np.load(os.path.join(path, "tiles.npz")) as data:
+                tiles.restore(data)
+        else:
+            food = np.load(os.path.join(path, "food.npy"), mmap_mode="c" if mmap else None)
+            if food.dtype != np.float32 or food.shape != (cfg.height, cfg.width):
+                raise ValueError(f"{path}: food.npy non corrisponde alla configurazione")
+        index = None
+        index_path = os.path.join(path, "index.npz")
+        if os.path.exists(index_path):
+            with np.load(index_path) as data:
+                index = SpatialHash.from_state(data)
+        food_tick = None
+        if cfg.resource_mode == "lazy":
+            food_tick = np.load(os.path.join(path, "food_tick.npy"), mmap_mode="c" if mmap else None)
+        backend = get_backend(cfg.compute_backend)
+        if backend.resident:
+            food = backend.to_device(food)
+            food_tick = None if food_tick is None else backend.to_device(food_tick)
+        return cls(cfg=cfg, rng=rng, food=food, index=index, food_tick=food_tick,
+                   resource_tick=int(meta.get("resource_tick", 0)),
+                   tiles=tiles, backend=backend, tick=int(meta.get("world_tick", 0)))
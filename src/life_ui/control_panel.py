@@ -3,6 +3,7 @@ import pygame
 import numpy as np
 from dataclasses import dataclass
 from life_sim.config import SimConfig
+from .panels import text
 
 @dataclass
 class Tunables:
@@ -76,6 +77,7 @@ class ControlPanel:
             ("Durata flash (s)", "conflict_flash_duration_s", 0.1, 5.0, 0.1),
         ]
         self.index = 0
+        self._overlay: pygame.Surface | None = None
 
     def adjust(self, dir: int):
         label, field, lo, hi, step = self.options[self.index]
@@ -100,9 +102,11 @@ class ControlPanel:
 
     def render(self, surf: pygame.Surface, win_rect: tuple[int,int,int,int]):
         x, y, w, h = win_rect
-        overlay = pygame.Surface((w, h), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 160))
-        surf.blit(overlay, (x, y))
+        # velo semitrasparente: si ricrea solo quando cambia la finestra
+        if self._overlay is None or self._overlay.get_size() != (w, h):
+            self._overlay = pygame.Surface((w, h), pygame.SRCALPHA)
+            self._overlay.fill((0, 0, 0, 160))
+        surf.blit(self._overlay, (x, y))
 
         panel_w, panel_h = 640, 520
         px = x + (w - panel_w)//2
@@ -110,17 +114,16 @@ class ControlPanel:
         pygame.draw.rect(surf, (28, 32, 38), (px, py, panel_w, panel_h), border_radius=8)
         pygame.draw.rect(surf, (80, 80, 90), (px, py, panel_w, panel_h), 1, border_radius=8)
 
-        title = pygame.font.SysFont(self.font_name, 22, bold=True).render("Pannello di controllo", True, (240,240,250))
+        title = text("Pannello di controllo", 22, (240,240,250), True, self.font_name)
         surf.blit(title, (px + 16, py + 12))
 
-        font = pygame.font.SysFont(self.font_name, 18)
         info = [
             "↑/↓ seleziona  •  ←/→ modifica",
             "ENTER: Applica  •  ESC: Chiudi",
             "Nota: dimensioni/popolazione/cibo iniziale richiedono reset del mondo",
         ]
         for i, line in enumerate(info):
-            surf.blit(font.render(line, True, (210,210,220)), (px + 16, py + 44 + i*20))
+            surf.blit(text(line, 18, (210,210,220), False, self.font_name), (px + 16, py + 44 + i*20))
 
         ox, oy = px + 16, py + 110
         for i, (label, field, lo, hi, step) in enumerate(self.options):
@@ -133,4 +136,4 @@ class ControlPanel:
                 display_val = "ON" if val else "OFF"
             color = (255,255,255) if is_sel else (205,205,215)
             s = f"{label}: {display_val}"
-            surf.blit(font.render(s, True, color), (ox, oy + i*28))
+            surf.blit(text(s, 18, color, False, self.font_name), (ox, oy + i*28))
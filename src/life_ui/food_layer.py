@@ -0,0 +1,246 @@
+"""
+Sfondo della mappa del cibo aggiornato per tile.
+
+Il cibo viene quantizzato in FOOD_LEVELS livelli e colorato con una LUT precalcolata
+(renderer.food_lut) in un buffer di pixel persistente, condiviso con una Surface.
+A ogni aggiornamento si ridisegnano solo le tile "sporche":
+
+- quelle in cui il foraging ha scritto (World.food_dirty, segnate dalla simulazione);
+- quelle in cui la rigenerazione ha fatto cambiare colore a qualche cella. La
+  rigenerazione f <- f + α(1 − f) ha forma chiusa 1 − (1 − f)(1 − α)^k, quindi per
+  ogni tile si calcola in anticipo il tick in cui la prima cella raggiunge la soglia
+  del prossimo colore, e fino ad allora la tile non viene riletta.
+
+La Surface scalata per la finestra resta in cache finché non cambia la dimensione;
+le tile ridisegnate vengono riscalate e incollate singolarmente.
+Il layer legge da una sorgente: WorldFood (il mondo, nello stesso thread) oppure
+FoodFrame (copia pubblicata dal thread della simulazione, vedi sim_thread.py).
+Con food_backend "tiled" o mappe oltre `max_side` (anteprima sotto-campionata)
+ogni aggiornamento ridisegna tutta l'anteprima, sempre tramite la LUT.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+import pygame
+
+from life_sim.world import DirtyTiles, World
+from .renderer import FOOD_LEVELS, food_levels, food_lut
+
+FOOD_TILE = 64
+# oltre questa frazione di tile sporche conviene ridisegnare tutto in blocco
+FULL_REFRESH_FRACTION = 0.5
+
+
+def _pack(rgb: np.ndarray) -> np.ndarray:
+    """Colori (..., 3) -> uint32 con i byte R, G, B, X in memoria (formato "RGBX")."""
+    rgb = rgb.astype(np.uint32)
+    return rgb[..., 0] | (rgb[..., 1] << 8) | (rgb[..., 2] << 16)
+
+
+def _change_thresholds(lut: np.ndarray) -> np.ndarray:
+    """
+    Per ogni livello, il valore di cibo da cui inizia il primo livello superiore con un
+    colore diverso (1.0 se non ce n'è: sopra vmax il colore non cambia più).
+    """
+    out = np.ones(len(lut))
+    nxt = 1.0
+    for i in range(len(lut) - 1, -1, -1):
+        out[i] = nxt
+        if i > 0 and (lut[i] != lut[i - 1]).any():
+            # food_levels arrotonda: il livello i comincia a metà strada dal precedente
+            nxt = (i - 0.5) / (FOOD_LEVELS - 1)
+    return out
+
+
+_LUT = food_lut()
+_PACKED_LUT = _pack(_LUT)
+# 1 − soglia del prossimo colore, per livello (0: il colore non cambierà più)
+_HEADROOM = (1.0 - _change_thresholds(_LUT)).astype(np.float32)
+
+
+class WorldFood:
+    """
+    Sorgente diretta per FoodLayer: legge il mondo quando serve (solo dallo stesso
+    thread della simulazione). Sulla mappa densa a piena risoluzione aggancia a
+    world.food_dirty un DirtyTiles, che il foraging da lì in poi tiene aggiornato.
+    """
+
+    def __init__(self, world: World, max_side: int = 4096, tile: int = FOOD_TILE):
+        self.world = world
+        self.max_side = max_side
+        cfg = world.cfg
+        self.regen_rate = cfg.resource_regen_rate
+        # incrementale solo su mappa densa disegnata a piena risoluzione
+        self.full_res = world.tiles is None and max(cfg.width, cfg.height) <= max_side
+        if self.full_res and world.food_dirty is None:
+            world.food_dirty = DirtyTiles.for_map(cfg.width, cfg.height, tile)
+        self.tile = world.food_dirty.tile if self.full_res else tile
+
+    @property
+    def tick(self) -> int:
+        return self.world.tick
+
+    def full(self) -> np.ndarray:
+        if self.full_res:
+            return self.world.food_now()
+        return self.world.food_preview(self.max_side)
+
+    def region(self, rows: slice, cols: slice) -> np.ndarray:
+        return self.world.food_region(rows, cols)
+
+    def take_dirty(self) -> np.ndarray | None:
+        """Tile scritte dal foraging dall'ultima chiamata (None: non tracciate, ridisegnare tutto)."""
+        return self.world.food_dirty.take() if self.full_res else None
+
+
+@dataclass(frozen=True)
+class FoodFrame:
+    """
+    Copia immutabile della mappa del cibo a un tick, con le tile scritte dal foraging
+    dal frame precedente: la pubblica il thread della simulazione (sim_thread.py),
+    FoodLayer la legge senza toccare il mondo.
+    """
+    tick: int
+    food: np.ndarray  # piena risoluzione (full_res) oppure anteprima sotto-campionata
+    dirty: np.ndarray | None
+    full_res: bool
+    tile: int
+    regen_rate: float
+
+    @classmethod
+    def capture(cls, world: World, max_side: int = 4096, tile: int = FOOD_TILE) -> "FoodFrame":
+        src = WorldFood(world, max_side, tile)
+        food = np.array(src.full())  # copia: la simulazione continua a scrivere la sua
+        food.flags.writeable = False
+        return cls(tick=world.tick, food=food, dirty=src.take_dirty(), full_res=src.full_res,
+                   tile=src.tile, regen_rate=src.regen_rate)
+
+    def full(self) -> np.ndarray:
+        return self.food
+
+    def region(self, rows: slice, cols: slice) -> np.ndarray:
+        return self.food[rows, cols]
+
+    def take_dirty(self) -> np.ndarray | None:
+        return self.dirty
+
+
+FoodSource = WorldFood | FoodFrame
+
+
+class FoodLayer:
+    def __init__(self, source: FoodSource):
+        self.source = source
+        self.tile = source.tile
+        self.incremental = source.full_res
+        f = source.full()
+        h, w = f.shape
+        self.pixels = np.empty((h, w), dtype=np.uint32)
+        self.surface = pygame.image.frombuffer(self.pixels, (w, h), "RGBX")
+        self.next_change = np.zeros((-(-h // self.tile), -(-w // self.tile)), dtype=np.int64)
+        self.refreshed = 0  # tile ridisegnate dall'ultimo update (per il profilo)
+        self._scaled: pygame.Surface | None = None
+        source.take_dirty()
+        self._refresh_all(source, f)
+
+    @classmethod
+    def for_world(cls, world: World, max_side: int = 4096, tile: int = FOOD_TILE) -> "FoodLayer":
+        return cls(WorldFood(world, max_side, tile))
+
+    # ---- aggiornamento ----
+    def update(self, source: FoodSource | None = None) -> None:
+        """
+        Ridisegna le tile cambiate dall'ultimo aggiornamento. `source` è il nuovo
+        FoodFrame quando la simulazione gira in un altro thread (vanno passati tutti,
+        in ordine: ognuno porta le tile scritte dal precedente).
+        """
+        if source is not None:
+            self.source = source
+        src = self.source
+        touched = src.take_dirty()
+        if not self.incremental or touched is None:
+            self._refresh_all(src)
+            return
+        dirty = self.next_change <= src.tick
+        dirty.reshape(-1)[touched] = True
+        idx = np.flatnonzero(dirty)
+        if len(idx) > FULL_REFRESH_FRACTION * dirty.size:
+            self._refresh_all(src)
+            return
+        t = self.tile
+        tw = dirty.shape[1]
+        for i in idx.tolist():
+            ty, tx = divmod(i, tw)
+            rows, cols = slice(ty * t, (ty + 1) * t), slice(tx * t, (tx + 1) * t)
+            f = src.region(rows, cols)
+            levels = food_levels(f)
+            self.pixels[rows, cols] = _PACKED_LUT[levels]
+            self.next_change[ty, tx] = self._ticks_until(self._closeness(f, levels).max(), src)
+            if self._scaled is not None:
+                self._rescale_tile(rows, cols)
+        self.refreshed = len(idx)
+
+    def _refresh_all(self, src: FoodSource, f: np.ndarray | None = None) -> None:
+        f = src.full() if f is None else f
+        levels = food_levels(f)
+        np.take(_PACKED_LUT, levels, out=self.pixels, mode="clip")
+        if self.incremental:
+            # massimo per tile: si completa la griglia a multipli di tile con zeri ("mai")
+            t = self.tile
+            th, tw = self.next_change.shape
+            close = self._closeness(f, levels)
+            if close.shape != (th * t, tw * t):
+                padded = np.zeros((th * t, tw * t), dtype=close.dtype)
+                padded[:close.shape[0], :close.shape[1]] = close
+                close = padded
+            self.next_change[...] = self._ticks_until(close.reshape(th, t, tw, t).max(axis=(1, 3)), src)
+        self.refreshed = self.next_change.size
+        if self._scaled is not None:
+            self._scaled = pygame.transform.smoothscale(self.surface, self._scaled.get_size())
+
+    def _closeness(self, f: np.ndarray, levels: np.ndarray) -> np.ndarray:
+        """
+        (1 − g) / (1 − f), con g la soglia del prossimo colore: la cella la raggiunge
+        dopo log(·) / log(1 − α) tick, quindi più è vicino a 1 prima cambia colore
+        (0 se il colore non cambierà più).
+        """
+        close = np.subtract(1.0, f, dtype=np.float32)
+        # f < g < 1 per chi cambia ancora colore: il minimo evita solo la divisione per zero a f = 1
+        np.maximum(close, 1e-6, out=close)
+        return np.divide(np.take(_HEADROOM, levels, mode="clip"), close, out=close)
+
+    def _ticks_until(self, close, src: FoodSource):
+        """Tick (assoluto) in cui una cella con vicinanza `close` cambia colore."""
+        never = np.iinfo(np.int64).max
+        alpha = src.regen_rate
+        close = np.asarray(close, dtype=np.float64)
+        if alpha <= 0.0:
+            return np.full(close.shape, never, dtype=np.int64)[()]
+        with np.errstate(divide="ignore"):
+            k = np.log(close) / np.log1p(-alpha)
+        # un tick di margine: la mappa eager accumula arrotondamenti float32
+        k = np.maximum(np.ceil(k) - 1, 1)
+        out = np.full(close.shape, never, dtype=np.int64)
+        finite = np.isfinite(k)
+        out[finite] = src.tick + k[finite].astype(np.int64)
+        return out[()]
+
+    # ---- superficie scalata ----
+    def scaled(self, size: tuple[int, int]) -> pygame.Surface:
+        """Sfondo scalato a `size`, in cache finché la dimensione non cambia."""
+        if self._scaled is None or self._scaled.get_size() != tuple(size):
+            self._scaled = pygame.transform.smoothscale(self.surface, size)
+        return self._scaled
+
+    def _rescale_tile(self, rows: slice, cols: slice) -> None:
+        h, w = self.pixels.shape
+        sw, sh = self._scaled.get_size()
+        x0, x1 = cols.start, min(cols.stop, w)
+        y0, y1 = rows.start, min(rows.stop, h)
+        # bordi interi in entrambe le risoluzioni: tile adiacenti senza buchi né sovrapposizioni
+        X0, X1 = x0 * sw // w, x1 * sw // w
+        Y0, Y1 = y0 * sh // h, y1 * sh // h
+        if X1 <= X0 or Y1 <= Y0:
+            return
+        src = self.surface.subsurface((x0, y0, x1 - x0, y1 - y0))
+        self._scaled.blit(pygame.transform.smoothscale(src, (X1 - X0, Y1 - Y0)), (X0, Y0))
@@ -0,0 +1,98 @@
+"""
+Storico delle serie del pannello statistiche in buffer circolari NumPy
+preallocati, a più risoluzioni (HORIZONS):
+
+- "600 tick": un campione per tick, ultimi `capacity` tick;
+- "60k tick": medie su blocchi di `coarse` tick, ultimi capacity × coarse tick;
+- "intera run": medie su blocchi che raddoppiano ogni volta che il buffer si
+  riempie (i blocchi vicini si fondono a coppie): tutta la run in `capacity` righe.
+
+Registrare un tick costa qualche operazione su un vettore lungo quanto le serie,
+qualunque sia la durata della run. window() restituisce un orizzonte in ordine
+cronologico e downsample() lo riduce alla larghezza in pixel della sparkline,
+quindi anche il disegno ha costo costante.
+"""
+from __future__ import annotations
+from typing import Iterable
+
+import numpy as np
+
+CAPACITY = 600
+COARSE_BUCKET = 100
+HORIZONS = ("600 tick", "60k tick", "intera run")
+
+
+class Rollup:
+    """Medie di blocchi di `bucket` tick, in un buffer circolare (capacity × serie)."""
+
+    def __init__(self, n_series: int, capacity: int = CAPACITY, bucket: int = 1,
+                 grow: bool = False):
+        if capacity < 2 or (grow and capacity % 2):
+            raise ValueError("capacity deve essere ≥ 2 (e pari con grow=True)")
+        self.capacity = capacity
+        self.bucket = bucket  # tick per riga (con grow raddoppia a ogni fusione)
+        self.grow = grow
+        self.data = np.zeros((capacity, n_series), dtype=np.float64)
+        self.count = 0  # righe completate in totale (la prossima è count % capacity)
+        self._acc = np.zeros(n_series, dtype=np.float64)
+        self._n = 0  # tick accumulati nel blocco in corso
+
+    def push(self, values: np.ndarray) -> None:
+        self._acc += values
+        self._n += 1
+        if self._n < self.bucket:
+            return
+        self.data[self.count % self.capacity] = self._acc / self._n
+        self.count += 1
+        self._acc[:] = 0.0
+        self._n = 0
+        if self.grow and self.count == self.capacity:
+            # buffer pieno: blocchi vicini fusi a coppie, ognuno dura il doppio
+            half = self.capacity // 2
+            self.data[:half] = self.data.reshape(half, 2, -1).mean(axis=1)
+            self.count = half
+            self.bucket *= 2
+
+    def window(self) -> np.ndarray:
+        """Righe in ordine cronologico (copia), più la media del blocco in corso."""
+        if self.count <= self.capacity:
+            rows = self.data[:self.count]
+        else:
+            start = self.count % self.capacity
+            rows = np.concatenate((self.data[start:], self.data[:start]))
+        if self._n:
+            return np.vstack((rows, self._acc / self._n))
+        return rows.copy()
+
+
+class History:
+    """Serie con nome, registrate insieme a ogni tick su tutti gli orizzonti."""
+
+    def __init__(self, names: Iterable[str], capacity: int = CAPACITY,
+                 coarse: int = COARSE_BUCKET):
+        self.names = tuple(names)
+        k = len(self.names)
+        self.levels = (Rollup(k, capacity), Rollup(k, capacity, coarse),
+                       Rollup(k, capacity, grow=True))
+
+    def record(self, values: Iterable[float]) -> None:
+        """Un valore per serie, nell'ordine di `names`."""
+        v = np.fromiter(values, dtype=np.float64, count=len(self.names))
+        for level in self.levels:
+            level.push(v)
+
+    def window(self, horizon: int = 0) -> dict[str, np.ndarray]:
+        """Serie dell'orizzonte HORIZONS[horizon], in sola lettura."""
+        rows = self.levels[horizon].window()
+        rows.flags.writeable = False
+        return {name: rows[:, j] for j, name in enumerate(self.names)}
+
+
+def downsample(data, width: int) -> np.ndarray:
+    """Media per colonna di pixel: al più `width` punti, qualunque sia la lunghezza."""
+    data = np.asarray(data, dtype=np.float64)
+    n = len(data)
+    if n <= width:
+        return data
+    edges = np.arange(width) * n // width
+    return np.add.reduceat(data, edges) / np.diff(edges, append=n)
@@ -1,7 +1,11 @@
 from __future__ import annotations
+from functools import lru_cache
+import numpy as np
 import pygame
 from typing import List, Sequence
 
+from .history import downsample
+
 PANEL_BG = (24, 24, 28)
 PANEL_BORDER = (60, 60, 70)
 TEXT_COLOR = (210, 210, 220)
@@ -9,87 +13,198 @@ TITLE_COLOR = (230, 230, 240)
 GRID_COLOR = (80, 80, 90)
 LINE_COLOR = (180, 220, 255)
 
+# testi renderizzati in cache: abbastanza per pannelli, controlli e overlay del profilo
+TEXT_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=None)
+def font(font_name: str | None, size: int, bold: bool = False) -> pygame.font.Font:
+    """Font di sistema, creato una volta per (nome, dimensione, grassetto)."""
+    return pygame.font.SysFont(font_name, size, bold=bold)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text(content: str, size: int, color: tuple[int, int, int], bold: bool = False,
+         font_name: str | None = None) -> pygame.Surface:
+    """
+    Testo renderizzato (antialias), in cache per contenuto, font e colore.
+    La Surface è condivisa tra i chiamanti: si blitta, non si modifica.
+    """
+    return font(font_name, size, bold).render(content, True, color)
+
+
+class StaticPanel:
+    """
+    Pannello con titolo e righe di testo ("---" = separatore), composto in una
+    Surface propria una sola volta: si ricompone solo se cambiano righe o dimensioni.
+    """
+
+    def __init__(self, title: str, font_name: str | None = None):
+        self.title = title
+        self.font_name = font_name
+        self._key: tuple | None = None
+        self._surface: pygame.Surface | None = None
+
+    def draw(self, surface: pygame.Surface, rect, lines: Sequence[str]) -> None:
+        x, y, w, h = rect
+        key = (w, h, tuple(lines))
+        if key != self._key:
+            self._surface = self._compose(w, h, key[2])
+            self._key = key
+        surface.blit(self._surface, (x, y))
+
+    def _compose(self, w: int, h: int, lines: Sequence[str]) -> pygame.Surface:
+        out = pygame.Surface((w, h))
+        out.fill(PANEL_BG)
+        pygame.draw.rect(out, PANEL_BORDER, (0, 0, w, h), 1)
+        out.blit(text(self.title, 20, TITLE_COLOR, True, self.font_name), (10, 10))
+        yy = 40
+        for line in lines:
+            if line == "---":
+                pygame.draw.line(out, GRID_COLOR, (10, yy+4), (w-10, yy+4), 1)
+                yy += 12
+                continue
+            out.blit(text(line, 18, TEXT_COLOR, False, self.font_name), (10, yy))
+            yy += 22
+        return out
+
+
 def draw_panel(surface: pygame.Surface, rect, title: str, lines: List[str],
                font_name: str | None = None) -> None:
-    x, y, w, h = rect
-    pygame.draw.rect(surface, PANEL_BG, rect)
-    pygame.draw.rect(surface, PANEL_BORDER, rect, 1)
-    font_title = pygame.font.SysFont(font_name, 20, bold=True)
-    font_line = pygame.font.SysFont(font_name, 18)
-    surface.blit(font_title.render(title, True, TITLE_COLOR), (x+10, y+10))
-    yy = y + 40
-    for line in lines:
-        if line == "---":
-            pygame.draw.line(surface, GRID_COLOR, (x+10, yy+4), (x+w-10, yy+4), 1)
-            yy += 12
-            continue
-        txt = font_line.render(line, True, TEXT_COLOR)
-        surface.blit(txt, (x+10, yy))
-        yy += 22
-
-def _sparkline(surface: pygame.Surface, rect, data: Sequence[float]) -> None:
+    _retained(StaticPanel, title, font_name).draw(surface, rect, lines)
+
+def _sparkline(surface: pygame.Surface, rect, data: Sequence[float] | np.ndarray | None) -> None:
     x, y, w, h = rect
     pygame.draw.rect(surface, (20,20,24), rect)
     pygame.draw.rect(surface, GRID_COLOR, rect, 1)
-    if not data or len(data) < 2:
+    if data is None or len(data) < 2:
         return
-    dmin = min(data)
-    dmax = max(data)
+    # al più un punto per pixel: costo costante qualunque sia la lunghezza dello storico
+    data = downsample(data, w)
+    dmin = data.min()
+    dmax = data.max()
     rng = (dmax - dmin) if dmax != dmin else 1.0
     n = len(data)
     step = max(1, w // max(1, n-1))
-    points = []
-    for i, v in enumerate(data[-(w//step + 1):]):
-        px = x + i * step
-        py = y + h - int((v - dmin) / rng * (h-2)) - 1
-        points.append((px, py))
-    if len(points) >= 2:
-        pygame.draw.lines(surface, LINE_COLOR, False, points, 2)
+    data = data[-(w//step + 1):]
+    px = x + np.arange(len(data)) * step
+    py = y + h - ((data - dmin) / rng * (h-2)).astype(np.int64) - 1
+    pygame.draw.lines(surface, LINE_COLOR, False, np.column_stack((px, py)).tolist(), 2)
 
-def draw_stats_panel(surface: pygame.Surface, rect, title: str,
-                     stats: dict[str, tuple[float, list[float] | None]],
-                     font_name: str | None = None) -> None:
+
+class StatsPanel:
     """
-    stats: dict { label: (value, history or None) }
+    Pannello statistiche in modalità "retained": sfondo, titolo ed etichette si
+    compongono una volta per layout (dimensioni, titolo, etichette); a ogni draw si
+    ridisegnano solo i valori e le sparkline cambiati dal draw precedente, poi il
+    pannello va sullo schermo con un solo blit.
+
     Layout per voce:
       [Label.........................] [sparkline]
       [Valore allineato a sinistra..] [sparkline]
     """
-    x, y, w, h = rect
-    pygame.draw.rect(surface, PANEL_BG, rect)
-    pygame.draw.rect(surface, PANEL_BORDER, rect, 1)
+    ROW_H = 36  # più alto: 2 righe
 
-    font_title = pygame.font.SysFont(font_name, 20, bold=True)
-    font_label = pygame.font.SysFont(font_name, 18, bold=False)
-    font_value = pygame.font.SysFont(font_name, 18, bold=True)
+    def __init__(self, title: str, font_name: str | None = None):
+        self.title = title
+        self.font_name = font_name
+        self.redrawn = 0  # valori + sparkline ridisegnati nell'ultimo draw
+        self._layout: tuple | None = None
+        self._surface: pygame.Surface | None = None
+        self._values: dict[str, str] = {}
+        self._hists: dict[str, np.ndarray] = {}
 
-    surface.blit(font_title.render(title, True, TITLE_COLOR), (x+10, y+10))
+    def draw(self, surface: pygame.Surface, rect,
+             stats: dict[str, tuple[float, Sequence[float] | None]]) -> None:
+        """stats: dict { label: (value, history or None) }"""
+        x, y, w, h = rect
+        layout = (w, h, self.title, tuple(stats))
+        if layout != self._layout:
+            self._compose(w, h, layout[3])
+            self._layout = layout
+        self.redrawn = 0
+        for i, (label, (val, hist)) in enumerate(stats.items()):
+            self._update_row(i, label, val, hist)
+        surface.blit(self._surface, (x, y))
 
-    yy = y + 44
-    row_h = 36                 # più alto: 2 righe
-    chart_w = int(w * 0.42)    # spazio sparkline a destra
-    text_w = w - 20 - chart_w - 10
+    def _compose(self, w: int, h: int, labels: Sequence[str]) -> None:
+        self._surface = out = pygame.Surface((w, h))
+        out.fill(PANEL_BG)
+        pygame.draw.rect(out, PANEL_BORDER, (0, 0, w, h), 1)
+        out.blit(text(self.title, 20, TITLE_COLOR, True, self.font_name), (10, 10))
+        for i, label in enumerate(labels):
+            out.blit(text(str(label), 18, TEXT_COLOR, False, self.font_name), (10, 44 + i * self.ROW_H))
+        self._chart_w = int(w * 0.42)  # spazio sparkline a destra
+        self._chart_x = 10 + (w - 20 - self._chart_w - 10) + 10
+        self._values.clear()
+        self._hists.clear()
 
-    for label, (val, hist) in stats.items():
-        # Testo a sinistra (2 righe)
-        label_surf = font_label.render(str(label), True, TEXT_COLOR)
+    def _update_row(self, i: int, label: str, val, hist: Sequence[float] | None) -> None:
+        out = self._surface
+        yy = 44 + i * self.ROW_H
+        has_chart = hist is not None and self._chart_w > 40
         if isinstance(val, float) and not str(label).startswith("Tick"):
             val_text = f"{val:.2f}"
         else:
             val_text = f"{val}"
-        value_surf = font_value.render(val_text, True, TEXT_COLOR)
+        redraw_chart = has_chart and not np.array_equal(self._hists.get(label), hist)
+        if self._values.get(label) != val_text:
+            # riga 2: si ripulisce fino alla sparkline (o al bordo, se la voce non ne ha)
+            right = self._chart_x if has_chart else out.get_width() - 1
+            out.fill(PANEL_BG, (1, yy + 18, right - 1, self.ROW_H - 18))
+            value_surf = text(val_text, 18, TEXT_COLOR, True, self.font_name)
+            out.blit(value_surf, (10, yy + 18))
+            self._values[label] = val_text
+            self.redrawn += 1
+            # un valore lungo sconfina nella sparkline: va ridisegnata sopra
+            redraw_chart |= has_chart and 10 + value_surf.get_width() > self._chart_x
+        if redraw_chart:
+            # Sparkline a destra (occupazione verticale = row_h - 6); la linea spessa 2
+            # sborda a destra del riquadro: si ripulisce anche quel margine
+            out.fill(PANEL_BG, (self._chart_x + self._chart_w, yy, 2, self.ROW_H))
+            _sparkline(out, (self._chart_x, yy + 3, self._chart_w, self.ROW_H - 6), hist)
+            self._hists[label] = np.array(hist)
+            self.redrawn += 1
 
-        surface.blit(label_surf, (x+10, yy))             # riga 1: label
-        surface.blit(value_surf, (x+10, yy + 18))         # riga 2: valore
 
-        # Sparkline a destra (occupazione verticale = row_h - 6)
-        if hist is not None and chart_w > 40:
-            cx = x + 10 + text_w + 10
-            cy = yy + 3
-            ch = row_h - 6
-            _sparkline(surface, (cx, cy, chart_w, ch), hist)
+def draw_stats_panel(surface: pygame.Surface, rect, title: str,
+                     stats: dict[str, tuple[float, Sequence[float] | None]],
+                     font_name: str | None = None) -> None:
+    """Come StatsPanel.draw, con un pannello trattenuto per (titolo, font)."""
+    _retained(StatsPanel, title, font_name).draw(surface, rect, stats)
+
+
+_RETAINED: dict[tuple, StaticPanel | StatsPanel] = {}
+
 
-        yy += row_h
+def _retained(kind: type, title: str, font_name: str | None):
+    key = (kind, title, font_name)
+    if key not in _RETAINED:
+        _RETAINED[key] = kind(title, font_name)
+    return _RETAINED[key]
+
+def draw_profiler_overlay(surface: pygame.Surface, pos: tuple[int, int],
+                          frame_ms: dict[str, float], system_ms: dict[str, float],
+                          font_name: str | None = None) -> None:
+    """
+    Riquadro semitrasparente con la ripartizione del frame (step, cibo, agenti,
+    pannelli) e il tempo medio di ogni sistema della simulazione.
+    """
+    lines = ["Frame (ms)"]
+    lines += [f"  {k:<12}{v:7.2f}" for k, v in frame_ms.items()]
+    lines.append(f"  {'totale':<12}{sum(frame_ms.values()):7.2f}")
+    if system_ms:
+        lines.append("Sistemi, per tick (ms)")
+        lines += [f"  {k:<12}{v:7.2f}" for k, v in sorted(system_ms.items(), key=lambda kv: -kv[1])]
+    row_h = 17
+    w, h = 210, 10 + row_h * len(lines)
+    box = pygame.Surface((w, h), pygame.SRCALPHA)
+    box.fill((10, 10, 14, 200))
+    for i, line in enumerate(lines):
+        color = TITLE_COLOR if not line.startswith(" ") else TEXT_COLOR
+        box.blit(text(line, 16, color, False, font_name), (8, 5 + i * row_h))
+    surface.blit(box, pos)
+    pygame.draw.rect(surface, PANEL_BORDER, (pos[0], pos[1], w, h), 1)
 
 def make_legend_lines(cfg) -> list[str]:
     return [
@@ -122,5 +237,7 @@ def make_legend_lines(cfg) -> list[str]:
         "Controlli:",
         "SPACE: Pausa/Play   + / - : Velocità",
         "C: Pannello parametri   ESC: Esci",
+        "P: Profiler (tempi per sistema)",
+        "H: Orizzonte grafici (600 / 60k tick / run)",
         "Resize finestra: auto-adattamento",
     ]
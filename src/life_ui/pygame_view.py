@@ -1,45 +1,33 @@
 from __future__ import annotations
+import argparse
 import pygame
-from collections import deque
-from typing import Deque
+import time
 
 from life_sim.config import SimConfig
-from life_sim.world import World
-from life_sim.agent import Agent
-from life_sim.scheduler import step
 
-from .renderer import layout_for_cfg, food_surface, draw_agents, draw_conflict_flashes
-from .panels import draw_panel, draw_stats_panel, make_legend_lines
+from .renderer import layout_for_cfg, draw_agents, draw_conflict_flashes
+from .food_layer import FoodLayer
+from .panels import StaticPanel, StatsPanel, draw_profiler_overlay, make_legend_lines
 from .control_panel import Tunables, ControlPanel
+from .sim_thread import DirectSim, SimThread
+from .history import HORIZONS
 
 LEFT_PANEL_W = 240
 RIGHT_PANEL_W = 340
 WINDOW_BG = (18, 18, 22)
 FONT_NAME = None  # default di sistema
+FOOD_PREVIEW_MAX = 4096  # lato massimo della mappa del cibo disegnata (oltre: sotto-campionata)
+FOOD_REDRAW_TICKS = 5  # senza thread: sfondo del cibo aggiornato ogni tot tick
 
 
-def init_agents(cfg: SimConfig, world: World) -> list[Agent]:
-    rng = world.rng.py
-    np_rng = world.rng.np
-    agents: list[Agent] = []
-    mu = cfg.initial_age_median_years
-    sigma = max(0.0, cfg.initial_age_spread_years)
-    for i in range(cfg.initial_agents):
-        sex = "M" if rng.random() < 0.5 else "F"
-        age = float(np_rng.normal(mu, sigma)) if sigma > 0 else mu
-        age = max(0.0, min(age, 0.95 * 80.0))
-        infected = (rng.random() < cfg.initial_infected_pct)
-        agents.append(Agent(
-            id=i, x=rng.randrange(cfg.width), y=rng.randrange(cfg.height),
-            sex=sex, age_years=age, infected=infected
-        ))
-    return agents
-
-
-def main() -> None:
+def main(threaded: bool = False) -> None:
+    """
+    Finestra della simulazione. Con `threaded` i tick girano in un thread dedicato
+    (sim_thread.SimThread) e il disegno usa sempre l'ultimo snapshot pubblicato;
+    altrimenti girano nel loop di disegno.
+    """
     cfg = SimConfig()
-    world = World.create(cfg)
-    agents = init_agents(cfg, world)
+    sim = SimThread(cfg, FOOD_PREVIEW_MAX) if threaded else DirectSim(cfg, FOOD_PREVIEW_MAX)
 
     pygame.init()
     (win_w, win_h), map_rect = layout_for_cfg(cfg, LEFT_PANEL_W, RIGHT_PANEL_W)
@@ -47,42 +35,34 @@ def main() -> None:
     pygame.display.set_caption("Life-Sim")
     clock = pygame.time.Clock()
 
-    bg = food_surface(world.food)
-    bg_scaled = pygame.transform.smoothscale(bg, (map_rect[2], map_rect[3]))
-    redraw_every = 5
-
-    ticks = 0
-    births_total = 0
-    deaths_total = 0
-    deaths_starv = deaths_age = deaths_disease = deaths_conflict = 0
-    infected_now = 0
-    conflicts_current = 0
+    snap = None
+    while snap is None:
+        snap = sim.latest()
+    # sfondo del cibo: LUT + buffer persistente, si ridisegnano solo le tile cambiate
+    food_layer = FoodLayer(snap.food)
+    food_tick = snap.tick
+    bg_scaled = food_layer.scaled((map_rect[2], map_rect[3]))
 
     # flash conflitti (time_left_s, x_cell, y_cell)
     conflict_flashes: list[tuple[float,int,int]] = []
 
-    # history
-    H: int = 600
-    hist_pop: Deque[int] = deque(maxlen=H)
-    hist_male: Deque[int] = deque(maxlen=H)
-    hist_fem: Deque[int] = deque(maxlen=H)
-    hist_infected: Deque[int] = deque(maxlen=H)
-    hist_births: Deque[int] = deque(maxlen=H)
-    hist_deaths: Deque[int] = deque(maxlen=H)
-    hist_dconf: Deque[int] = deque(maxlen=H)
-    hist_conflicts: Deque[int] = deque(maxlen=H)
-    hist_eavg: Deque[float] = deque(maxlen=H)
-    hist_aavg: Deque[float] = deque(maxlen=H)
-
     paused = False
     speed_mult = 1.0
-    tick_hz = cfg.tick_rate_hz
-    fixed_dt = 1.0 / max(1, tick_hz)
-    acc = 0.0
+
+    # profiler: tempi del frame (media mobile esponenziale) + tempi per sistema di step
+    show_prof = False
+    horizon = 0  # orizzonte dei grafici (indice di HORIZONS)
+    frame_ms = {"step": 0.0, "food_surface": 0.0, "draw_agents": 0.0, "pannelli": 0.0}
+
+    def track(key: str, seconds: float) -> None:
+        frame_ms[key] += 0.1 * (1e3 * seconds - frame_ms[key])
 
     show_ctrl = False
     tun = Tunables.from_cfg(cfg)
     ctrl = ControlPanel(tun, font_name=FONT_NAME)
+    # pannelli trattenuti: si ridisegna solo ciò che cambia tra un frame e l'altro
+    stats_panel = StatsPanel("Statistiche", font_name=FONT_NAME)
+    legend_panel = StaticPanel("Legenda & Regole", font_name=FONT_NAME)
 
     running = True
     while running:
@@ -97,11 +77,12 @@ def main() -> None:
                 if target_h > mh:
                     mw = int(mh * (cfg.width / cfg.height)); target_h = mh
                 map_rect = (LEFT_PANEL_W, (win_h - target_h)//2, mw, target_h)
-                bg_scaled = pygame.transform.smoothscale(bg, (map_rect[2], map_rect[3]))
+                bg_scaled = food_layer.scaled((map_rect[2], map_rect[3]))
             elif e.type == pygame.KEYDOWN:
                 if show_ctrl:
                     if e.key == pygame.K_ESCAPE:
                         show_ctrl = False
+                        sim.pause(paused)
                     elif e.key == pygame.K_RETURN:
                         new_cfg = tun.to_cfg(seed=cfg.seed, toroidal=cfg.toroidal)
                         need_reset = (
@@ -116,26 +97,10 @@ def main() -> None:
                             new_cfg.initial_infected_pct != cfg.initial_infected_pct
                         )
                         cfg = new_cfg
-                        tick_hz = cfg.tick_rate_hz
-                        fixed_dt = 1.0 / max(1, tick_hz)
-                        if need_reset:
-                            world = World.create(cfg)
-                            agents = init_agents(cfg, world)
-                            ticks = 0
-                            births_total = deaths_total = 0
-                            deaths_starv = deaths_age = deaths_disease = deaths_conflict = 0
-                            infected_now = 0
-                            conflicts_current = 0
-                            conflict_flashes.clear()
-                            for dq in (hist_pop, hist_male, hist_fem, hist_infected,
-                                       hist_births, hist_deaths, hist_dconf, hist_conflicts,
-                                       hist_eavg, hist_aavg):
-                                dq.clear()
-                            (win_w, win_h), map_rect = layout_for_cfg(cfg, LEFT_PANEL_W, RIGHT_PANEL_W)
-                            screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
-                            bg = food_surface(world.food)
-                            bg_scaled = pygame.transform.smoothscale(bg, (map_rect[2], map_rect[3]))
+                        # il reset (nuovo mondo) arriva con lo snapshot della nuova generazione
+                        sim.apply(new_cfg, need_reset)
                         show_ctrl = False
+                        sim.pause(paused)
                     elif e.key == pygame.K_UP:
                         ctrl.move(-1)
                     elif e.key == pygame.K_DOWN:
@@ -149,15 +114,25 @@ def main() -> None:
                         running = False
                     elif e.key == pygame.K_SPACE:
                         paused = not paused
+                        sim.pause(paused)
                     elif e.key in (pygame.K_PLUS, pygame.K_EQUALS):
                         speed_mult = min(8.0, speed_mult * 2.0)
+                        sim.set_speed(speed_mult)
                     elif e.key in (pygame.K_MINUS, pygame.K_UNDERSCORE):
                         speed_mult = max(0.25, speed_mult / 2.0)
+                        sim.set_speed(speed_mult)
                     elif e.key == pygame.K_c:
                         show_ctrl = True; paused = True
+                        sim.pause(True)
+                    elif e.key == pygame.K_p:
+                        show_prof = not show_prof
+                        sim.set_profiling(show_prof)
+                    elif e.key == pygame.K_h:
+                        horizon = (horizon + 1) % len(HORIZONS)
+                        sim.set_horizon(horizon)
 
         dt = clock.tick(60) / 1000.0
-        acc += dt * speed_mult
+        sim.advance(dt)
 
         # decay dei flash (anche in pausa)
         if conflict_flashes:
@@ -168,77 +143,64 @@ def main() -> None:
                     tmp.append((nt, cx, cy))
             conflict_flashes = tmp
 
-        stepped = False
-        while not paused and not show_ctrl and acc >= fixed_dt:
-            agents, info = step(world, agents)
-            ticks += 1
-            births_total += info["births"]
-            deaths_total += sum(info["deaths"].values())
-            deaths_starv += info["deaths"]["starvation"]
-            deaths_age += info["deaths"]["age"]
-            deaths_disease += info["deaths"]["disease"]
-            deaths_conflict += info["deaths"].get("conflict", 0)
-            infected_now = info["infected"]
-            conflicts_current = info.get("conflicts", 0)
-            # flash nuovi
-            dur = cfg.conflict_flash_duration_s
-            for (cx, cy) in info.get("conflict_positions", []):
-                conflict_flashes.append((dur, cx, cy))
-
-            acc -= fixed_dt
-            stepped = True
-
-            # history
-            m = sum(1 for a in agents if a.sex == "M")
-            f = len(agents) - m
-            e_avg = (sum(a.energy for a in agents)/len(agents)) if agents else 0.0
-            a_avg = (sum(a.age_years for a in agents)/len(agents)) if agents else 0.0
-            hist_pop.append(len(agents)); hist_male.append(m); hist_fem.append(f)
-            hist_infected.append(infected_now)
-            hist_births.append(births_total); hist_deaths.append(deaths_total)
-            hist_dconf.append(deaths_conflict); hist_conflicts.append(conflicts_current)
-            hist_eavg.append(e_avg); hist_aavg.append(a_avg)
-
-        if stepped and ticks % redraw_every == 0:
-            bg = food_surface(world.food)
-            bg_scaled = pygame.transform.smoothscale(bg, (map_rect[2], map_rect[3]))
+        new = sim.latest()
+        if new is not None:
+            t0 = time.perf_counter()
+            if new.generation != snap.generation:
+                # mondo nuovo: finestra, sfondo e flash ripartono da zero
+                conflict_flashes.clear()
+                (win_w, win_h), map_rect = layout_for_cfg(new.cfg, LEFT_PANEL_W, RIGHT_PANEL_W)
+                screen = pygame.display.set_mode((win_w, win_h), pygame.RESIZABLE)
+                food_layer = FoodLayer(new.food)
+                food_tick = new.tick
+            elif threaded or new.tick - food_tick >= FOOD_REDRAW_TICKS:
+                # i FoodFrame del thread vanno applicati tutti: ognuno porta le sue tile sporche
+                food_layer.update(new.food)
+                food_tick = new.tick
+            bg_scaled = food_layer.scaled((map_rect[2], map_rect[3]))
+            track("food_surface", time.perf_counter() - t0)
+            dur = new.cfg.conflict_flash_duration_s
+            conflict_flashes.extend((dur, cx, cy) for (cx, cy) in new.conflicts)
+            snap = new
+        frame_ms["step"] = snap.step_ms
 
         screen.fill(WINDOW_BG)
 
-        stats = {
-            "Tick": (ticks, None),
-            "Popolazione": (hist_pop[-1] if hist_pop else len(agents), list(hist_pop)),
-            "Maschi": (hist_male[-1] if hist_male else 0, list(hist_male)),
-            "Femmine": (hist_fem[-1] if hist_fem else 0, list(hist_fem)),
-            "Infetti": (hist_infected[-1] if hist_infected else 0, list(hist_infected)),
-            "Nati totali": (hist_births[-1] if hist_births else births_total, list(hist_births)),
-            "Morti totali": (hist_deaths[-1] if hist_deaths else deaths_total, list(hist_deaths)),
-            "Morti per conflitto": (hist_dconf[-1] if hist_dconf else deaths_conflict, list(hist_dconf)),
-            "Conflitti (tick)": (hist_conflicts[-1] if hist_conflicts else conflicts_current, list(hist_conflicts)),
-            "Energia media": (hist_eavg[-1] if hist_eavg else 0.0, list(hist_eavg)),
-            "Età media (anni)": (hist_aavg[-1] if hist_aavg else 0.0, list(hist_aavg)),
-        }
-        from .panels import draw_stats_panel  # assicurati di avere import pygame in panels.py
-        draw_stats_panel(surface=screen, rect=(0, 0, LEFT_PANEL_W, win_h),
-                         title="Statistiche", stats=stats, font_name=FONT_NAME)
+        # pannelli = statistiche + legenda, misurati separatamente e sommati
+        t0 = time.perf_counter()
+        stats_panel.title = f"Statistiche · {HORIZONS[snap.horizon]}"
+        stats_panel.draw(screen, (0, 0, LEFT_PANEL_W, win_h), snap.stats)
+        panels_s = time.perf_counter() - t0
 
         mx, my, mw, mh = map_rect
         screen.blit(bg_scaled, (mx, my))
-        draw_agents(screen, agents, cfg, mx, my, mw, mh)
+        t0 = time.perf_counter()
+        draw_agents(screen, snap.agents, snap.cfg, mx, my, mw, mh)
+        track("draw_agents", time.perf_counter() - t0)
+
+        if snap.cfg.show_conflict_flash:
+            draw_conflict_flashes(screen, conflict_flashes, snap.cfg, mx, my, mw, mh)
 
-        if cfg.show_conflict_flash:
-            draw_conflict_flashes(screen, conflict_flashes, cfg, mx, my, mw, mh)
+        t0 = time.perf_counter()
+        legend_panel.draw(screen, (win_w - RIGHT_PANEL_W, 0, RIGHT_PANEL_W, win_h),
+                          make_legend_lines(snap.cfg))
+        panels_s += time.perf_counter() - t0
+        track("pannelli", panels_s)
 
-        legend_lines = make_legend_lines(cfg)
-        draw_panel(screen, (win_w - RIGHT_PANEL_W, 0, RIGHT_PANEL_W, win_h),
-                   "Legenda & Regole", legend_lines, font_name=FONT_NAME)
+        if show_prof and snap.system_ms is not None:
+            draw_profiler_overlay(screen, (mx + 8, my + 8), frame_ms,
+                                  snap.system_ms, font_name=FONT_NAME)
 
         if show_ctrl:
             ctrl.render(screen, (0, 0, win_w, win_h))
 
         pygame.display.flip()
 
+    sim.close()
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(prog="python -m life_ui.pygame_view")
+    ap.add_argument("--threaded", action="store_true",
+                    help="simulazione in un thread dedicato: il disegno usa l'ultimo snapshot")
+    main(threaded=ap.parse_args().threaded)
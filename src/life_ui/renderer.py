@@ -1,9 +1,10 @@
 from __future__ import annotations
 import pygame
 import numpy as np
-from typing import Tuple, List
+from typing import Tuple, Iterable
 from life_sim.agent import Agent
 from life_sim.config import SimConfig
+from life_sim.store import AgentStore
 
 MAP_BASE_W = 900
 WINDOW_H = 720
@@ -16,66 +17,109 @@ def layout_for_cfg(cfg: SimConfig, left_w: int, right_w: int) -> Tuple[Tuple[int
     map_rect = (left_w, (win_h - map_h)//2, map_w, map_h)
     return (win_w, win_h), map_rect
 
-def food_surface(food: np.ndarray) -> pygame.Surface:
-    import numpy as np
-    import pygame
-
-    f = np.clip(food, 0.0, 1.0)
-
-    # ---- Parametri tarabili ----
-    vmin = 0.12   # sotto questa soglia: solo terreno
-    vmax = 0.60   # sopra: verde pieno
-    gamma = 0.6   # <1 enfatizza le zone ricche
-
-    # Colori
-    base = np.array([198, 180, 158], dtype=np.float32)   # terreno (marrone chiaro)
-    veg  = np.array([ 64, 168,  88], dtype=np.float32)   # verde della vegetazione (saturo ma non fluo)
-
-    # Base terreno (fisso)
-    rgb = np.empty(f.shape + (3,), dtype=np.float32)
-    rgb[..., 0] = base[0]
-    rgb[..., 1] = base[1]
-    rgb[..., 2] = base[2]
-
-    # Alpha dell'overlay vegetazione (0..1), solo dove c'è abbastanza cibo
-    t = np.clip((f - vmin) / max(1e-6, (vmax - vmin)), 0.0, 1.0) ** gamma
-    a = t[..., None]  # (H,W,1)
-
-    # Composizione: terreno + overlay verde
+# ---- Colori della mappa del cibo (parametri tarabili) ----
+FOOD_VMIN = 0.12    # sotto questa soglia: solo terreno
+FOOD_VMAX = 0.60    # sopra: verde pieno
+FOOD_GAMMA = 0.6    # <1 enfatizza le zone ricche
+FOOD_BASE = (198, 180, 158)   # terreno (marrone chiaro)
+FOOD_VEG = (64, 168, 88)      # verde della vegetazione (saturo ma non fluo)
+FOOD_LEVELS = 256   # livelli di quantizzazione del cibo in [0, 1]
+
+def food_levels(food: np.ndarray) -> np.ndarray:
+    """Cibo -> indice nella LUT (uint8): FOOD_LEVELS passi uniformi su [0, 1], arrotondando."""
+    q = np.multiply(food, FOOD_LEVELS - 1, dtype=np.float32)
+    q += 0.5
+    np.clip(q, 0.0, FOOD_LEVELS - 1, out=q)
+    return q.astype(np.uint8)
+
+def food_lut() -> np.ndarray:
+    """(FOOD_LEVELS, 3) uint8: colore per livello, terreno + overlay verde secondo vmin/vmax/gamma."""
+    f = np.linspace(0.0, 1.0, FOOD_LEVELS)
+    # alpha dell'overlay vegetazione (0..1), solo dove c'è abbastanza cibo
+    a = (np.clip((f - FOOD_VMIN) / max(1e-6, (FOOD_VMAX - FOOD_VMIN)), 0.0, 1.0) ** FOOD_GAMMA)[:, None]
     # Nota: qui non misceliamo verso il marrone: aggiungiamo *solo* la tinta verde.
-    rgb = rgb * (1.0 - a) + veg * a
+    rgb = np.array(FOOD_BASE, dtype=np.float64) * (1.0 - a) + np.array(FOOD_VEG, dtype=np.float64) * a
+    return np.clip(rgb, 0, 255).astype(np.uint8)
 
-    rgb = np.clip(rgb, 0, 255).astype(np.uint8)
-    rgb = np.transpose(rgb, (1, 0, 2))  # (W,H,3) per Pygame
-    return pygame.surfarray.make_surface(rgb)
+_FOOD_LUT = food_lut()
+
+def food_surface(food: np.ndarray) -> pygame.Surface:
+    """Superficie della mappa del cibo in un colpo solo (per l'aggiornamento incrementale vedi FoodLayer)."""
+    rgb = _FOOD_LUT[food_levels(food)]
+    return pygame.surfarray.make_surface(np.transpose(rgb, (1, 0, 2)))  # (W,H,3) per Pygame
 
 def age_tint(color_base: tuple[int,int,int], age_years: float, max_age: float) -> tuple[int,int,int]:
     r = 0.0 if max_age <= 0 else min(1.0, max(0.0, age_years / max_age))
     lum = 1.0 - 0.5 * r
     return (int(color_base[0]*lum), int(color_base[1]*lum), int(color_base[2]*lum))
 
-def draw_agents(screen: pygame.Surface, agents: List[Agent], cfg: SimConfig,
-                mx: int, my: int, mw: int, mh: int) -> None:
+SEX_COLORS = np.array([[0, 255, 255],     # SEX_M
+                       [255, 0, 255]],    # SEX_F
+                      dtype=np.float64)
+RISK_OUTER = (0, 0, 0)        # bordo nero
+RISK_INNER = (255, 120, 0)    # bordo arancione
+_TRANSPARENT = (1, 2, 3)      # colorkey del buffer: nessun colore di agente lo produce
+
+def _pack(rgb) -> np.ndarray:
+    """Colori (..., 3) -> uint32 con i byte in ordine R, G, B, X in memoria (formato "RGBX")."""
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return rgb[..., 0] | (rgb[..., 1] << 8) | (rgb[..., 2] << 16)
+
+def agent_colors(sex: np.ndarray, age_years: np.ndarray, max_age: np.ndarray) -> np.ndarray:
+    """Versione vettoriale di age_tint sui colori per sesso: (n, 3) uint8."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(max_age > 0, np.clip(age_years / max_age, 0.0, 1.0), 0.0)
+    lum = 1.0 - 0.5 * r
+    return (SEX_COLORS[sex] * lum[:, None]).astype(np.uint8)
+
+def _fill_squares(flat: np.ndarray, stride: int, corner: np.ndarray, size: int, color) -> None:
+    """Quadrati size×size con angolo in `corner` (indici lineari) nell'immagine piatta."""
+    for oy in range(size):
+        for ox in range(size):
+            flat[corner + (oy * stride + ox)] = color
+
+def agent_buffer(agents: Iterable[Agent] | AgentStore, cfg: SimConfig, mw: int, mh: int) -> np.ndarray:
+    """
+    Agenti rasterizzati in un buffer (mh, mw) uint32 "RGBX" (byte R, G, B, X) alla
+    risoluzione della mappa a schermo; i pixel senza agenti valgono _TRANSPARENT.
+    Gli agenti a rischio di conflitto sono disegnati per ultimi, più grandi e con il
+    doppio bordo: in una cella condivisa il loro contorno resta sopra gli altri, qualunque
+    sia l'ordine della lista.
+    """
+    store = agents if isinstance(agents, AgentStore) else AgentStore.from_agents(agents)
     sx = mw / cfg.width
     sy = mh / cfg.height
     base_size = max(2, int(min(sx, sy)))
     risk_size = max(4, base_size + 1)
 
-    for a in agents:
-        px = mx + int(a.x * sx)
-        py = my + int(a.y * sy)
-
-        base = (0, 255, 255) if a.sex == "M" else (255, 0, 255)
-        col = age_tint(base, a.age_years, a.max_age)
-
-        size = risk_size if a.at_risk_conflict else base_size
-        rect = pygame.Rect(px, py, size, size)
-        pygame.draw.rect(screen, col, rect)
-
-        if a.at_risk_conflict:
-            outer = rect.inflate(2, 2)
-            pygame.draw.rect(screen, (0, 0, 0), outer, 2)        # bordo nero
-            pygame.draw.rect(screen, (255, 120, 0), rect, 1)     # bordo arancione
+    # margine attorno alla mappa: i quadrati sui bordi si scrivono senza controlli e si tagliano dopo
+    pad = risk_size + 1
+    stride = mw + 2 * pad
+    img = np.full((mh + 2 * pad, stride), _pack(_TRANSPARENT), dtype=np.uint32)
+    flat = img.reshape(-1)
+    corner = ((store.y * sy).astype(np.int64) + pad) * stride + (store.x * sx).astype(np.int64) + pad
+    colors = _pack(agent_colors(store.sex, store.age_years, store.max_age))
+
+    risk = store.at_risk_conflict
+    calm = ~risk
+    _fill_squares(flat, stride, corner[calm], base_size, colors[calm])
+    if risk.any():
+        rc = corner[risk]
+        _fill_squares(flat, stride, rc - stride - 1, risk_size + 2, _pack(RISK_OUTER))
+        _fill_squares(flat, stride, rc, risk_size, _pack(RISK_INNER))
+        _fill_squares(flat, stride, rc + stride + 1, risk_size - 2, colors[risk])
+    return np.ascontiguousarray(img[pad:pad + mh, pad:pad + mw])
+
+def draw_agents(screen: pygame.Surface, agents: Iterable[Agent] | AgentStore, cfg: SimConfig,
+                mx: int, my: int, mw: int, mh: int) -> None:
+    """
+    Disegna gli agenti con un solo blit: il costo dipende dai pixel della mappa e
+    non da una chiamata di disegno per agente.
+    """
+    buf = agent_buffer(agents, cfg, mw, mh)
+    layer = pygame.image.frombuffer(buf, (mw, mh), "RGBX")
+    layer.set_colorkey(_TRANSPARENT)
+    screen.blit(layer, (mx, my))
 
 def draw_conflict_flashes(screen: pygame.Surface, flashes: list[tuple[float,int,int]],
                           cfg: SimConfig, mx: int, my: int, mw: int, mh: int) -> None:
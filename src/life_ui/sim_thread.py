@@ -0,0 +1,293 @@
+"""
+Simulazione per la finestra pygame, con due modalità e la stessa interfaccia:
+
+- DirectSim: i tick girano nel loop di disegno (come in origine), a passo fisso.
+- SimThread: i tick girano in un thread dedicato, al proprio ritmo. Il thread
+  pubblica Snapshot immutabili (copie di agenti, mappa del cibo e contatori) in
+  doppio buffer: il loop di disegno prende l'ultimo con latest(), e solo allora il
+  thread ne prepara un altro. Pausa, velocità, profilo, orizzonte dei grafici e
+  "applica" del pannello di controllo arrivano al thread come comandi in coda,
+  quindi l'interfaccia resta a 60 FPS anche quando la simulazione non sta al passo.
+
+Il thread condivide il GIL con il disegno: i kernel NumPy/Numba lo rilasciano, i
+loop Python no; in ogni caso l'input non aspetta più la fine dei tick.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from life_sim.config import SimConfig
+from life_sim.population import init_store
+from life_sim.profiling import StepProfiler
+from life_sim.scheduler import step
+from life_sim.store import AgentStore
+from life_sim.world import World
+from .food_layer import FoodFrame, FoodSource, WorldFood
+from .history import History
+
+HISTORY = 600
+# tick massimi per giro: oltre, la simulazione rinuncia a recuperare il ritardo
+MAX_STEPS_PER_BATCH = 64
+
+# serie storiche del pannello statistiche (etichetta -> nome)
+SERIES = {
+    "Popolazione": "pop",
+    "Maschi": "male",
+    "Femmine": "fem",
+    "Infetti": "infected",
+    "Nati totali": "births",
+    "Morti totali": "deaths",
+    "Morti per conflitto": "dconf",
+    "Conflitti (tick)": "conflicts",
+    "Energia media": "eavg",
+    "Età media (anni)": "aavg",
+}
+
+
+@dataclass
+class RunStats:
+    """
+    Totali e storico delle serie (history.History: ultimi `history` tick, medie su
+    orizzonti più lunghi e intera run), aggiornati da record(info) a ogni tick.
+    """
+    history: int = HISTORY
+    ticks: int = 0
+    births_total: int = 0
+    deaths_total: int = 0
+    deaths_conflict: int = 0
+    series: History = field(init=False)
+    last: dict[str, float] = field(default_factory=dict)  # valori dell'ultimo tick
+
+    def __post_init__(self):
+        self.series = History(SERIES.values(), capacity=self.history)
+
+    def record(self, info: dict) -> None:
+        self.ticks += 1
+        self.births_total += info["births"]
+        self.deaths_total += sum(info["deaths"].values())
+        self.deaths_conflict += info["deaths"].get("conflict", 0)
+        pop = info["population"]
+        self.last = {"pop": pop.n, "male": pop.males, "fem": pop.females,
+                     "infected": info["infected"], "births": self.births_total,
+                     "deaths": self.deaths_total, "dconf": self.deaths_conflict,
+                     "conflicts": info.get("conflicts", 0),
+                     "eavg": pop.energy_mean, "aavg": pop.age_mean}
+        self.series.record(self.last[name] for name in self.series.names)
+
+    def panel(self, population: int, horizon: int = 0) -> dict[str, tuple]:
+        """
+        Voci del pannello statistiche: (valore corrente, storico) per etichetta, con lo
+        storico dell'orizzonte history.HORIZONS[horizon] (array in sola lettura).
+        """
+        stats: dict[str, tuple] = {"Tick": (self.ticks, None)}
+        window = self.series.window(horizon)
+        for label, name in SERIES.items():
+            default = population if name == "pop" else 0
+            stats[label] = (self.last.get(name, default), window[name])
+        return stats
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    generation: int  # cambia a ogni reset del mondo (nuova mappa, nuovi agenti)
+    tick: int
+    cfg: SimConfig
+    agents: AgentStore
+    food: FoodSource
+    stats: dict[str, tuple]
+    horizon: int  # orizzonte dello storico in stats (indice di history.HORIZONS)
+    conflicts: tuple[tuple[int, int], ...]  # posizioni dei conflitti dallo snapshot precedente
+    step_ms: float  # tempo medio di un tick (media mobile)
+    system_ms: dict[str, float] | None  # tempi per sistema, se il profilo è attivo
+
+
+class _Sim:
+    def __init__(self, cfg: SimConfig, food_max_side: int = 4096):
+        self.food_max_side = food_max_side
+        self.paused = False
+        self.speed = 1.0
+        self.profiling = False
+        self.horizon = 0
+        self.generation = -1
+        self._reset(cfg)
+
+    def _reset(self, cfg: SimConfig) -> None:
+        self.cfg = cfg
+        self.world = World.create(cfg)
+        if self.profiling:
+            self.world.profiler = StepProfiler(capacity=600)
+        self.agents = init_store(cfg, self.world)
+        self.stats = RunStats()
+        self.conflicts: list[tuple[int, int]] = []
+        self.step_ms = 0.0
+        self.generation += 1
+        self.acc = 0.0
+
+    def _apply(self, cfg: SimConfig, reset: bool) -> None:
+        if reset:
+            self._reset(cfg)
+        else:
+            self.cfg = cfg  # tick rate e parametri visivi; il mondo resta quello
+
+    def _set_profiling(self, on: bool) -> None:
+        # la misura si attiva solo con l'overlay visibile: senza costa nulla
+        self.profiling = on
+        self.world.profiler = StepProfiler(capacity=600) if on else None
+
+    def _advance(self, dt: float) -> int:
+        """Esegue i tick maturati in `dt` secondi (passo fisso 1/tick_rate_hz)."""
+        if self.paused:
+            return 0
+        fixed_dt = 1.0 / max(1, self.cfg.tick_rate_hz)
+        self.acc += dt * self.speed
+        n = 0
+        while self.acc >= fixed_dt and n < MAX_STEPS_PER_BATCH:
+            t0 = time.perf_counter()
+            self.agents, info = step(self.world, self.agents)
+            self.step_ms += 0.1 * (1e3 * (time.perf_counter() - t0) - self.step_ms)
+            self.stats.record(info)
+            self.conflicts.extend(info.get("conflict_positions", []))
+            self.acc -= fixed_dt
+            n += 1
+        if n == MAX_STEPS_PER_BATCH:
+            self.acc = 0.0
+        return n
+
+    def _snapshot(self, agents: AgentStore, food: FoodSource) -> Snapshot:
+        conflicts, self.conflicts = tuple(self.conflicts), []
+        profiler = self.world.profiler
+        return Snapshot(
+            generation=self.generation, tick=self.world.tick, cfg=self.cfg, agents=agents,
+            food=food, stats=self.stats.panel(len(self.agents), self.horizon),
+            horizon=self.horizon, conflicts=conflicts,
+            step_ms=self.step_ms,
+            system_ms=None if profiler is None else profiler.mean_ms(window=60),
+        )
+
+
+class DirectSim(_Sim):
+    """Tick nel loop di disegno; gli snapshot puntano agli oggetti vivi (nessuna copia)."""
+
+    def pause(self, paused: bool) -> None:
+        self.paused = paused
+
+    def set_speed(self, speed: float) -> None:
+        self.speed = speed
+
+    def apply(self, cfg: SimConfig, reset: bool) -> None:
+        self._apply(cfg, reset)
+
+    def set_profiling(self, on: bool) -> None:
+        self._set_profiling(on)
+
+    def set_horizon(self, horizon: int) -> None:
+        self.horizon = horizon
+
+    def advance(self, dt: float) -> None:
+        self._advance(dt)
+
+    def latest(self) -> Snapshot:
+        return self._snapshot(self.agents, WorldFood(self.world, self.food_max_side))
+
+    def close(self) -> None:
+        pass
+
+
+class SimThread(_Sim):
+    """Tick in un thread dedicato; snapshot immutabili pubblicati in doppio buffer."""
+
+    def __init__(self, cfg: SimConfig, food_max_side: int = 4096):
+        super().__init__(cfg, food_max_side)
+        self._commands: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._front: Snapshot | None = None  # pubblicato, non ancora preso dal disegno
+        self._error: BaseException | None = None
+        self._stop = False
+        self._publish()
+        self._thread = threading.Thread(target=self._run, name="life-sim", daemon=True)
+        self._thread.start()
+
+    # ---- comandi (thread del disegno) ----
+    def pause(self, paused: bool) -> None:
+        self._commands.put(("pause", paused))
+
+    def set_speed(self, speed: float) -> None:
+        self._commands.put(("speed", speed))
+
+    def apply(self, cfg: SimConfig, reset: bool) -> None:
+        self._commands.put(("apply", cfg, reset))
+
+    def set_profiling(self, on: bool) -> None:
+        self._commands.put(("profile", on))
+
+    def set_horizon(self, horizon: int) -> None:
+        self._commands.put(("horizon", horizon))
+
+    def advance(self, dt: float) -> None:
+        pass  # il tempo lo misura il thread
+
+    def latest(self) -> Snapshot | None:
+        """Ultimo snapshot pubblicato, se nuovo (altrimenti None: si ridisegna il precedente)."""
+        if self._error is not None:
+            raise RuntimeError("il thread della simulazione si è fermato") from self._error
+        with self._lock:
+            snap, self._front = self._front, None
+        return snap
+
+    def close(self) -> None:
+        self._stop = True
+        self._commands.put(("stop",))
+        self._thread.join()
+
+    # ---- thread della simulazione ----
+    def _publish(self) -> None:
+        snap = self._snapshot(self.agents.copy().freeze(),
+                              FoodFrame.capture(self.world, self.food_max_side))
+        with self._lock:
+            self._front = snap
+
+    def _handle(self, cmd: tuple) -> None:
+        kind = cmd[0]
+        if kind == "pause":
+            self.paused = cmd[1]
+        elif kind == "speed":
+            self.speed = cmd[1]
+        elif kind == "apply":
+            self._apply(cmd[1], cmd[2])
+        elif kind == "profile":
+            self._set_profiling(cmd[1])
+        elif kind == "horizon":
+            self.horizon = cmd[1]
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        except BaseException as e:  # riportato al loop di disegno da latest()
+            self._error = e
+
+    def _loop(self) -> None:
+        last = time.perf_counter()
+        changed = False
+        while not self._stop:
+            # in pausa si aspetta il prossimo comando, altrimenti si svuota la coda
+            try:
+                cmd = self._commands.get(timeout=0.05) if self.paused else self._commands.get_nowait()
+                self._handle(cmd)
+                changed = True
+                if not self._commands.empty():
+                    continue
+            except queue.Empty:
+                pass
+            now = time.perf_counter()
+            if not self.paused:
+                changed |= self._advance(now - last) > 0
+            last = now  # il tempo in pausa non si accumula
+            # doppio buffer: il prossimo snapshot si prepara solo quando il precedente è stato preso
+            if changed and self._front is None:
+                self._publish()
+                changed = False
+            if not self.paused:
+                fixed_dt = 1.0 / max(1, self.cfg.tick_rate_hz)
+                time.sleep(max(0.0, min(0.01, (fixed_dt - self.acc) / self.speed)))
@@ -0,0 +1,57 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from life_sim.backend import get_backend
+from life_sim.config import SimConfig
+from life_sim.population import init_agents, init_store
+from life_sim.scheduler import step
+from life_sim.world import World
+
+
+@pytest.mark.parametrize("resource_mode", ["eager", "lazy"])
+@pytest.mark.parametrize("as_store", [True, False])
+def test_emulated_device_matches_cpu(resource_mode, as_store):
+    cfg = SimConfig(width=48, height=40, initial_agents=250, seed=6, resource_mode=resource_mode)
+    init = init_store if as_store else init_agents
+    host = World.create(cfg)
+    dev = World.create(replace(cfg, compute_backend="emulated"))
+    a_host, a_dev = init(cfg, host), init(cfg, dev)
+    for _ in range(25):
+        a_host, info_host = step(host, a_host)
+        a_dev, info_dev = step(dev, a_dev)
+        assert info_dev["population"] == info_host["population"]
+    assert np.array_equal(dev.food_now(), host.food_now())
+    assert host.backend.transfers.uploads == host.backend.transfers.downloads == 0
+
+
+def test_resident_map_is_transferred_only_at_sync_points(tmp_path):
+    cfg = SimConfig(width=256, height=256, initial_agents=200, seed=2, compute_backend="emulated")
+    world = World.create(cfg)
+    agents = init_store(cfg, world)
+    t = world.backend.transfers
+    assert (t.uploads, t.downloads, t.bytes_up) == (1, 0, world.food.nbytes)
+
+    for _ in range(10):
+        agents, _ = step(world, agents)
+    # per tick solo indici e valori delle celle occupate, mai la mappa intera
+    assert t.bytes_up + t.bytes_down < 10 * world.food.nbytes / 4
+    assert t.bytes_down < 10 * 200 * 16
+
+    down = t.bytes_down
+    world.food_now()
+    assert t.bytes_down - down == world.food.nbytes
+    down = t.bytes_down
+    world.food_preview(64)
+    assert t.bytes_down - down == world.food.nbytes // 16
+    down = t.bytes_down
+    world.save(str(tmp_path / "w"))
+    assert t.bytes_down - down == world.food.nbytes
+    assert np.array_equal(World.load(str(tmp_path / "w")).food, world.food)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend("opencl")
+    assert get_backend("CPU").resident is False
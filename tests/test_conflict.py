@@ -0,0 +1,46 @@
+import copy
+import numpy as np
+import pytest
+
+from life_sim.agent import Agent
+from life_sim.config import SimConfig
+from life_sim.store import AgentStore
+from life_sim.systems.conflict import step_conflict, step_conflict_grid
+from life_sim.world import World
+
+
+def _dense_population(cfg: SimConfig, n: int) -> list[Agent]:
+    rng = np.random.default_rng(cfg.seed)
+    return [
+        Agent(id=i, x=int(rng.integers(cfg.width)), y=int(rng.integers(cfg.height)),
+              energy=float(rng.uniform(0.0, 30.0)),
+              ate_recent_ticks=int(rng.integers(0, 3)),
+              hunger_streak_ticks=int(rng.integers(0, 10)))
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("toroidal", [True, False])
+@pytest.mark.parametrize("as_store", [True, False])
+def test_grid_conflict_matches_neighbour_scan(toroidal, as_store):
+    # p = 0: nessuna morte, si confrontano solo gli agenti valutati (at_risk)
+    cfg = SimConfig(width=12, height=9, toroidal=toroidal, seed=5,
+                    conflict_kill_prob=0.0, conflict_kill_prob_hungry_pair=0.0,
+                    conflict_bonus_if_weak=0.0, conflict_bonus_if_strong=0.0)
+    agents = _dense_population(cfg, 150)
+    wrap = AgentStore.from_agents if as_store else list
+
+    ref, _, attempts_ref, _ = step_conflict(World.create(cfg), wrap(copy.deepcopy(agents)))
+    out, deaths, attempts, _ = step_conflict_grid(World.create(cfg), wrap(copy.deepcopy(agents)))
+    assert deaths == 0 and attempts == attempts_ref > 0
+    assert [a.at_risk_conflict for a in ref] == [a.at_risk_conflict for a in out]
+
+    # p = 1 sull'affamato vicino a chi mangia: muoiono gli stessi agenti
+    cfg = SimConfig(width=12, height=9, toroidal=toroidal, seed=5,
+                    conflict_kill_prob=1.0, conflict_kill_prob_hungry_pair=0.0,
+                    conflict_bonus_if_weak=0.0, conflict_bonus_if_strong=0.0)
+    ref, d_ref, _, pos_ref = step_conflict(World.create(cfg), wrap(copy.deepcopy(agents)))
+    out, d_grid, _, pos_grid = step_conflict_grid(World.create(cfg), wrap(copy.deepcopy(agents)))
+    assert d_ref == d_grid > 0
+    assert pos_ref == pos_grid
+    assert [a.id for a in ref] == [a.id for a in out]
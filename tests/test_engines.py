@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from life_sim.agent import Agent
+from life_sim.config import SimConfig
+from life_sim.scheduler import step
+from life_sim.store import AgentStore
+from life_sim.world import World
+
+
+def _init(cfg: SimConfig, world: World) -> AgentStore:
+    rng = world.rng.py
+    return AgentStore.from_agents(
+        Agent(id=i, x=rng.randrange(cfg.width), y=rng.randrange(cfg.height),
+              sex="M" if rng.random() < 0.5 else "F",
+              age_years=max(0.0, rng.gauss(25.0, 8.0)),
+              infected=rng.random() < cfg.initial_infected_pct)
+        for i in range(cfg.initial_agents)
+    )
+
+
+def _run_totals(engine: str, seed: int, ticks: int = 200) -> dict[str, int]:
+    cfg = SimConfig(width=48, height=48, initial_agents=600, seed=seed, engine=engine,
+                    initial_food_mean=0.4, resource_regen_rate=0.01)
+    world = World.create(cfg)
+    store = _init(cfg, world)
+    tot = {"pop": 0, "births": 0, "conflict": 0, "conflicts": 0}
+    for _ in range(ticks):
+        store, info = step(world, store)
+        tot["pop"] += len(store)
+        tot["births"] += info["births"]
+        tot["conflict"] += info["deaths"]["conflict"]
+        tot["conflicts"] += info["conflicts"]
+    return tot
+
+
+def test_numba_engine_matches_python_statistics():
+    pytest.importorskip("numba")
+    seeds = range(8)
+    ref = [_run_totals("python", s) for s in seeds]
+    fast = [_run_totals("numba", s) for s in seeds]
+    for key in ref[0]:
+        a = np.mean([r[key] for r in ref])
+        b = np.mean([r[key] for r in fast])
+        assert abs(a - b) <= 0.10 * a, (key, a, b)
+
+
+def test_numba_engine_rejects_agent_list():
+    cfg = SimConfig(width=8, height=8, initial_agents=0, engine="numba")
+    with pytest.raises(ValueError):
+        step(World.create(cfg), [])
@@ -0,0 +1,51 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from life_sim.config import SimConfig
+from life_sim.population import init_store
+from life_sim.scheduler import step
+from life_sim.world import World
+from life_ui.food_layer import FoodLayer, _PACKED_LUT
+from life_ui.renderer import food_levels
+
+
+def test_incremental_layer_matches_full_redraw():
+    for mode in ("eager", "lazy"):
+        cfg = SimConfig(width=200, height=150, initial_agents=8, seed=3, resource_mode=mode,
+                        initial_food_mean=0.3, resource_regen_rate=0.05)
+        world = World.create(cfg)
+        agents = init_store(cfg, world)
+        layer = FoodLayer.for_world(world, tile=32)
+        layer.scaled((100, 75))
+        refreshed = []
+        for tick in range(1, 121):
+            agents, _ = step(world, agents)
+            if tick % 5 == 0:
+                layer.update()
+                refreshed.append(layer.refreshed)
+                full = _PACKED_LUT[food_levels(world.food_now())]
+                assert np.array_equal(layer.pixels, full), (mode, tick)
+        # a cibo saturo (colore fisso) si ridisegnano solo le tile dove si è mangiato
+        assert max(refreshed[-5:]) < layer.next_change.size // 2, (mode, refreshed)
+        assert layer.scaled((100, 75)).get_size() == (100, 75)
+
+
+def test_layer_without_regeneration_redraws_only_foraged_tiles():
+    cfg = SimConfig(width=128, height=128, initial_agents=0, resource_regen_rate=0.0,
+                    initial_food_flat=True, initial_food_mean=0.5)
+    world = World.create(cfg)
+    layer = FoodLayer.for_world(world, tile=32)
+    surface = pygame.Surface((64, 64))
+    surface.blit(layer.scaled((64, 64)), (0, 0))
+
+    world.food[40, 70] = 0.0
+    world.food_dirty.mark(np.array([70]), np.array([40]))
+    layer.update()
+    assert layer.refreshed == 1
+    assert layer.pixels[40, 70] == _PACKED_LUT[0]
+    layer.update()
+    assert layer.refreshed == 0
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from life_sim.config import SimConfig
+from life_sim.grid import SpatialHash, spatial_index
+from life_sim.scheduler import step
+from life_sim.store import AgentStore
+from life_sim.world import World
+
+
+def _chains(index: SpatialHash) -> dict[int, set[int]]:
+    out: dict[int, set[int]] = {}
+    for b in np.flatnonzero(index.head >= 0).tolist():
+        rows, j = set(), index.head[b]
+        while j >= 0:
+            assert index.bucket[j] == b
+            rows.add(int(j))
+            j = index.next[j]
+        out[b] = rows
+    return out
+
+
+def test_incremental_ops_match_rebuild():
+    rng = np.random.default_rng(0)
+    index = SpatialHash(cell=3, width=20, height=10)
+    xs, ys = rng.integers(0, 20, 200), rng.integers(0, 10, 200)
+    index.rebuild(xs, ys)
+
+    xs = (xs + rng.integers(-1, 2, 200)) % 20
+    index.update(xs, ys)
+    keep = rng.random(200) > 0.05
+    index.remove(keep)
+    xs, ys = xs[keep], ys[keep]
+    index.append(np.array([0, 19]), np.array([0, 9]))
+    xs, ys = np.r_[xs, 0, 19], np.r_[ys, 0, 9]
+
+    fresh = SpatialHash(cell=3, width=20, height=10)
+    fresh.rebuild(xs, ys)
+    assert index.n == fresh.n == len(xs)
+    assert _chains(index) == _chains(fresh)
+
+
+@pytest.mark.parametrize("engine", ["python", "numba"])
+def test_world_index_tracks_population(engine):
+    cfg = SimConfig(width=40, height=30, initial_agents=500, seed=1, engine=engine,
+                    initial_food_mean=0.5, resource_regen_rate=0.02)
+    world = World.create(cfg)
+    rng = np.random.default_rng(1)
+    store = AgentStore()
+    store.extend({"x": rng.integers(0, 40, 500), "y": rng.integers(0, 30, 500),
+                  "sex": rng.integers(0, 2, 500), "age_years": rng.uniform(0, 60, 500),
+                  "energy": rng.uniform(5, 25, 500)})
+    for _ in range(60):
+        store, _info = step(world, store)
+
+    index = world.index
+    assert index is not None and index.n == len(store)
+    assert np.array_equal(index.xs[:index.n], store.x)
+    fresh = SpatialHash(cell=cfg.spatial_bucket, width=cfg.width, height=cfg.height)
+    fresh.rebuild(store.x, store.y)
+    assert _chains(index) == _chains(fresh)
+
+
+def test_index_is_rebuilt_for_a_replaced_population_of_the_same_size():
+    cfg = SimConfig(width=20, height=20, initial_agents=0)
+    world = World.create(cfg)
+    a, b = AgentStore(), AgentStore()
+    a.extend({"x": np.arange(10), "y": np.zeros(10, dtype=np.int64)})
+    b.extend({"x": np.zeros(10, dtype=np.int64), "y": np.arange(10)})
+    first = spatial_index(world, a)
+    assert spatial_index(world, a) is first
+    world.replace_population()
+    index = spatial_index(world, b)
+    assert np.array_equal(index.xs[:10], b.x) and np.array_equal(index.ys[:10], b.y)
+    fresh = SpatialHash(cell=cfg.spatial_bucket, width=20, height=20)
+    fresh.rebuild(b.x, b.y)
+    assert _chains(index) == _chains(fresh)
+
+
+def test_bulk_relink_keeps_chains_consistent():
+    rng = np.random.default_rng(3)
+    index = SpatialHash(cell=2, width=12, height=12)
+    xs, ys = rng.integers(0, 12, 300), rng.integers(0, 12, 300)
+    index.rebuild(xs, ys)
+    for step_len in (1, 1, 3, 12):
+        # da pochi a quasi tutti i bucket cambiati, con righe vicine nella stessa catena
+        xs = (xs + rng.integers(-step_len, step_len + 1, len(xs))) % 12
+        ys = (ys + rng.integers(-step_len, step_len + 1, len(ys))) % 12
+        index.update(xs, ys)
+        keep = rng.random(len(xs)) > 0.4
+        index.remove(keep)
+        xs, ys = xs[keep], ys[keep]
+        for b in np.flatnonzero(index.head >= 0).tolist():
+            p, j = -1, index.head[b]
+            while j >= 0:
+                assert index.prev[j] == p
+                p, j = j, index.next[j]
+        fresh = SpatialHash(cell=2, width=12, height=12)
+        fresh.rebuild(xs, ys)
+        assert _chains(index) == _chains(fresh)
+
+
+def test_reproduction_pairs_do_not_depend_on_chain_order():
+    import copy
+    from life_sim.agent import Agent
+    from life_sim.grid import positions
+    from life_sim.systems.reproduction import step_reproduction
+
+    cfg = SimConfig(width=8, height=8, initial_agents=0, seed=4,
+                    reproduction_prob_per_meeting=0.5)
+    agents = [Agent(id=i, x=i % 2, y=0, sex="M" if i % 3 else "F", age_years=30.0,
+                    energy=30.0, max_age=60.0 + i) for i in range(24)]
+    results = []
+    for incremental in (False, True):
+        world = World.create(cfg)
+        if incremental:
+            # righe aggiunte una a una: catene in ordine inverso rispetto a rebuild
+            world.index = SpatialHash(cell=cfg.spatial_bucket, width=8, height=8)
+            for x, y in zip(*positions(agents)):
+                world.index.append(x[None], y[None])
+        out, born = step_reproduction(world, copy.deepcopy(agents))
+        results.append((born, [(a.id, a.sex, a.energy, a.max_age) for a in out]))
+    assert results[0][0] > 0 and results[0] == results[1]
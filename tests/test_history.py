@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from life_ui.history import History, downsample
+
+
+def test_horizons_match_direct_aggregation():
+    t = np.arange(1000, dtype=np.float64)
+    hist = History(["t", "neg"], capacity=8, coarse=10)
+    for v in t:
+        hist.record((v, -v))
+
+    # ultimi 8 tick
+    assert np.array_equal(hist.window(0)["t"], t[-8:])
+    assert np.array_equal(hist.window(0)["neg"], -t[-8:])
+    # ultimi 8 blocchi da 10 tick (1000 è multiplo di 10: nessun blocco in corso)
+    assert np.array_equal(hist.window(1)["t"], t.reshape(-1, 10).mean(axis=1)[-8:])
+    # intera run: blocchi raddoppiati finché la run sta in 8 righe, più il blocco in corso
+    whole = hist.window(2)["t"]
+    bucket = hist.levels[2].bucket
+    done = len(t) // bucket * bucket
+    expect = t[:done].reshape(-1, bucket).mean(axis=1)
+    if done < len(t):
+        expect = np.append(expect, t[done:].mean())
+    assert bucket == 128 and np.array_equal(whole, expect)
+
+    with pytest.raises(ValueError):
+        hist.window(0)["t"][0] = 1.0
+
+
+def test_downsample_keeps_constant_width():
+    data = np.arange(60000, dtype=np.float64)
+    small = downsample(data, 150)
+    assert len(small) == 150
+    assert small.mean() == pytest.approx(data.mean())
+    assert small[0] == pytest.approx(data[:400].mean())
+    assert np.array_equal(downsample(data[:100], 150), data[:100])
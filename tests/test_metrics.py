@@ -0,0 +1,37 @@
+import numpy as np
+
+from life_sim.config import SimConfig
+from life_sim.metrics import METRIC_FIELDS, MetricsLog, read_metrics
+from life_sim.run import main, run
+
+
+def test_metrics_log_blocks_and_live_read(tmp_path):
+    cfg = SimConfig(width=32, height=32, initial_agents=80, seed=2)
+    path = str(tmp_path / "m")
+    log = MetricsLog(path, block=8)
+    pops = []
+
+    def on_tick(tick, agents, info):
+        log.record(tick, info)
+        pops.append(len(agents))
+
+    run(cfg, ticks=20, on_tick=on_tick)
+    # due blocchi pieni già su disco, le ultime 4 righe ancora in memoria
+    assert len(read_metrics(path)["tick"]) == 16
+    log.close()
+    cols = read_metrics(path)
+    assert set(cols) == set(METRIC_FIELDS)
+    assert np.array_equal(cols["tick"], np.arange(1, 21))
+    assert cols["population"].tolist() == pops
+
+
+def test_resume_truncates_log_to_snapshot(tmp_path):
+    conf = tmp_path / "c.toml"
+    conf.write_text('seed = 4\nwidth = 32\nheight = 32\ninitial_agents = 60\n')
+    snap, metrics = str(tmp_path / "ck"), str(tmp_path / "m")
+    assert main([str(conf), "--ticks", "12", "--metrics", metrics,
+                 "--checkpoint", snap, "--checkpoint-every", "5"]) == 0
+    # il checkpoint periodico più recente è al tick 10: lo ripristiniamo a mano
+    main([str(conf), "--ticks", "10", "--checkpoint", snap])
+    assert main(["--resume", snap, "--ticks", "6", "--metrics", metrics]) == 0
+    assert read_metrics(metrics)["tick"].tolist() == list(range(1, 17))
@@ -0,0 +1,65 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from life_ui.panels import (PANEL_BG, PANEL_BORDER, TEXT_COLOR, TITLE_COLOR, StaticPanel,
+                            StatsPanel, _sparkline, font)
+
+pygame.font.init()
+
+
+def _draw_stats_reference(surface, rect, title, stats):
+    # disegno immediato di tutto il pannello a ogni frame, come riferimento
+    x, y, w, h = rect
+    pygame.draw.rect(surface, PANEL_BG, rect)
+    pygame.draw.rect(surface, PANEL_BORDER, rect, 1)
+    surface.blit(font(None, 20, True).render(title, True, TITLE_COLOR), (x+10, y+10))
+    yy, row_h, chart_w = y + 44, 36, int(w * 0.42)
+    text_w = w - 20 - chart_w - 10
+    for label, (val, hist) in stats.items():
+        val_text = f"{val:.2f}" if isinstance(val, float) else f"{val}"
+        surface.blit(font(None, 18).render(label, True, TEXT_COLOR), (x+10, yy))
+        surface.blit(font(None, 18, True).render(val_text, True, TEXT_COLOR), (x+10, yy + 18))
+        if hist is not None:
+            _sparkline(surface, (x + 20 + text_w, yy + 3, chart_w, row_h - 6), hist)
+        yy += row_h
+
+
+def _pixels(surface):
+    return pygame.surfarray.array3d(surface)
+
+
+def test_stats_panel_redraws_only_changed_rows():
+    panel = StatsPanel("Statistiche")
+    rect = (5, 0, 300, 260)
+    hist_a, hist_b = [1, 3, 2], [0.5, 0.25]
+    frames = [
+        {"Tick": (1, None), "Popolazione": (3, hist_a), "Energia media": (0.25, hist_b)},
+        {"Tick": (2, None), "Popolazione": (3, hist_a), "Energia media": (0.25, hist_b)},
+        {"Tick": (3, None), "Popolazione": (123456, hist_a + [9]), "Energia media": (0.25, hist_b)},
+    ]
+    redrawn = []
+    for stats in frames:
+        got = pygame.Surface((320, 260))
+        ref = pygame.Surface((320, 260))
+        panel.draw(got, rect, stats)
+        _draw_stats_reference(ref, rect, "Statistiche", stats)
+        assert np.array_equal(_pixels(got), _pixels(ref))
+        redrawn.append(panel.redrawn)
+    # primo frame: 3 valori + 2 sparkline; poi solo il tick, poi tick + popolazione
+    assert redrawn == [5, 1, 3]
+
+
+def test_static_panel_composes_once():
+    panel = StaticPanel("Legenda")
+    lines = ["Colori:", "---", "Cibo"]
+    screen = pygame.Surface((200, 120))
+    panel.draw(screen, (0, 0, 200, 120), lines)
+    composed = panel._surface
+    panel.draw(screen, (0, 0, 200, 120), list(lines))
+    assert panel._surface is composed
+    panel.draw(screen, (0, 0, 200, 120), lines + ["Controlli:"])
+    assert panel._surface is not composed
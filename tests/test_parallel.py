@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from life_sim.config import SimConfig
+from life_sim.parallel import ParallelSim, strip_bounds
+from life_sim.run import main
+from life_sim.stats import merge_stats, population_stats
+from life_sim.store import AgentStore
+from life_sim.systems.conflict import conflict_halo, step_conflict_grid, step_conflict_strip
+from life_sim.world import World
+
+
+def _population(cfg: SimConfig, n: int) -> AgentStore:
+    rng = np.random.default_rng(cfg.seed)
+    store = AgentStore(capacity=n)
+    store.extend({
+        "x": rng.integers(0, cfg.width, n),
+        "y": rng.integers(0, cfg.height, n),
+        "sex": rng.integers(0, 2, n),
+        "age_years": rng.uniform(0.0, 75.0, n),
+        "energy": rng.uniform(0.0, 30.0, n),
+        "infected": rng.random(n) < 0.1,
+        "ate_recent_ticks": rng.integers(0, 3, n),
+        "hunger_streak_ticks": rng.integers(0, 10, n),
+    })
+    return store
+
+
+def test_merge_stats_matches_whole_population():
+    cfg = SimConfig(width=30, height=20, seed=2)
+    store = _population(cfg, 500)
+    parts = []
+    for y0, y1 in strip_bounds(cfg.height, 3):
+        part = store.copy()
+        part.keep((part.y >= y0) & (part.y < y1))
+        parts.append(population_stats(cfg, part))
+    merged, whole = merge_stats(parts), population_stats(cfg, store)
+    for name, value in vars(whole).items():
+        assert getattr(merged, name) == pytest.approx(value), name
+
+
+@pytest.mark.parametrize("toroidal", [True, False])
+def test_strip_conflict_with_halo_matches_whole_grid(toroidal):
+    # p = 0: nessuna morte, si confrontano gli agenti valutati (at_risk) anche sui confini
+    cfg = SimConfig(width=16, height=12, toroidal=toroidal, seed=7,
+                    conflict_kill_prob=0.0, conflict_kill_prob_hungry_pair=0.0,
+                    conflict_bonus_if_weak=0.0, conflict_bonus_if_strong=0.0)
+    store = _population(cfg, 400)
+    ref, _, attempts_ref, _ = step_conflict_grid(World.create(cfg), store.copy())
+
+    bounds = strip_bounds(cfg.height, 3)
+    attempts = 0
+    for rank, (y0, y1) in enumerate(bounds):
+        part = store.copy()
+        part.keep((part.y >= y0) & (part.y < y1))
+        up = (rank - 1) % 3 if (toroidal or rank > 0) else None
+        down = (rank + 1) % 3 if (toroidal or rank < 2) else None
+        # alone: riga di bordo del vicino, vista dall'intera popolazione
+        halo_up = conflict_halo(cfg, store, bounds[up][1] - 1) if up is not None else None
+        halo_down = conflict_halo(cfg, store, bounds[down][0]) if down is not None else None
+        out, _, k, _ = step_conflict_strip(World.create(cfg), part, y0, y1, halo_up, halo_down)
+        attempts += k
+        expected = ref.at_risk_conflict[(ref.y >= y0) & (ref.y < y1)]
+        assert (out.at_risk_conflict == expected).all()
+    assert attempts == attempts_ref > 0
+
+
+@pytest.mark.parametrize("toroidal", [True, False])
+def test_parallel_run_conserves_population(toroidal):
+    cfg = SimConfig(width=60, height=40, initial_agents=800, seed=4, toroidal=toroidal)
+    with ParallelSim(cfg, workers=3) as sim:
+        n = len(sim.gather())
+        food0 = sim.world.food.copy()
+        for _ in range(15):
+            info = sim.step()
+            pop = info["population"]
+            assert pop.n == n + info["births"] - sum(info["deaths"].values())
+            n = pop.n
+        agents = sim.gather()
+        assert not np.array_equal(food0, sim.world.food)  # i worker scrivono nella mappa condivisa
+    assert len(agents) == n > 0
+    assert len(np.unique(agents.id)) == n
+    assert ((agents.y >= 0) & (agents.y < cfg.height)).all()
+    assert sim.world.food.shape == (cfg.height, cfg.width)  # copia privata dopo close()
+
+
+def test_run_cli_with_workers(tmp_path, capsys):
+    cfg = tmp_path / "cfg.toml"
+    cfg.write_text("width = 40\nheight = 30\ninitial_agents = 300\nseed = 1\n")
+    assert main([str(cfg), "--ticks", "5", "--workers", "2"]) == 0
+    assert "Tick eseguiti: 5" in capsys.readouterr().out
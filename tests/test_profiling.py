@@ -0,0 +1,31 @@
+import csv
+import tracemalloc
+
+from life_sim.config import SimConfig
+from life_sim.population import init_store
+from life_sim.profiling import SYSTEMS, StepProfiler
+from life_sim.scheduler import step
+from life_sim.world import World
+
+
+def test_profiler_ring_buffer_and_dump(tmp_path):
+    cfg = SimConfig(width=32, height=32, initial_agents=80, seed=1)
+    world = World.create(cfg)
+    agents = init_store(cfg, world)
+    _, info = step(world, agents)
+    assert "timings" not in info
+
+    world.profiler = StepProfiler(capacity=4, track_alloc=True)
+    for _ in range(6):
+        agents, info = step(world, agents)
+    assert set(info["timings"]) == set(SYSTEMS)
+    assert info["timings"]["movement"]["agents"] == len(agents) + sum(info["deaths"].values()) - info["births"]
+    assert info["timings"]["resources"]["alloc_kb"] > 0
+
+    path = tmp_path / "prof.csv"
+    world.profiler.dump(str(path))
+    world.profiler.close()
+    assert not tracemalloc.is_tracing()
+    rows = list(csv.DictReader(path.open()))
+    # solo gli ultimi 4 tick restano nel buffer circolare, in ordine
+    assert [int(r["tick"]) for r in rows[::len(SYSTEMS)]] == [3, 4, 5, 6]
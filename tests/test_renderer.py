@@ -0,0 +1,73 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from life_sim.agent import Agent
+from life_sim.config import SimConfig
+from life_sim.store import AgentStore
+from life_ui.renderer import age_tint, draw_agents
+
+
+def _draw_agents_reference(screen, agents, cfg, mx, my, mw, mh):
+    # disegno per agente (una chiamata pygame.draw.rect ciascuno), come riferimento
+    sx, sy = mw / cfg.width, mh / cfg.height
+    base_size = max(2, int(min(sx, sy)))
+    risk_size = max(4, base_size + 1)
+    for a in agents:
+        col = age_tint((0, 255, 255) if a.sex == "M" else (255, 0, 255), a.age_years, a.max_age)
+        size = risk_size if a.at_risk_conflict else base_size
+        rect = pygame.Rect(mx + int(a.x * sx), my + int(a.y * sy), size, size)
+        pygame.draw.rect(screen, col, rect)
+        if a.at_risk_conflict:
+            pygame.draw.rect(screen, (0, 0, 0), rect.inflate(2, 2), 2)
+            pygame.draw.rect(screen, (255, 120, 0), rect, 1)
+
+
+def test_buffer_rendering_matches_per_agent_rects():
+    cfg = SimConfig(width=40, height=30)
+    # agenti distanziati (nessuna sovrapposizione), anche sui bordi della mappa
+    agents = [Agent(id=i, x=(7 * i) % 40, y=(5 * i) % 30, sex="M" if i % 3 else "F",
+                    age_years=float(3 * i), max_age=0.0 if i == 4 else 80.0,
+                    at_risk_conflict=i % 4 == 2)
+              for i in range(0, 40, 2)]
+    mx, my, mw, mh = 10, 6, 200, 150
+    got = pygame.Surface((240, 170))
+    ref = pygame.Surface((240, 170))
+    for surface in (got, ref):
+        surface.fill((40, 90, 40))
+
+    draw_agents(got, AgentStore.from_agents(agents), cfg, mx, my, mw, mh)
+    _draw_agents_reference(ref, agents, cfg, mx, my, mw, mh)
+
+    # il buffer taglia ai bordi della mappa, i rettangoli no: si confronta l'area della mappa
+    area = (slice(mx, mx + mw), slice(my, my + mh))
+    assert np.array_equal(pygame.surfarray.array3d(got)[area], pygame.surfarray.array3d(ref)[area])
+    # fuori dalla mappa non si scrive nulla
+    assert (pygame.surfarray.array3d(got)[:mx] == (40, 90, 40)).all()
+
+
+def test_at_risk_outlines_stay_on_top_in_shared_cells():
+    cfg = SimConfig(width=40, height=30)
+    # in ogni cella l'agente a rischio viene prima nella lista, quelli tranquilli dopo
+    agents = []
+    for i, (x, y) in enumerate([(3, 4), (20, 10), (39, 29)]):
+        agents.append(Agent(id=3 * i, x=x, y=y, sex="F", age_years=30.0, max_age=80.0,
+                            at_risk_conflict=True))
+        agents += [Agent(id=3 * i + k, x=x, y=y, sex="M", age_years=10.0 * k, max_age=80.0)
+                   for k in (1, 2)]
+    mx, my, mw, mh = 0, 0, 200, 150
+    got = pygame.Surface((mw, mh))
+    ref = pygame.Surface((mw, mh))
+    for surface in (got, ref):
+        surface.fill((40, 90, 40))
+
+    draw_agents(got, AgentStore.from_agents(agents), cfg, mx, my, mw, mh)
+    # voluto: gli agenti a rischio si disegnano dopo tutti gli altri, non in ordine di lista
+    _draw_agents_reference(ref, sorted(agents, key=lambda a: a.at_risk_conflict), cfg, mx, my, mw, mh)
+    assert np.array_equal(pygame.surfarray.array3d(got), pygame.surfarray.array3d(ref))
+    for a in agents[::3]:
+        # l'angolo del quadrato è il bordo arancio, non il colore dell'agente dopo in lista
+        assert tuple(pygame.surfarray.array3d(got)[a.x * 5, a.y * 5]) == (255, 120, 0)
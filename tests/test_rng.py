@@ -0,0 +1,82 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from life_sim.config import SimConfig
+from life_sim.parallel import ParallelSim
+from life_sim.population import init_agents, init_store
+from life_sim.rng import CounterStream, philox4x32, philox4x32_scalar
+from life_sim.scheduler import step
+from life_sim.store import AgentStore
+from life_sim.world import World
+
+# vettori di riferimento di Random123 (kat_vectors, philox4x32 10 round)
+KAT = [
+    ((0, 0, 0, 0), (0, 0), (0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8)),
+    ((0xFFFFFFFF,) * 4, (0xFFFFFFFF,) * 2, (0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD)),
+    ((0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344), (0xA4093822, 0x299F31D0),
+     (0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1)),
+]
+
+
+@pytest.mark.parametrize("ctr, key, expected", KAT)
+def test_philox_known_answers(ctr, key, expected):
+    assert philox4x32_scalar(*ctr, *key) == expected
+    words = philox4x32(*(np.array([c], dtype=np.uint64) for c in ctr), *key)
+    assert tuple(int(w[0]) for w in words) == expected
+
+
+def test_scalar_and_batched_draws_agree():
+    stream = CounterStream(seed=9, tick=123, system="movement")
+    ids = np.array([0, 1, 7, 2**33 + 5, 2**62])
+    for draw in range(4):
+        batch = stream.uniform(ids, draw)
+        assert ((batch >= 0.0) & (batch < 1.0)).all()
+        assert batch.tolist() == [stream.uniform1(int(i), draw) for i in ids]
+    assert stream.bits(ids, 4).tolist() == [stream.bits1(int(i), 4) for i in ids]
+    # flussi diversi per tick e per sistema
+    assert not np.array_equal(batch, CounterStream(9, 124, "movement").uniform(ids, 3))
+    assert not np.array_equal(batch, CounterStream(9, 123, "disease").uniform(ids, 3))
+    u = stream.uniform(np.arange(200_000))
+    assert abs(u.mean() - 0.5) < 0.005
+
+
+def _canonical(agents) -> dict[str, np.ndarray]:
+    store = agents if isinstance(agents, AgentStore) else AgentStore.from_agents(agents)
+    order = np.argsort(store.id)
+    return {k: v[order] for k, v in store.columns().items() if k != "at_risk_conflict"}
+
+
+def _run(cfg: SimConfig, as_list: bool = False, ticks: int = 30):
+    world = World.create(cfg)
+    agents = init_agents(cfg, world) if as_list else init_store(cfg, world)
+    for _ in range(ticks):
+        agents, _ = step(world, agents)
+    return _canonical(agents), world.food
+
+
+def test_counter_streams_make_paths_and_partitions_identical():
+    cfg = SimConfig(width=40, height=30, initial_agents=500, seed=5, rng_mode="counter",
+                    initial_food_mean=0.6, conflict_mode="grid")
+    ref, ref_food = _run(cfg)
+    variants = [(cfg, True), (replace(cfg, conflict_mode="agents"), False),
+                (replace(cfg, conflict_mode="agents"), True)]
+    try:
+        import numba  # noqa: F401
+        variants.append((replace(cfg, engine="numba"), False))
+    except ImportError:
+        pass
+    for c, as_list in variants:
+        out, food = _run(c, as_list)
+        assert np.array_equal(food, ref_food)
+        for name in ref:
+            assert np.array_equal(out[name], ref[name]), (c.engine, c.conflict_mode, as_list, name)
+
+    with ParallelSim(cfg, workers=3) as sim:
+        for _ in range(30):
+            sim.step()
+        out = _canonical(sim.gather())
+        assert np.array_equal(sim.world.food, ref_food)
+    for name in ref:
+        assert np.array_equal(out[name], ref[name]), name
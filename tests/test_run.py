@@ -0,0 +1,55 @@
+import pytest
+
+from life_sim.config import config_from_mapping, load_config
+from life_sim.run import main, run
+
+
+def test_config_from_mapping_validates_keys_and_types():
+    cfg = config_from_mapping({"width": 64, "resource_regen_rate": 0, "toroidal": False})
+    assert cfg.width == 64 and cfg.resource_regen_rate == 0.0 and cfg.toroidal is False
+    with pytest.raises(ValueError):
+        config_from_mapping({"no_such_field": 1})
+    with pytest.raises(ValueError):
+        config_from_mapping({"width": "64"})
+
+
+def test_headless_run_from_toml(tmp_path, capsys):
+    path = tmp_path / "small.toml"
+    path.write_text('seed = 3\nwidth = 32\nheight = 32\ninitial_agents = 50\n\n[run]\nticks = 20\n')
+    cfg, opts = load_config(str(path))
+    assert cfg.seed == 3 and opts == {"ticks": 20}
+
+    res = run(cfg, ticks=20)
+    assert res.ticks == 20 and res.population > 0
+
+    assert main([str(path)]) == 0
+    assert "Tick eseguiti: 20" in capsys.readouterr().out
+
+
+def test_workers_from_toml_reject_checkpoint_resume_and_profile(tmp_path):
+    path = tmp_path / "par.toml"
+    path.write_text('width = 32\nheight = 32\ninitial_agents = 10\n\n'
+                    f'[run]\nticks = 2\nworkers = 2\ncheckpoint = "{tmp_path / "ck"}"\n')
+    with pytest.raises(SystemExit) as exc:
+        main([str(path)])
+    assert exc.value.code == 2
+    assert not (tmp_path / "ck").exists()
+
+    # checkpoint da un run seriale, poi ripresa con workers dalla tabella [run]
+    serial = tmp_path / "serial.toml"
+    serial.write_text('width = 32\nheight = 32\ninitial_agents = 10\n')
+    assert main([str(serial), "--ticks", "2", "--checkpoint", str(tmp_path / "ck1")]) == 0
+    path.write_text('width = 32\nheight = 32\ninitial_agents = 10\n\n[run]\nticks = 2\nworkers = 2\n')
+    with pytest.raises(SystemExit) as exc:
+        main([str(path), "--resume", str(tmp_path / "ck1")])
+    assert exc.value.code == 2
+
+
+def test_resume_rejects_seed_and_engine_overrides(tmp_path):
+    path = tmp_path / "small.toml"
+    path.write_text('width = 32\nheight = 32\ninitial_agents = 10\n')
+    assert main([str(path), "--ticks", "2", "--checkpoint", str(tmp_path / "ck")]) == 0
+    for extra in (["--seed", "5"], ["--engine", "numba"]):
+        with pytest.raises(SystemExit) as exc:
+            main(["--resume", str(tmp_path / "ck"), *extra])
+        assert exc.value.code == 2
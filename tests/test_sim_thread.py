@@ -0,0 +1,81 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import time
+
+import numpy as np
+import pytest
+
+from life_sim.config import SimConfig
+from life_sim.population import init_store
+from life_sim.scheduler import step
+from life_sim.world import World
+from life_ui.food_layer import FoodLayer, _PACKED_LUT
+from life_ui.renderer import food_levels
+from life_ui.sim_thread import SimThread
+
+
+def _wait(sim, until, timeout=20.0):
+    """Consuma gli snapshot (come il loop di disegno) finché `until(snap)` è vero."""
+    deadline = time.perf_counter() + timeout
+    seen = []
+    while time.perf_counter() < deadline:
+        snap = sim.latest()
+        if snap is not None:
+            seen.append(snap)
+            if until(snap):
+                return seen
+        time.sleep(0.002)
+    raise AssertionError("nessuno snapshot atteso entro il timeout")
+
+
+def _drain(sim, seconds):
+    """Ultimo snapshot pubblicato in `seconds` secondi (None se nessuno)."""
+    last = None
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        last = sim.latest() or last
+        time.sleep(0.002)
+    return last
+
+
+def test_thread_snapshots_follow_the_trajectory():
+    cfg = SimConfig(width=96, height=64, initial_agents=150, seed=11, tick_rate_hz=240,
+                    resource_regen_rate=0.02)
+    sim = SimThread(cfg)
+    try:
+        sim.set_speed(8.0)
+        seen = _wait(sim, lambda s: s.tick >= 30)
+        layer = FoodLayer(seen[0].food)
+        for snap in seen[1:]:
+            layer.update(snap.food)
+            assert np.array_equal(layer.pixels, _PACKED_LUT[food_levels(snap.food.food)])
+        snap = seen[-1]
+
+        # copie immutabili
+        with pytest.raises(ValueError):
+            snap.agents.energy[0] = 0.0
+        with pytest.raises(ValueError):
+            snap.food.food[0, 0] = 0.0
+
+        # lo snapshot al tick T coincide con T tick eseguiti direttamente
+        world = World.create(cfg)
+        agents = init_store(cfg, world)
+        for _ in range(snap.tick):
+            agents, _ = step(world, agents)
+        assert np.array_equal(agents.id, snap.agents.id)
+        assert np.array_equal(agents.energy, snap.agents.energy)
+        assert np.array_equal(world.food, snap.food.food)
+        assert snap.stats["Tick"][0] == snap.tick
+
+        # pausa: niente tick; "applica" con reset: nuova generazione da capo
+        sim.pause(True)
+        _drain(sim, 0.3)
+        time.sleep(0.1)
+        assert sim.latest() is None
+        sim.apply(SimConfig(width=64, height=64, initial_agents=20, seed=2), True)
+        fresh = _wait(sim, lambda s: s.generation == 1)[-1]
+        assert fresh.tick == 0 and len(fresh.agents) == 20
+    finally:
+        sim.close()
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from life_sim.config import SimConfig
+from life_sim.population import init_agents
+from life_sim.scheduler import step
+from life_sim.stats import merge_stats, population_stats
+from life_sim.store import AgentStore
+from life_sim.world import World
+
+
+def test_population_stats_list_and_store_agree():
+    cfg = SimConfig(width=40, height=40, initial_agents=300, seed=9, conflict_hunger_ticks=1)
+    world = World.create(cfg)
+    agents = init_agents(cfg, world)
+    for _ in range(5):
+        agents, info = step(world, agents)
+
+    ref = population_stats(cfg, agents)
+    assert info["population"] == ref and info["infected"] == ref.infected
+    assert ref.n == len(agents) == ref.males + ref.females == ref.children + ref.adults + ref.elders
+    assert ref.males == sum(a.sex == "M" for a in agents)
+    assert ref.hungry == sum(a.hunger_streak_ticks >= 1 for a in agents)
+
+    col = population_stats(cfg, AgentStore.from_agents(agents))
+    for name in ("n", "males", "children", "elders", "infected", "hungry", "at_risk"):
+        assert getattr(col, name) == getattr(ref, name)
+    for name in ("energy_mean", "energy_var", "age_mean", "age_var"):
+        assert getattr(col, name) == pytest.approx(getattr(ref, name))
+
+
+def test_variance_is_exact_for_large_means_and_merges():
+    cfg = SimConfig()
+    rng = np.random.default_rng(0)
+    age = 1e6 + rng.random(1000) * 1e-3  # varianza minuscola rispetto alla media²
+    store = AgentStore()
+    store.extend({"x": np.zeros(1000, dtype=np.int64), "y": np.zeros(1000, dtype=np.int64),
+                  "age_years": age, "energy": age})
+    whole = population_stats(cfg, store)
+    assert whole.age_var == pytest.approx(np.var(age), rel=1e-6)
+
+    # percorso a lista sulle parti, unione con merge_stats
+    agents = store.to_agents()
+    parts = [population_stats(cfg, agents[s])
+             for s in (slice(0, 100), slice(100, 700), slice(700, 1000))]
+    merged = merge_stats(parts)
+    assert merged.age_mean == pytest.approx(whole.age_mean)
+    assert merged.energy_var == pytest.approx(np.var(age), rel=1e-6)
+    assert parts[0].age_var == pytest.approx(np.var(age[:100]), rel=1e-6)
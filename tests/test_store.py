@@ -0,0 +1,135 @@
+import copy
+import numpy as np
+
+from life_sim.agent import Agent
+from life_sim.config import SimConfig
+from life_sim.store import AgentStore, COLUMNS
+from life_sim.systems.aging import step_aging
+from life_sim.systems.conflict import step_conflict
+from life_sim.systems.disease import step_disease
+from life_sim.systems.foraging import step_foraging
+from life_sim.systems.mortality import step_mortality
+from life_sim.systems.movement import step_movement
+from life_sim.systems.reproduction import step_reproduction
+from life_sim.systems.resources import step_resources
+from life_sim.world import World
+
+
+def _population(cfg: SimConfig, world: World) -> list[Agent]:
+    rng = world.rng.py
+    return [
+        Agent(id=i, x=rng.randrange(cfg.width), y=rng.randrange(cfg.height),
+              sex="M" if rng.random() < 0.5 else "F",
+              age_years=rng.uniform(0.0, 60.0), energy=rng.uniform(5.0, 25.0),
+              infected=rng.random() < 0.1)
+        for i in range(cfg.initial_agents)
+    ]
+
+
+def test_roundtrip_and_views():
+    agents = [Agent(id=i, x=i, y=2 * i, sex="F" if i % 2 else "M", infected=i == 3) for i in range(5)]
+    store = AgentStore.from_agents(agents)
+    assert len(store) == 5
+    assert store.to_agents() == agents
+    assert store.next_id == 5
+
+    v = store[3]
+    assert v.sex == "F" and v.infected is True and v.x == 3
+    v.energy = 1.5
+    assert store.energy[3] == 1.5
+
+    store.keep(np.array([True, False, True, True, False]))
+    assert store.id.tolist() == [0, 2, 3]
+    rows = store.extend({"x": np.array([7, 8]), "y": np.array([1, 1])})
+    assert rows.tolist() == [3, 4]
+    assert store.id.tolist() == [0, 2, 3, 5, 6]
+    assert store[4].energy == Agent(id=0, x=0, y=0).energy
+
+
+def _tick_without_reproduction(world, agents):
+    # sistemi che estraggono in blocco da rng.np nello stesso ordine in entrambi i percorsi
+    step_resources(world)
+    step_movement(world, agents)
+    step_foraging(world, agents)
+    step_aging(world.cfg, agents)
+    step_disease(world, agents)
+    agents, deaths, attempts, positions = step_conflict(world, agents)
+    agents, mortality = step_mortality(world, agents)
+    return agents, (deaths, attempts, positions, mortality)
+
+
+def test_store_matches_list_pipeline():
+    cfg = SimConfig(width=32, height=24, initial_agents=400, seed=7, toroidal=False,
+                    initial_food_mean=0.5, resource_regen_rate=0.02)
+    w_list, w_store = World.create(cfg), World.create(cfg)
+    agents = _population(cfg, w_list)
+    store = AgentStore.from_agents(copy.deepcopy(agents))
+    _population(cfg, w_store)
+
+    for _ in range(40):
+        agents, info_list = _tick_without_reproduction(w_list, agents)
+        store, info_store = _tick_without_reproduction(w_store, store)
+        assert info_list == info_store
+
+    assert np.array_equal(w_list.food, w_store.food)
+    for name in COLUMNS:
+        if name == "id":
+            continue
+        assert [getattr(a, name) for a in agents] == [getattr(v, name) for v in store], name
+
+
+def test_vectorized_disease_and_mortality_rates():
+    cfg = SimConfig(time_unit="year", infection_annual_prob=0.5,
+                    disease_recovery_annual_prob=0.3, disease_mortality_annual_prob=0.2)
+    world = World.create(cfg)
+    n = 20000
+    store = AgentStore()
+    store.extend({"x": np.zeros(n), "y": np.zeros(n), "energy": np.full(n, 50.0),
+                  "infected": np.arange(n) % 2 == 1, "disease_years": np.full(n, 10.0)})
+
+    step_disease(world, store)
+    healthy, sick = np.arange(n) % 2 == 0, np.arange(n) % 2 == 1
+    assert abs(store.infected[healthy].mean() - 0.5) < 0.03
+    assert abs((~store.infected[sick]).mean() - 0.3) < 0.03
+    assert np.all(store.disease_years[sick & store.infected] == 11.0)
+
+    infected_before = int(store.infected.sum())
+    store, deaths = step_mortality(world, store)
+    assert set(deaths) == {"starvation", "age", "disease"}
+    still_sick = store.infected & (store.disease_years >= cfg.disease_mortality_after_years)
+    assert abs(deaths["disease"] / (deaths["disease"] + still_sick.sum()) - 0.2) < 0.03
+    assert deaths["disease"] < infected_before
+
+
+def test_vectorized_mating_pairs_within_cells():
+    cfg = SimConfig(width=2000, height=3, time_unit="year", reproduction_prob_per_meeting=1.0)
+    world = World.create(cfg)
+    n_cells = 2000
+    x = np.arange(n_cells)
+    # riga 0: 1 maschio idoneo + 1 maschio troppo giovane + 1 femmina idonea
+    # riga 1: 3 maschi e 2 femmine, tutti idonei; riga 2: solo maschi
+    xs = np.tile(x, 11)
+    ys = np.concatenate([np.zeros(3 * n_cells), np.ones(5 * n_cells), np.full(3 * n_cells, 2)])
+    sex = np.concatenate([np.zeros(2 * n_cells), np.ones(n_cells),
+                          np.zeros(3 * n_cells), np.ones(2 * n_cells), np.zeros(3 * n_cells)])
+    age = np.full(len(xs), 30.0)
+    age[n_cells:2 * n_cells] = 5.0
+    store = AgentStore()
+    store.extend({"x": xs, "y": ys, "sex": sex, "age_years": age,
+                  "energy": np.full(len(xs), 20.0), "max_age": np.full(len(xs), 70.0)})
+    n0 = len(store)
+
+    store, births = step_reproduction(world, store)
+    kids = store.columns()
+    born_y = kids["y"][n0:]
+    assert births == len(store) - n0
+    # riga 1: due coppie per cella; riga 0: la femmina incontra il maschio idoneo ~50%
+    assert np.sum(born_y == 1) == 2 * n_cells
+    assert abs(np.sum(born_y == 0) / n_cells - 0.5) < 0.05
+    assert np.sum(born_y == 2) == 0
+    assert np.all(kids["max_age"][n0:] == 70.0)
+    assert np.all(kids["energy"][n0:] == cfg.child_energy)
+    assert np.unique(kids["id"]).size == len(store)
+    parents = kids["repro_cooldown_years"][:n0] > 0
+    assert parents.sum() == 2 * births
+    assert np.all(kids["energy"][:n0][parents] == 20.0 - cfg.reproduction_cost)
@@ -0,0 +1,38 @@
+import csv
+from dataclasses import replace
+
+import pytest
+
+from life_sim.config import SimConfig
+from life_sim.sweep import expand_grid, make_jobs, run_sweep
+
+
+def test_sweep_runs_and_resumes(tmp_path):
+    base = SimConfig(width=24, height=24, initial_agents=40)
+    cases = expand_grid({"conflict_kill_prob": [0.1, 0.5], "resource_regen_rate": [0.01]})
+    assert cases == [{"conflict_kill_prob": 0.1, "resource_regen_rate": 0.01},
+                     {"conflict_kill_prob": 0.5, "resource_regen_rate": 0.01}]
+    jobs = make_jobs(cases, seeds=[1, 2], ticks=10)
+    assert len({j.job_id for j in jobs}) == 4
+
+    out = str(tmp_path)
+    rows = run_sweep(base, jobs[:3], out, workers=2, log=lambda _msg: None)
+    assert len(rows) == 3
+    # "crash" dopo 3 job: il secondo giro esegue solo quello mancante
+    rows = run_sweep(base, jobs, out, workers=2, log=lambda _msg: None)
+    assert [r["job_id"] for r in rows] == [jobs[3].job_id]
+
+    with open(tmp_path / "results.csv", newline="") as fh:
+        table = list(csv.DictReader(fh))
+    assert sorted(r["job_id"] for r in table) == sorted(j.job_id for j in jobs)
+    assert all(r["ticks"] == "10" for r in table)
+    assert len((tmp_path / "ticks" / f"{jobs[0].job_id}.csv").read_text().splitlines()) == 11
+
+
+def test_resume_refuses_a_changed_base_config(tmp_path):
+    base = SimConfig(width=24, height=24, initial_agents=20)
+    jobs = make_jobs([{}], seeds=[1], ticks=3)
+    run_sweep(base, jobs, str(tmp_path), workers=1, log=lambda _msg: None)
+    assert run_sweep(base, jobs, str(tmp_path), workers=1, log=lambda _msg: None) == []
+    with pytest.raises(ValueError):
+        run_sweep(replace(base, width=32), jobs, str(tmp_path), workers=1, log=lambda _msg: None)
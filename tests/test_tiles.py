@@ -0,0 +1,57 @@
+from dataclasses import replace
+
+import numpy as np
+
+from life_sim.config import SimConfig
+from life_sim.population import init_agents, init_store
+from life_sim.rng import RNG
+from life_sim.scheduler import step
+from life_sim.snapshot import load_snapshot, save_snapshot
+from life_sim.world import World
+
+
+def _pair(cfg):
+    """Mondo a tile e mondo denso lazy con lo stesso cibo iniziale e lo stesso RNG."""
+    tiled = World.create(cfg)
+    dense_cfg = replace(cfg, food_backend="dense", resource_mode="lazy")
+    dense = World(cfg=dense_cfg, rng=RNG(cfg.seed), food=tiled.food_now().copy(),
+                  food_tick=np.zeros((cfg.height, cfg.width), dtype=np.int32))
+    return tiled, dense
+
+
+def test_tiled_world_matches_dense_lazy_world():
+    cfg = SimConfig(width=160, height=96, initial_agents=120, seed=6, food_backend="tiled",
+                    tile_size=32, resource_regen_rate=0.02)
+    for init in (init_store, init_agents):
+        tiled, dense = _pair(cfg)
+        a_t, a_d = init(cfg, tiled), init(cfg, dense)
+        for _ in range(30):
+            a_t, _ = step(tiled, a_t)
+            a_d, _ = step(dense, a_d)
+        assert np.array_equal(tiled.food_now(), dense.food_now())
+        if init is init_store:
+            assert np.array_equal(a_t.energy, a_d.energy)
+        else:
+            assert [a.energy for a in a_t] == [a.energy for a in a_d]
+        assert 0 < tiled.tiles.allocated <= tiled.tiles.tiles_x * tiled.tiles.tiles_y
+
+
+def test_tiles_allocated_on_first_touch_and_snapshot(tmp_path):
+    cfg = SimConfig(width=4096, height=4096, initial_agents=30, seed=2, food_backend="tiled",
+                    spatial_bucket=64)
+    world = World.create(cfg)
+    agents = init_store(cfg, world)
+    for _ in range(10):
+        agents, _ = step(world, agents)
+    assert world.tiles.allocated < 200  # su 16384 tile
+    preview = world.food_preview(256)
+    assert preview.shape == (256, 256) and 0.0 <= preview.min() and preview.max() <= 1.0
+
+    save_snapshot(str(tmp_path / "s"), world, agents, tick=10)
+    for _ in range(10):
+        agents, _ = step(world, agents)
+    world2, agents2, _ = load_snapshot(str(tmp_path / "s"))
+    for _ in range(10):
+        agents2, _ = step(world2, agents2)
+    assert np.array_equal(agents.energy, agents2.energy)
+    assert np.array_equal(world.food_preview(256), world2.food_preview(256))
@@ -0,0 +1,38 @@
+import numpy as np
+
+from life_sim.config import SimConfig
+from life_sim.rng import RNG
+from life_sim.vegetation import draw_patches, stamp_patches
+from life_sim.world import World
+
+
+def _reference_food(cfg):
+    # una maschera su tutta la griglia per ogni macchia, come la generazione originale
+    rng = RNG(cfg.seed)
+    h, w = cfg.height, cfg.width
+    food = np.zeros((h, w), dtype=np.float32)
+    for _ in range(max(1, int((h * w) * cfg.initial_food_mean * 0.02))):
+        cx, cy = rng.py.randrange(w), rng.py.randrange(h)
+        radius = rng.py.randint(3, 12)
+        yy, xx = np.ogrid[:h, :w]
+        mask = (xx - cx) ** 2 + (yy - cy) ** 2 <= radius ** 2
+        p = rng.py.uniform(cfg.initial_food_mean * 0.5, min(1.0, cfg.initial_food_mean * 1.5))
+        food[mask] = np.clip(food[mask] + p, 0.0, 1.0)
+    return food
+
+
+def test_patch_map_matches_full_grid_masks():
+    for cfg in (SimConfig(width=120, height=90, seed=3, initial_food_flat=False),
+                SimConfig(width=47, height=130, seed=8, initial_food_flat=False,
+                          initial_food_mean=0.9)):
+        world = World.create(cfg)
+        assert np.array_equal(world.food, _reference_food(cfg))
+
+
+def test_strips_do_not_change_the_map():
+    cfg = SimConfig(width=150, height=101, seed=5, initial_food_flat=False, initial_food_mean=0.7)
+    patches = draw_patches(cfg, RNG(cfg.seed))
+    one = stamp_patches(np.zeros((101, 150), dtype=np.float32), *patches, workers=1)
+    for workers in (2, 5, 200):
+        many = stamp_patches(np.zeros((101, 150), dtype=np.float32), *patches, workers=workers)
+        assert np.array_equal(one, many)